@@ -4,6 +4,7 @@ from sqlalchemy import pool
 from alembic import context
 from app.core.database import Base
 from app.models.models import User, Task, Response, Vote, TopResponse
+from app.models.search import is_search_object
 
 config = context.config
 
@@ -13,6 +14,10 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def include_object(object_, name, type_, reflected, compare_to):
+    # Поисковая схема (tsvector, триграммы, FTS5) создается миграцией вручную
+    return not is_search_object(object_, name, type_, reflected, compare_to)
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -30,6 +35,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -57,7 +63,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,79 @@
+"""full text search
+
+Полнотекстовый поиск по заданиям и ответам. В PostgreSQL — сохраняемая колонка
+search_vector (русская и английская конфигурации) с GIN-индексом и триграммный
+GIN-индекс по тексту для нечеткого поиска; в SQLite — таблицы FTS5 с триггерами.
+
+ADD COLUMN ... GENERATED STORED переписывает таблицу, на большой БД миграцию
+стоит выполнять в окно обслуживания.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 21:40:12.318405
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('tasks', 'responses')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for table in TABLES:
+            op.execute(
+                f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+                f"to_tsvector('russian', coalesce(text, '')) || to_tsvector('english', coalesce(text, ''))"
+                f") STORED"
+            )
+            op.execute(f"CREATE INDEX ix_{table}_search_vector ON {table} USING gin (search_vector)")
+            op.execute(f"CREATE INDEX ix_{table}_text_trgm ON {table} USING gin (text gin_trgm_ops)")
+    elif dialect == 'sqlite':
+        for table in TABLES:
+            fts = f"{table}_fts"
+            op.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5(text, content='{table}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+            op.execute(
+                f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.id, old.text); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {fts}_au AFTER UPDATE OF text ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.id, old.text); "
+                f"INSERT INTO {fts}(rowid, text) VALUES (new.id, new.text); END"
+            )
+            # Индексирует уже существующие строки
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        if dialect == 'postgresql':
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_text_trgm")
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+        elif dialect == 'sqlite':
+            fts = f"{table}_fts"
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
@@ -1,35 +1,35 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List, Dict
-from app.api.deps import get_db
-from app.core.config import redis_client
+from typing import List, Dict, Optional
+from app.api.deps import get_read_db
+from app.core import redis_store
+from app.core.config import redis_client, settings
+from app.core.cache import get_cache, get_cache_namespaces, get_read_through_stats
 from app.models.models import Response as ResponseModel
+from app.services.vote_service import get_top_responses_with_scores
 
 router = APIRouter()
 
 @router.get("/top-responses")
-def get_cached_top_responses(limit: int = 10, db: Session = Depends(get_db)):
-    """Получает топ ответов из кэша Redis."""
-    top_ids = redis_client.lrange("top_responses", 0, limit - 1)
+def get_cached_top_responses(limit: int = 10, db: Session = Depends(get_read_db)):
+    """Получает топ ответов из рейтинга в Redis."""
+    top = get_top_responses_with_scores(db, limit=limit)
     
-    if not top_ids:
-        # Если кэш пуст, возвращаем пустой список
+    if not top:
         return []
     
     # Получаем данные ответов из БД
     responses = db.query(ResponseModel).filter(
-        ResponseModel.id.in_([int(id_) for id_ in top_ids])
+        ResponseModel.id.in_([response_id for response_id, _, _ in top])
     ).all()
-    
-    # Сортируем по порядку из Redis
     response_dict = {r.id: r for r in responses}
-    sorted_responses = [response_dict[int(id_)] for id_ in top_ids if int(id_) in response_dict]
     
-    # Добавляем рейтинг из Redis
+    # Сохраняем порядок из рейтинга и добавляем счетчики из Redis
     result = []
-    for response in sorted_responses:
-        score = redis_client.hget(f"response:{response.id}", "score") or 0
-        votes_count = redis_client.hget(f"response:{response.id}", "votes_count") or 0
+    for response_id, votes_count, score in top:
+        response = response_dict.get(response_id)
+        if response is None:
+            continue
         result.append({
             "id": response.id,
             "text": response.text,
@@ -37,23 +37,61 @@ def get_cached_top_responses(limit: int = 10, db: Session = Depends(get_db)):
             "created_at": response.created_at,
             "author_id": response.author_id,
             "task_id": response.task_id,
-            "score": int(score),
-            "votes_count": int(votes_count)
+            "score": score,
+            "votes_count": votes_count
         })
     
     return result
 
 @router.get("/stats")
-def get_system_stats():
-    """Получает статистику системы."""
-    stats = {
-        "redis_info": redis_client.info(),
-        "redis_keys": redis_client.keys("*")
+def get_system_stats(cursor: int = 0):
+    """Получает статистику кэша: ключи по пространствам имен, память и попадания.
+
+    Ключи обходятся через SCAN порциями; если обход не закончен за один запрос,
+    в ответе есть cursor для продолжения.
+    """
+    memory = redis_client.info("memory")
+    server_stats = redis_client.info("stats")
+    hits = server_stats.get("keyspace_hits", 0)
+    misses = server_stats.get("keyspace_misses", 0)
+
+    return {
+        "redis": {
+            "dbsize": redis_client.dbsize(),
+            "used_memory": memory.get("used_memory"),
+            "used_memory_human": memory.get("used_memory_human"),
+            "keyspace_hits": hits,
+            "keyspace_misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else None
+        },
+        "keyspace": redis_store.scan_namespaces(
+            cursor=cursor,
+            max_keys=settings.CACHE_STATS_SCAN_LIMIT,
+            count=settings.CACHE_STATS_SCAN_COUNT,
+            memory_samples=settings.CACHE_STATS_MEMORY_SAMPLES
+        ),
+        "read_through": get_read_through_stats()
     }
-    return stats
+
+def _get_cache_or_404(namespace: str):
+    cache = get_cache(namespace)
+    if cache is None:
+        raise HTTPException(status_code=404, detail=f"Unknown cache namespace: {namespace}")
+    return cache
 
 @router.post("/clear-cache")
-def clear_cache():
-    """Очищает кэш Redis."""
-    redis_client.flushdb()
-    return {"message": "Cache cleared"}
\ No newline at end of file
+def clear_cache(namespace: Optional[str] = None):
+    """Сбрасывает read-through кэш: одно пространство имен или все.
+
+    Счетчики голосов и рейтинги не являются кэшем и не затрагиваются.
+    """
+    namespaces = [namespace] if namespace else get_cache_namespaces()
+    generations = {name: _get_cache_or_404(name).invalidate_all() for name in namespaces}
+    return {"message": "Cache cleared", "generations": generations}
+
+@router.post("/invalidate/{namespace}/{key}")
+def invalidate_cache_entry(namespace: str, key: str):
+    """Удаляет из кэша один объект, например /invalidate/responses/42."""
+    cache = _get_cache_or_404(namespace)
+    cache.invalidate(int(key) if key.isdigit() else key)
+    return {"message": "Cache entry invalidated"}
\ No newline at end of file
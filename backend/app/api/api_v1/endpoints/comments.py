@@ -1,23 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from app.api.deps import get_db
+from typing import List, Optional
+from app.api.deps import get_db, get_read_db
 from app.schemas.schemas import CommentCreate, Comment
-from app.models.models import Comment as CommentModel
+from app.core.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from app.core.http_cache import REVALIDATE, is_not_modified, make_etag, not_modified, set_validators
+from app.services.comment_service import create_comment, get_comments_for_response, get_comments_page, get_comments_version
 
 router = APIRouter()
 
 @router.post("/", response_model=Comment, status_code=status.HTTP_201_CREATED)
-def create_comment(comment_in: CommentCreate, db: Session = Depends(get_db)):
+def create_new_comment(comment_in: CommentCreate, db: Session = Depends(get_db)):
     """Создает новый комментарий."""
-    db_comment = CommentModel(**comment_in.model_dump())
-    db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
-    return db_comment
+    return create_comment(db, comment_in)
 
 @router.get("/response/{response_id}", response_model=List[Comment])
-def get_comments_for_response(response_id: int, db: Session = Depends(get_db)):
-    """Получает все комментарии для ответа."""
-    comments = db.query(CommentModel).filter(CommentModel.response_id == response_id).all()
-    return comments
\ No newline at end of file
+def read_comments_for_response(
+    response_id: int,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    """Получает комментарии для ответа постранично.
+
+    Курсор следующей страницы приходит в заголовке X-Next-Cursor; skip включает режим со смещением.
+    """
+    # Версию проверяем легким агрегатным запросом до выборки самих комментариев
+    etag = make_etag("comments", response_id, cursor, skip, limit, *get_comments_version(db, response_id))
+    if is_not_modified(request, etag):
+        return not_modified(etag, REVALIDATE)
+    set_validators(response, etag, REVALIDATE)
+    if skip is not None:
+        return get_comments_for_response(db, response_id, skip=skip, limit=limit)
+    comments, next_cursor = get_comments_page(db, response_id, cursor=cursor, limit=limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return comments
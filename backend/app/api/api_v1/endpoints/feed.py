@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.api.deps import get_db, get_read_db
+from app.core.http_cache import conditional_json
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.models.models import User
+from app.schemas.schemas import Response, Subscription
+from app.services.feed_service import get_feed_page, subscribe, unsubscribe
+
+router = APIRouter()
+
+RESPONSE_LIST = TypeAdapter(List[Response])
+
+@router.get("/", response_model=List[Response])
+def read_feed(
+    request: Request,
+    user_id: int,
+    cursor: Optional[int] = Query(None, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Лента ответов авторов, на которых подписан пользователь, новые первыми.
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    """
+    responses, next_cursor = get_feed_page(db, user_id, cursor=cursor, limit=limit)
+    return conditional_json(
+        request, RESPONSE_LIST, responses, headers={NEXT_CURSOR_HEADER: str(next_cursor)} if next_cursor else None
+    )
+
+@router.post("/subscriptions/{target_user_id}", response_model=Subscription, status_code=status.HTTP_201_CREATED)
+def create_subscription(target_user_id: int, user_id: int, db: Session = Depends(get_db)):
+    """Подписывает пользователя на автора."""
+    if user_id == target_user_id:
+        raise HTTPException(status_code=400, detail="Cannot subscribe to yourself")
+    if db.get(User, target_user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return subscribe(db, user_id, target_user_id)
+
+@router.delete("/subscriptions/{target_user_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_subscription(target_user_id: int, user_id: int, db: Session = Depends(get_db)):
+    """Отписывает пользователя от автора."""
+    if not unsubscribe(db, user_id, target_user_id):
+        raise HTTPException(status_code=404, detail="Subscription not found")
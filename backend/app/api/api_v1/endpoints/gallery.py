@@ -1,34 +1,79 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi import Response as HTTPResponse
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List
-from app.api.deps import get_db
-from app.schemas.schemas import Response
+from app.api.deps import get_read_db
+from app.core.http_cache import REVALIDATE, conditional_json, is_not_modified, make_etag, not_modified, set_validators
+from app.schemas.schemas import Response, TopResponse
 from app.models.models import Response as ResponseModel
-from sqlalchemy import func
+from app.services.vote_service import get_hot_response_ids, get_top_response_ids
+from app.services.recommendation_service import get_similar_responses as find_similar_responses
+from app.services.ranking_service import RankingPeriod, get_top_responses_calculated_at, get_top_responses_for_period_cached
 
 router = APIRouter()
 
+RESPONSE_LIST = TypeAdapter(List[Response])
+
 @router.get("/top", response_model=List[Response])
-def get_top_responses(limit: int = 10, db: Session = Depends(get_db)):
+def get_top_responses(request: Request, limit: int = 10, db: Session = Depends(get_read_db)):
     """Получает топ ответов по количеству голосов."""
-    # Подсчитываеt coчество голосов для каждого ответа
-    vote_counts = db.query(
-        ResponseModel.id,
-        func.count(ResponseModel.votes).label('vote_count')
-    ).join(ResponseModel.votes).group_by(ResponseModel.id).subquery()
+    # Берем порядок ответов из рейтинга в Redis
+    top_ids = [response_id for response_id, _ in get_top_response_ids(db, limit=limit)]
+    if not top_ids:
+        return []
     
-    # Получаеt top ветов
-    top_responses = db.query(ResponseModel).join(
-        vote_counts, ResponseModel.id == vote_counts.c.id
-    ).order_by(vote_counts.c.vote_count.desc()).limit(limit).all()
+    responses = db.query(ResponseModel).filter(ResponseModel.id.in_(top_ids)).all()
+    response_dict = {r.id: r for r in responses}
+    return conditional_json(
+        request, RESPONSE_LIST, [response_dict[response_id] for response_id in top_ids if response_id in response_dict]
+    )
+
+@router.get("/top/{period}", response_model=List[TopResponse])
+def get_top_responses_by_period(
+    period: RankingPeriod,
+    request: Request,
+    response: HTTPResponse,
+    limit: int = 10,
+    db: Session = Depends(get_read_db)
+):
+    """Получает топ ответов за день, неделю или все время из таблицы top_responses."""
+    # Топ меняется только при пересчете, поэтому версия — время последнего пересчета
+    calculated_at = get_top_responses_calculated_at(db, period)
+    etag = make_etag("top", period.value, limit, calculated_at)
+    if is_not_modified(request, etag, calculated_at):
+        return not_modified(etag, REVALIDATE, calculated_at)
+    set_validators(response, etag, REVALIDATE, calculated_at)
+    return get_top_responses_for_period_cached(db, period, limit=limit)
+
+@router.get("/hot", response_model=List[Response])
+def get_hot_responses(request: Request, skip: int = 0, limit: int = 10, db: Session = Depends(get_read_db)):
+    """Получает "горячие" ответы: свежие и набирающие голоса."""
+    hot_ids = get_hot_response_ids(db, limit=limit, offset=skip)
+    if not hot_ids:
+        return []
     
-    return top_responses
+    responses = db.query(ResponseModel).filter(ResponseModel.id.in_(hot_ids)).all()
+    response_dict = {r.id: r for r in responses}
+    return conditional_json(
+        request, RESPONSE_LIST, [response_dict[response_id] for response_id in hot_ids if response_id in response_dict]
+    )
 
 @router.get("/recent", response_model=List[Response])
-def get_recent_responses(limit: int = 10, db: Session = Depends(get_db)):
+def get_recent_responses(request: Request, limit: int = 10, db: Session = Depends(get_read_db)):
     """Получает последние добавленные ответы."""
     responses = db.query(ResponseModel).order_by(
         ResponseModel.created_at.desc()
     ).limit(limit).all()
     
-    return responses
\ No newline at end of file
+    return conditional_json(request, RESPONSE_LIST, responses)
+
+@router.get("/{response_id}/similar", response_model=List[Response])
+def get_similar_responses(
+    request: Request,
+    response_id: int,
+    limit: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_read_db)
+):
+    """Похожие по тексту ответы ("еще похожие")."""
+    return conditional_json(request, RESPONSE_LIST, find_similar_responses(db, response_id, limit=limit))
@@ -0,0 +1,19 @@
+import os
+from fastapi import APIRouter
+from app.core.pool import get_pool_stats
+from app.core.replicas import get_replica_status
+
+router = APIRouter()
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """Метрики пулов соединений с БД текущего процесса.
+
+    У каждого воркера свои пулы, поэтому в ответе есть pid.
+    """
+    return {"pid": os.getpid(), "pools": get_pool_stats()}
+
+@router.get("/replicas")
+def get_replica_metrics():
+    """Последнее замеренное отставание реплик для чтения в текущем процессе."""
+    return {"pid": os.getpid(), "replicas": get_replica_status()}
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.api.deps import get_read_db
+from app.schemas.schemas import Task
+from app.services.recommendation_service import get_recommended_tasks
+
+router = APIRouter()
+
+@router.get("/tasks", response_model=List[Task])
+def read_recommended_tasks(
+    user_id: Optional[int] = None,
+    limit: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_read_db)
+):
+    """Рекомендованные задания для пользователя; без user_id — популярные."""
+    return get_recommended_tasks(db, user_id, limit=limit)
@@ -1,10 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File, Form
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
-from app.api.deps import get_db
+from app.api.deps import get_async_db, get_async_read_db
 from app.schemas.schemas import ResponseCreate, Response, ResponseUpdate
-from app.services.response_service import create_response, get_response, get_responses, get_responses_for_task, update_response, delete_response, save_response_image
-from pydantic import BaseModel 
+from app.models.models import Response as ResponseModel
+from app.core.http_cache import conditional_json
+from app.core.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from app.services.response_service import (
+    create_response_async,
+    get_response_cached_async,
+    get_responses_async,
+    get_responses_page_async,
+    get_responses_for_task_async,
+    update_response_async,
+    delete_response_async,
+    set_response_image_async,
+    stage_response_image,
+    publish_response_image,
+    discard_staged_image,
+    discard_response_image,
+    ImageTooLarge,
+    UnsupportedImage
+)
+from pydantic import BaseModel, TypeAdapter
 
 
 class ResponseCreateWithFile(BaseModel):
@@ -13,79 +33,127 @@ class ResponseCreateWithFile(BaseModel):
 
 router = APIRouter()
 
+RESPONSE = TypeAdapter(Response)
+RESPONSE_LIST = TypeAdapter(List[Response])
+
+async def _create_response_with_image(db: AsyncSession, response_in: ResponseCreate, image: Optional[UploadFile]) -> ResponseModel:
+    if not (image and image.filename):
+        return await create_response_async(db, response_in)
+
+    # Изображение проверяется до создания ответа: отклоненная загрузка не создает
+    # ответ, не рассылает его в ленты и не меняет счетчики. Запись файла
+    # блокирующая — выполняем ее вне event loop
+    try:
+        staged = await run_in_threadpool(stage_response_image, image)
+    except ImageTooLarge:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    except UnsupportedImage:
+        raise HTTPException(status_code=415, detail="Unsupported image type")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+
+    try:
+        db_response = await create_response_async(db, response_in)
+    except BaseException:
+        discard_staged_image(staged[0])
+        raise
+    image_path = None
+    try:
+        image_path = await run_in_threadpool(publish_response_image, *staged, db_response.id)
+        return await set_response_image_async(db, db_response.id, image_path)
+    except BaseException as e:
+        # Сюда попадает и отмена запроса: ответ без изображения не остается, а файл
+        # удаляется с того места, где он сейчас лежит
+        if image_path is None:
+            discard_staged_image(staged[0])
+        else:
+            discard_response_image(image_path)
+        # Удаление ответа доводится до конца, даже если запрос уже отменен
+        await asyncio.shield(delete_response_async(db, db_response.id))
+        if not isinstance(e, Exception):
+            raise
+        raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+
 @router.post("/", response_model=Response, status_code=status.HTTP_201_CREATED)
 async def create_new_response(
     task_id: int = Form(...),
     text: Optional[str] = Form(None),
     image: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Создает новый ответ с возможной загрузкой изображения."""
     response_in = ResponseCreate(text=text, task_id=task_id)
-    db_response = create_response(db, response_in)
-    
-    if image and image.filename:
-        try:
-            image_path = save_response_image(image, db_response.id)
-            db_response = update_response(db, db_response.id, ResponseUpdate(image_path=image_path))
-        except Exception as e:
-            delete_response(db, db_response.id)
-            raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
-    
-    return db_response
+    return await _create_response_with_image(db, response_in, image)
 
 
 @router.post("/", response_model=Response, status_code=status.HTTP_201_CREATED)
-def create_new_response(
+async def create_new_response(
     response_in: ResponseCreate, 
     image: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Создает новый ответ."""
-    db_response = create_response(db, response_in)
-    
-    if image and image.filename:
-        image_path = save_response_image(image, db_response.id)
-        db_response = update_response(db, db_response.id, ResponseUpdate(image_path=image_path))
-    
-    return db_response
+    return await _create_response_with_image(db, response_in, image)
 
 @router.get("/{response_id}", response_model=Response)
-def read_response(response_id: int, db: Session = Depends(get_db)):
+async def read_response(response_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Получает ответ по ID."""
-    db_response = get_response(db, response_id)
+    # Остается на основной БД: промах кэша с отстающей реплики записал бы в общий
+    # кэш устаревший или уже удаленный ответ на весь RESPONSE_CACHE_TTL
+    db_response = await get_response_cached_async(db, response_id)
     if db_response is None:
         raise HTTPException(status_code=404, detail="Response not found")
-    return db_response
+    return conditional_json(request, RESPONSE, db_response)
 
 @router.get("/", response_model=List[Response])
-def read_responses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Получает список ответов."""
-    responses = get_responses(db, skip=skip, limit=limit)
-    return responses
+async def read_responses(
+    request: Request,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Получает список ответов.
+
+    Курсор следующей страницы приходит в заголовке X-Next-Cursor; skip включает режим со смещением.
+    """
+    if skip is not None:
+        return conditional_json(request, RESPONSE_LIST, await get_responses_async(db, skip=skip, limit=limit))
+    responses, next_cursor = await get_responses_page_async(db, cursor=cursor, limit=limit)
+    return conditional_json(request, RESPONSE_LIST, responses, headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 @router.get("/task/{task_id}", response_model=List[Response])
-def read_responses_for_task(task_id: int, db: Session = Depends(get_db)):
-    """Получает все ответы для задания."""
-    responses = get_responses_for_task(db, task_id)
-    return responses
+async def read_responses_for_task(
+    task_id: int,
+    request: Request,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Получает ответы для задания постранично."""
+    if skip is not None:
+        responses = await get_responses_for_task_async(db, task_id, skip=skip, limit=limit)
+        return conditional_json(request, RESPONSE_LIST, responses)
+    responses, next_cursor = await get_responses_page_async(db, cursor=cursor, limit=limit, task_id=task_id)
+    return conditional_json(request, RESPONSE_LIST, responses, headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 @router.put("/{response_id}", response_model=Response)
-def update_existing_response(
+async def update_existing_response(
     response_id: int, 
     response_in: ResponseUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Обновляет ответ."""
-    db_response = update_response(db, response_id, response_in)
+    db_response = await update_response_async(db, response_id, response_in)
     if db_response is None:
         raise HTTPException(status_code=404, detail="Response not found")
     return db_response
 
 @router.delete("/{response_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_existing_response(response_id: int, db: Session = Depends(get_db)):
+async def delete_existing_response(response_id: int, db: AsyncSession = Depends(get_async_db)):
     """Удаляет ответ."""
-    success = delete_response(db, response_id)
+    success = await delete_response_async(db, response_id)
     if not success:
         raise HTTPException(status_code=404, detail="Response not found")
 
@@ -1,33 +1,39 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from typing import List
-from app.api.deps import get_db
-from app.models.models import Task, Response
-from sqlalchemy import or_
+from app.api.deps import get_read_db
+from app.schemas.schemas import Response, Task
+from app.services.search_service import SearchMode, search_responses as find_responses, search_tasks as find_tasks
 
 router = APIRouter()
 
-@router.get("/tasks")
+# Релевантность считается для каждой страницы заново, поэтому страницы небольшие
+MAX_SEARCH_PAGE_SIZE = 100
+
+@router.get("/tasks", response_model=List[Task])
 def search_tasks(
     query: str = Query(..., min_length=1),
-    db: Session = Depends(get_db)
+    mode: SearchMode = SearchMode.FULLTEXT,
+    fuzzy: bool = True,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
 ):
-    """Поиск заданий по тексту."""
-    tasks = db.query(Task).filter(
-        or_(
-            Task.text.contains(query),
-            Task.tags.any(name=query) 
-        )
-    ).all()
-    return tasks
+    """Поиск заданий по тексту и тегу.
+
+    По умолчанию полнотекстовый поиск с сортировкой по релевантности и нечетким
+    совпадением слов с опечатками; mode=substring — прежний поиск по подстроке.
+    """
+    return find_tasks(db, query, mode=mode, fuzzy=fuzzy, skip=skip, limit=limit)
 
-@router.get("/responses")
+@router.get("/responses", response_model=List[Response])
 def search_responses(
     query: str = Query(..., min_length=1),
-    db: Session = Depends(get_db)
+    mode: SearchMode = SearchMode.FULLTEXT,
+    fuzzy: bool = True,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
 ):
     """Поиск ответов по тексту."""
-    responses = db.query(Response).filter(
-        Response.text.contains(query)
-    ).all()
-    return responses
\ No newline at end of file
+    return find_responses(db, query, mode=mode, fuzzy=fuzzy, skip=skip, limit=limit)
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List
+from app.api.deps import get_db, get_read_db
+from app.models.models import Task as TaskModel
+from app.schemas.schemas import Tag, TagFacet, TagsAttach, Task
+from app.services.tag_service import attach_tags, autocomplete_tags, get_tag_facets, get_tasks_for_tag
+
+router = APIRouter()
+
+@router.post("/task/{task_id}", response_model=List[Tag], status_code=status.HTTP_201_CREATED)
+def add_tags_to_task(task_id: int, tags_in: TagsAttach, db: Session = Depends(get_db)):
+    """Добавляет теги к заданию."""
+    if db.get(TaskModel, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return attach_tags(db, task_id, tags_in.names)
+
+@router.get("/autocomplete", response_model=List[TagFacet])
+def autocomplete(
+    prefix: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db)
+):
+    """Подсказки тегов по префиксу, популярные первыми."""
+    return autocomplete_tags(db, prefix, limit=limit)
+
+@router.get("/facets", response_model=List[TagFacet])
+def facets(limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_read_db)):
+    """Самые популярные теги с числом заданий."""
+    return get_tag_facets(db, limit=limit)
+
+@router.get("/{name}/tasks", response_model=List[Task])
+def read_tasks_for_tag(
+    name: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Задания с тегом, новые первыми."""
+    return get_tasks_for_tag(db, name, skip=skip, limit=limit)
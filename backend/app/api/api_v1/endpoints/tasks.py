@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional  
 from datetime import timedelta  
-from app.api.deps import get_db
+from app.api.deps import get_async_db, get_async_read_db, get_db
 from app.schemas.schemas import TaskCreate, Task
+from app.core.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from app.core.http_cache import IMMUTABLE, conditional_json, etag_matches, is_not_modified, make_etag, not_modified, set_validators
 from enum import Enum
+from pydantic import TypeAdapter
 from app.services.task_service import (
     generate_random_task, 
     generate_task_with_ai,  
     create_task, 
-    get_task, 
-    get_tasks
+    create_task_async,
+    get_task_cached_async,
+    get_tasks_async,
+    get_tasks_page_async
 )
 
 router = APIRouter()
 
+TASK_LIST = TypeAdapter(List[Task])
+
 class TaskCategory(str, Enum):
     CREATIVE = "creative"
     PHOTO = "photo"
@@ -43,23 +51,45 @@ def generate_task(
     return create_task(db, task_in)
 
 @router.post("/", response_model=Task, status_code=status.HTTP_201_CREATED)
-def create_new_task(task_in: TaskCreate, db: Session = Depends(get_db)):
+async def create_new_task(task_in: TaskCreate, db: AsyncSession = Depends(get_async_db)):
     """Создает новое задание."""
-    return create_task(db, task_in)
+    return await create_task_async(db, task_in)
 
 @router.get("/{task_id}", response_model=Task)
-def read_task(task_id: int, db: Session = Depends(get_db)):
+async def read_task(task_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db)):
     """Получает задание по ID."""
-    db_task = get_task(db, task_id)
+    # Задания неизменяемы и не удаляются, поэтому ETag зависит только от id, и выданный
+    # клиенту тег проверяется без обращения к кэшу и БД. "*" так проверять нельзя:
+    # задания с этим id может не быть
+    etag = make_etag("task", task_id)
+    if etag_matches(request, etag):
+        return not_modified(etag, IMMUTABLE)
+
+    db_task = await get_task_cached_async(db, task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    if is_not_modified(request, etag, db_task.created_at):
+        return not_modified(etag, IMMUTABLE, db_task.created_at)
+    set_validators(response, etag, IMMUTABLE, db_task.created_at)
     return db_task
 
 @router.get("/", response_model=List[Task])
-def read_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Получает список заданий."""
-    tasks = get_tasks(db, skip=skip, limit=limit)
-    return tasks
+async def read_tasks(
+    request: Request,
+    cursor: Optional[str] = None,
+    skip: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Получает список заданий.
+
+    Страницы выдаются по курсору: курсор следующей страницы приходит в заголовке
+    X-Next-Cursor. Параметр skip включает прежний режим со смещением.
+    """
+    if skip is not None:
+        return conditional_json(request, TASK_LIST, await get_tasks_async(db, skip=skip, limit=limit))
+    tasks, next_cursor = await get_tasks_page_async(db, cursor=cursor, limit=limit)
+    return conditional_json(request, TASK_LIST, tasks, headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 @router.post("/generate", response_model=Task, status_code=status.HTTP_201_CREATED)
 def generate_task(
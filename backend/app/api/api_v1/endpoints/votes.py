@@ -1,38 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app.api.deps import get_db
-from app.schemas.schemas import TaskCreate, Task
-from app.services.task_service import generate_random_task, generate_task_with_ai, create_task, get_task, get_tasks
+from app.api.deps import get_async_db, get_async_read_db
+from app.schemas.schemas import VoteCreate, Vote
+from app.services.vote_service import submit_vote_async, get_vote_async, get_votes_for_response_async
 
 router = APIRouter()
 
-@router.post("/generate", response_model=Task, status_code=status.HTTP_201_CREATED)
-def generate_task(prompt: Optional[str] = None, db: Session = Depends(get_db)):
-    """Генерирует случайное задание и сохраняет его в БД."""
-    if prompt:
-        task_text = generate_task_with_ai(prompt)
-    else:
-        task_text = generate_random_task()
-    
-    task_in = TaskCreate(text=task_text)
-    return create_task(db, task_in)
+@router.post(
+    "/",
+    response_model=Vote,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"description": "Голос принят в буфер и будет записан позже"}}
+)
+async def create_new_vote(vote_in: VoteCreate, user_id: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    """Голосует за ответ."""
+    db_vote = await submit_vote_async(db, vote_in, user_id)
+    if db_vote is None:
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"status": "accepted", **vote_in.model_dump(), "user_id": user_id}
+        )
+    return db_vote
 
-@router.post("/", response_model=Task, status_code=status.HTTP_201_CREATED)
-def create_new_task(task_in: TaskCreate, db: Session = Depends(get_db)):
-    """Создает новое задание."""
-    return create_task(db, task_in)
+@router.get("/{vote_id}", response_model=Vote)
+async def read_vote(vote_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Получает голос по ID."""
+    db_vote = await get_vote_async(db, vote_id)
+    if db_vote is None:
+        raise HTTPException(status_code=404, detail="Vote not found")
+    return db_vote
 
-@router.get("/{task_id}", response_model=Task)
-def read_task(task_id: int, db: Session = Depends(get_db)):
-    """Получает задание по ID."""
-    db_task = get_task(db, task_id)
-    if db_task is None:
-        raise HTTPException(status_code=404, detail="Task not found")
-    return db_task
-
-@router.get("/", response_model=List[Task])
-def read_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Получает список заданий."""
-    tasks = get_tasks(db, skip=skip, limit=limit)
-    return tasks
\ No newline at end of file
+@router.get("/response/{response_id}", response_model=List[Vote])
+async def read_votes_for_response(response_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Получает все голоса для ответа."""
+    return await get_votes_for_response_async(db, response_id)
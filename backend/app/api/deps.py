@@ -1,6 +1,9 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import AsyncSessionLocal, SessionLocal
+from app.core.replicas import choose_replica, choose_replica_async
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency для получения сессии БД."""
@@ -8,4 +11,24 @@ def get_db() -> Generator[Session, None, None]:
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency для получения асинхронной сессии БД."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """Dependency сессии только для чтения: реплика, если она не отстает, иначе основная БД."""
+    replica = choose_replica(request)
+    db = (replica.session_factory if replica else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Dependency асинхронной сессии только для чтения."""
+    replica = await choose_replica_async(request)
+    async with (replica.async_session_factory if replica else AsyncSessionLocal)() as db:
+        yield db
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import tasks, responses, votes, gallery, cache
+from app.api.api_v1.endpoints import tasks, responses, votes, gallery, cache, comments, analytics, metrics, search, tags, recommendations, feed
 from app.auth.routes import router as auth_router
 
 api_router = APIRouter()
@@ -9,4 +9,11 @@ api_router.include_router(responses.router, prefix="/responses", tags=["response
 api_router.include_router(votes.router, prefix="/votes", tags=["votes"])
 api_router.include_router(gallery.router, prefix="/gallery", tags=["gallery"])
 api_router.include_router(cache.router, prefix="/cache", tags=["cache"])
+api_router.include_router(comments.router, prefix="/comments", tags=["comments"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(tags.router, prefix="/tags", tags=["tags"])
+api_router.include_router(recommendations.router, prefix="/recommendations", tags=["recommendations"])
+api_router.include_router(feed.router, prefix="/feed", tags=["feed"])
 api_router.include_router(auth_router, prefix="/auth", tags=["auth"])
\ No newline at end of file
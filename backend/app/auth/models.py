@@ -1,17 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean
-from sqlalchemy.orm import relationship
-from app.core.database import Base
+# Пользователь — общая модель приложения; отдельное объявление таблицы users
+# в тех же метаданных ломало импорт app.main
+from app.models.models import User
 
-class User(Base):
-    __tablename__ = "users"
-
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, unique=True, index=True)
-    email = Column(String, unique=True, index=True)
-    hashed_password = Column(String)
-    is_active = Column(Boolean, default=True)
-
-    # Связи
-    tasks = relationship("Task", back_populates="creator")
-    responses = relationship("Response", back_populates="author")
-    votes = relationship("Vote", back_populates="user")
\ No newline at end of file
+__all__ = ["User"]
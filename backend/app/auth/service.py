@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from app.auth.models import User
 from app.auth.security import get_password_hash, verify_password
+from app.services.analytics_service import increment_counters
 
 def get_user(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
@@ -20,6 +21,7 @@ def create_user(db: Session, user):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    increment_counters(users=1)
     return db_user
 
 def authenticate_user(db: Session, username: str, password: str):
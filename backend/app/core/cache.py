@@ -0,0 +1,344 @@
+import asyncio
+import math
+import random
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+from pydantic import TypeAdapter
+from redis.exceptions import LockError
+from app.core.config import get_async_redis, redis_client, settings
+from app.core.redis_store import register_async_script
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+# Как часто ожидающие воркеры проверяют, не появилось ли значение
+LOCK_POLL_INTERVAL = 0.05
+
+# Читает текущее поколение пространства имен, значение ключа и его оставшийся TTL
+# в миллисекундах за один round trip
+GET_VERSIONED_SCRIPT = """
+local generation = tonumber(redis.call('GET', KEYS[1]) or '0')
+local key = 'cache:' .. ARGV[1] .. ':' .. generation .. ':' .. ARGV[2]
+return {generation, redis.call('GET', key), redis.call('PTTL', key)}
+"""
+
+# Удаляет ключ объекта в текущем поколении пространства имен
+DELETE_VERSIONED_SCRIPT = """
+local generation = tonumber(redis.call('GET', KEYS[1]) or '0')
+return redis.call('DEL', 'cache:' .. ARGV[1] .. ':' .. generation .. ':' .. ARGV[2])
+"""
+
+_get_versioned = redis_client.register_script(GET_VERSIONED_SCRIPT)
+_aget_versioned = register_async_script(GET_VERSIONED_SCRIPT)
+_delete_versioned = redis_client.register_script(DELETE_VERSIONED_SCRIPT)
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш в памяти процесса с ограничением размера и TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ReadThroughCache(Generic[T]):
+    """Двухуровневый кэш Pydantic-схем: LRU в памяти процесса перед Redis.
+
+    Промах на обоих уровнях загружает объект из БД через loader. Ключи в Redis
+    содержат номер поколения пространства имен: cache:{namespace}:{generation}:{key}.
+    invalidate_all увеличивает поколение за O(1), не удаляя ключи, — старые
+    записи становятся недоступны и истекают по TTL. Ключи LRU тоже содержат
+    поколение, а само поколение процесс перечитывает из Redis не чаще раза в
+    CACHE_GENERATION_CHECK_INTERVAL секунд, поэтому invalidate_all доходит до
+    всех процессов за этот интервал независимо от local_ttl. Инвалидация
+    одного ключа удаляет его из Redis и из LRU текущего процесса; в других
+    процессах устаревшее значение живет не дольше local_ttl.
+
+    Пересчет защищен от лавины запросов: при промахе значение загружает один
+    воркер, взявший блокировку, остальные ждут его результат. Незадолго до
+    истечения TTL значение с некоторой вероятностью обновляется заранее
+    (probabilistic early expiration): чем дольше считается значение и чем
+    ближе истечение, тем выше вероятность. В это время остальные воркеры
+    продолжают отдавать текущее значение.
+    """
+
+    def __init__(self, namespace: str, schema: Any, ttl: int, local_maxsize: int, local_ttl: float):
+        self.namespace = namespace
+        self.schema = schema
+        self.adapter = TypeAdapter(schema)
+        self.ttl = ttl
+        self.local = LRUCache(local_maxsize, local_ttl)
+        self._generation = 0
+        self._generation_checked_at = -math.inf
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        _caches[namespace] = self
+
+    @property
+    def generation_key(self) -> str:
+        return f"cache:{self.namespace}:gen"
+
+    def _redis_key(self, generation: int, key: Any) -> str:
+        return f"cache:{self.namespace}:{generation}:{key}"
+
+    def _generation_is_fresh(self) -> bool:
+        return time.monotonic() - self._generation_checked_at < settings.CACHE_GENERATION_CHECK_INTERVAL
+
+    def _set_generation(self, generation: int) -> None:
+        self._generation = int(generation)
+        self._generation_checked_at = time.monotonic()
+
+    def _local_get(self, key: Any) -> Any:
+        if not self._generation_is_fresh():
+            self._set_generation(redis_client.get(self.generation_key) or 0)
+        return self.local.get((self._generation, key), _MISSING)
+
+    async def _alocal_get(self, key: Any) -> Any:
+        if not self._generation_is_fresh():
+            self._set_generation(await get_async_redis().get(self.generation_key) or 0)
+        return self.local.get((self._generation, key), _MISSING)
+
+    def _local_set(self, generation: int, key: Any, value: Any) -> None:
+        # Значение прошлого поколения в LRU не кладем: его уже никто не должен читать.
+        # Поколение в Redis меньше известного только после очистки Redis — тогда
+        # следующее чтение перечитает его
+        if generation < self._generation:
+            self._generation_checked_at = -math.inf
+            return
+        self._set_generation(generation)
+        self.local.set((generation, key), value)
+
+    def _parse(self, generation: int, payload: Optional[str], ttl_ms: int) -> Tuple[int, Any, int, int]:
+        if payload is None:
+            return generation, _MISSING, 0, ttl_ms
+        # Значение хранится вместе с временем его расчета: "<мс>|<json>"
+        compute_ms, _, body = payload.partition("|")
+        return generation, self.adapter.validate_json(body), int(compute_ms), ttl_ms
+
+    def _read(self, key: Any) -> Tuple[int, Any, int, int]:
+        """Читает значение из Redis: (поколение, значение или _MISSING, время расчета в мс, TTL в мс)."""
+        return self._parse(*_get_versioned(keys=[self.generation_key], args=[self.namespace, key]))
+
+    async def _aread(self, key: Any) -> Tuple[int, Any, int, int]:
+        return self._parse(*await _aget_versioned(
+            keys=[self.generation_key], args=[self.namespace, key], client=get_async_redis()
+        ))
+
+    def _payload(self, value: Any, compute_ms: int) -> bytes:
+        return f"{compute_ms}|".encode() + self.adapter.dump_json(value)
+
+    def _store(self, key: Any, generation: int, value: Any, compute_ms: int) -> None:
+        # Если поколение успело смениться, запись под старым номером просто никто не прочитает
+        redis_client.set(self._redis_key(generation, key), self._payload(value, compute_ms), ex=self.ttl)
+        self._local_set(generation, key, value)
+
+    async def _astore(self, key: Any, generation: int, value: Any, compute_ms: int) -> None:
+        await get_async_redis().set(self._redis_key(generation, key), self._payload(value, compute_ms), ex=self.ttl)
+        self._local_set(generation, key, value)
+
+    def _compute(self, key: Any, generation: int, loader: Callable[[], Any]) -> Optional[T]:
+        started = time.monotonic()
+        db_object = loader()
+        if db_object is None:
+            return None
+        value = self.adapter.validate_python(db_object, from_attributes=True)
+        self._store(key, generation, value, int((time.monotonic() - started) * 1000))
+        return value
+
+    def _lock_name(self, key: Any) -> str:
+        return f"lock:cache:{self.namespace}:{key}"
+
+    def _lock(self, key: Any):
+        return redis_client.lock(self._lock_name(key), timeout=settings.CACHE_LOCK_TIMEOUT)
+
+    def _alock(self, key: Any):
+        return get_async_redis().lock(self._lock_name(key), timeout=settings.CACHE_LOCK_TIMEOUT)
+
+    def _compute_exclusive(self, key: Any, generation: int, loader: Callable[[], Any]) -> Any:
+        """Пересчитывает значение, если удалось взять блокировку; иначе возвращает _MISSING."""
+        lock = self._lock(key)
+        if not lock.acquire(blocking=False):
+            return _MISSING
+        try:
+            return self._compute(key, generation, loader)
+        finally:
+            # Блокировка могла истечь, если загрузка заняла больше CACHE_LOCK_TIMEOUT
+            with suppress(LockError):
+                lock.release()
+
+    def get(self, key: Any, loader: Callable[[], Any]) -> Optional[T]:
+        """Возвращает объект из кэша или загружает его через loader."""
+        value = self._local_get(key)
+        if value is not _MISSING:
+            self.local_hits += 1
+            return value
+
+        generation, value, compute_ms, ttl_ms = self._read(key)
+        if value is not _MISSING:
+            self.redis_hits += 1
+            if _should_refresh_early(compute_ms, ttl_ms):
+                refreshed = self._compute_exclusive(key, generation, loader)
+                if refreshed is not _MISSING:
+                    return refreshed
+            self._local_set(generation, key, value)
+            return value
+
+        self.misses += 1
+        value = self._compute_exclusive(key, generation, loader)
+        if value is not _MISSING:
+            return value
+
+        # Значение уже загружает другой воркер — ждем его результат. Если блокировка
+        # снята, а значения нет (объект не найден), загружаем сами
+        lock = self._lock(key)
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            generation, value, _, _ = self._read(key)
+            if value is not _MISSING:
+                self._local_set(generation, key, value)
+                return value
+            if not lock.locked():
+                break
+        return self._compute(key, generation, loader)
+
+    async def _acompute(self, key: Any, generation: int, loader: Callable[[], Awaitable[Any]]) -> Optional[T]:
+        started = time.monotonic()
+        db_object = await loader()
+        if db_object is None:
+            return None
+        value = self.adapter.validate_python(db_object, from_attributes=True)
+        await self._astore(key, generation, value, int((time.monotonic() - started) * 1000))
+        return value
+
+    async def _acompute_exclusive(self, key: Any, generation: int, loader: Callable[[], Awaitable[Any]]) -> Any:
+        lock = self._alock(key)
+        if not await lock.acquire(blocking=False):
+            return _MISSING
+        try:
+            return await self._acompute(key, generation, loader)
+        finally:
+            with suppress(LockError):
+                await lock.release()
+
+    async def aget(self, key: Any, loader: Callable[[], Awaitable[Any]]) -> Optional[T]:
+        """Асинхронный вариант get для loader-корутин.
+
+        Попадание в LRU не обращается к Redis; Redis и БД читаются асинхронными
+        клиентами, не занимая потоки из пула.
+        """
+        value = await self._alocal_get(key)
+        if value is not _MISSING:
+            self.local_hits += 1
+            return value
+
+        generation, value, compute_ms, ttl_ms = await self._aread(key)
+        if value is not _MISSING:
+            self.redis_hits += 1
+            if _should_refresh_early(compute_ms, ttl_ms):
+                refreshed = await self._acompute_exclusive(key, generation, loader)
+                if refreshed is not _MISSING:
+                    return refreshed
+            self._local_set(generation, key, value)
+            return value
+
+        self.misses += 1
+        value = await self._acompute_exclusive(key, generation, loader)
+        if value is not _MISSING:
+            return value
+
+        lock = self._alock(key)
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            generation, value, _, _ = await self._aread(key)
+            if value is not _MISSING:
+                self._local_set(generation, key, value)
+                return value
+            if not await lock.locked():
+                break
+        return await self._acompute(key, generation, loader)
+
+    def invalidate(self, key: Any) -> None:
+        """Удаляет объект из обоих уровней кэша."""
+        self.local.delete((self._generation, key))
+        _delete_versioned(keys=[self.generation_key], args=[self.namespace, key])
+
+    def invalidate_all(self) -> int:
+        """Инвалидирует все пространство имен сменой поколения; возвращает новое поколение."""
+        self.local.clear()
+        generation = redis_client.incr(self.generation_key)
+        self._set_generation(generation)
+        return generation
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.local_hits + self.redis_hits) / lookups if lookups else None,
+            "local_size": len(self.local),
+            "local_maxsize": self.local.maxsize,
+        }
+
+
+def _should_refresh_early(compute_ms: int, ttl_ms: int) -> bool:
+    """Решает, обновить ли значение до истечения TTL (алгоритм XFetch)."""
+    if ttl_ms <= 0 or compute_ms <= 0:
+        return False
+    return -compute_ms * settings.CACHE_EARLY_REFRESH_BETA * math.log(1.0 - random.random()) >= ttl_ms
+
+
+_caches: Dict[str, ReadThroughCache] = {}
+
+
+def get_cache(namespace: str) -> Optional[ReadThroughCache]:
+    """Возвращает read-through кэш по имени пространства имен."""
+    return _caches.get(namespace)
+
+
+def get_cache_namespaces() -> List[str]:
+    return sorted(_caches)
+
+
+def get_read_through_stats() -> Dict[str, Dict[str, Any]]:
+    """Счетчики попаданий и промахов всех read-through кэшей процесса."""
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
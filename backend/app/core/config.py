@@ -1,6 +1,21 @@
+import asyncio
 import redis
+import redis.asyncio
+from threading import Lock
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
+
+
+def to_async_url(url: str) -> str:
+    """URL с асинхронным драйвером: asyncpg для PostgreSQL, aiosqlite для SQLite."""
+    for sync_prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
 
 
 class Settings(BaseSettings):
@@ -15,6 +30,28 @@ class Settings(BaseSettings):
     DATABASE_HOST: str = "db"
     DATABASE_PORT: int = 5432
     DATABASE_URL: Optional[str] = None
+    # Асинхронный драйвер; по умолчанию выводится из database_url (asyncpg / aiosqlite)
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Пул соединений на процесс для каждого движка (sync и async) FastAPI. pre-ping
+    # проверяет соединение перед выдачей, recycle пересоздает соединения старше N секунд
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Отдельный небольшой пул Flask, чтобы он не занимал соединения API
+    FLASK_DB_POOL_SIZE: int = 2
+    FLASK_DB_MAX_OVERFLOW: int = 3
+
+    # Реплики только для чтения (URL через запятую). Чтение идет на реплику, если ее
+    # отставание не больше REPLICA_MAX_LAG секунд; отставание замеряется не чаще раза
+    # в REPLICA_LAG_CHECK_INTERVAL секунд. После своей записи клиент
+    # READ_YOUR_WRITES_SECONDS секунд читает с основной БД
+    DATABASE_REPLICA_URLS: Optional[str] = None
+    REPLICA_MAX_LAG: float = 5.0
+    REPLICA_LAG_CHECK_INTERVAL: float = 1.0
+    READ_YOUR_WRITES_SECONDS: int = 10
 
     # Redis
     REDIS_URL: str
@@ -29,6 +66,76 @@ class Settings(BaseSettings):
     # Media files
     MEDIA_ROOT: str = "/app/media"
     RESPONSES_MEDIA_DIR: str = "responses"
+    # Максимальный размер загружаемого изображения и размер блока при записи на диск
+    MAX_UPLOAD_SIZE: int = 25 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+
+    # Фоновые задачи (интервал в секундах, 0 — задача отключена)
+    VOTE_RECONCILE_INTERVAL: int = 300
+    HOT_REBUILD_INTERVAL: int = 600
+    VOTE_BUFFER_FLUSH_INTERVAL: int = 1
+    TOP_RESPONSES_INTERVAL: int = 300
+    TOP_RESPONSES_FULL_INTERVAL: int = 86400
+
+    # Прием голосов: "sync" — запись в БД в запросе, "buffered" — через буфер в Redis
+    VOTE_INGESTION_MODE: str = "sync"
+    VOTE_BUFFER_BATCH_SIZE: int = 1000
+
+    # "Горячий" рейтинг учитывает ответы за последние N дней
+    HOT_WINDOW_DAYS: int = 7
+
+    # Read-through кэш заданий и ответов (TTL в секундах)
+    CACHE_LOCAL_MAXSIZE: int = 1024
+    CACHE_LOCAL_TTL: int = 5
+    # Как часто процесс перечитывает поколение пространства имен, чтобы сброс
+    # через invalidate_all дошел до его LRU
+    CACHE_GENERATION_CHECK_INTERVAL: float = 1.0
+    TASK_CACHE_TTL: int = 3600
+    RESPONSE_CACHE_TTL: int = 300
+    GALLERY_CACHE_TTL: int = 300
+    STATS_CACHE_TTL: int = 10
+    # Точный пересчет счетчиков статистики; для таблиц больше STATS_ESTIMATE_MIN_ROWS
+    # строк в PostgreSQL берется оценка планировщика (0 — всегда точный COUNT)
+    STATS_RECONCILE_INTERVAL: int = 3600
+    STATS_ESTIMATE_MIN_ROWS: int = 0
+
+    # Защита от одновременного пересчета: блокировка на пересчет одного значения,
+    # сколько остальные ждут результат и насколько рано обновлять значение до истечения TTL
+    CACHE_LOCK_TIMEOUT: int = 30
+    CACHE_LOCK_WAIT: float = 2.0
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+
+    # /cache/stats: сколько ключей просматривать за запрос и сколько ключей
+    # каждого пространства имен замерять через MEMORY USAGE
+    CACHE_STATS_SCAN_LIMIT: int = 10000
+    CACHE_STATS_SCAN_COUNT: int = 1000
+    CACHE_STATS_MEMORY_SAMPLES: int = 3
+
+    # Сколько ответов хранить в материализованных топах за день/неделю/все время
+    TOP_RESPONSES_LIMIT: int = 100
+
+    # Индекс тегов в Redis: полная перестройка из БД и сколько совпадений по префиксу
+    # сортировать по популярности при автодополнении
+    TAG_INDEX_REBUILD_INTERVAL: int = 86400
+    TAG_AUTOCOMPLETE_CANDIDATES: int = 100
+
+    # Рекомендации заданий: сколько соседей хранить для каждого задания, пересчет
+    # заданий с новой активностью и полный пересчет матрицы
+    RECOMMENDATION_NEIGHBORS: int = 50
+    RECOMMENDATION_INTERVAL: int = 900
+    RECOMMENDATION_FULL_INTERVAL: int = 86400
+
+    # Похожие ответы: сколько соседей хранить и как часто индексировать новые ответы
+    SIMILAR_RESPONSES_NEIGHBORS: int = 20
+    SIMILAR_RESPONSES_INTERVAL: int = 60
+    # Каталог с копией векторов ответов для memmap; локальный диск сервера фоновых задач
+    SIMILAR_VECTORS_DIR: str = "/app/data/similar"
+
+    # Лента подписок: сколько ответов хранить в ленте, с какого числа подписчиков
+    # ответы автора не рассылаются, а подмешиваются при чтении, и полная перестройка
+    FEED_MAX_LENGTH: int = 800
+    FEED_FANOUT_MAX_FOLLOWERS: int = 10000
+    FEED_REBUILD_INTERVAL: int = 86400
 
     @property
     def database_url(self) -> str:
@@ -36,6 +143,18 @@ class Settings(BaseSettings):
             return self.DATABASE_URL
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def async_database_url(self) -> str:
+        if self.ASYNC_DATABASE_URL:
+            return self.ASYNC_DATABASE_URL
+        return to_async_url(self.database_url)
+
+    @property
+    def replica_database_urls(self) -> List[str]:
+        if not self.DATABASE_REPLICA_URLS:
+            return []
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
     class Config:
         env_file = ".env"
 
@@ -43,4 +162,24 @@ class Settings(BaseSettings):
 settings = Settings()
 
 # Инициализация Redis клиента
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
\ No newline at end of file
+redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Асинхронные клиенты Redis по event loop: соединения redis.asyncio работают
+# только в том loop, где открыты. В воркере uvicorn loop один
+_async_redis_clients: Dict[asyncio.AbstractEventLoop, redis.asyncio.Redis] = {}
+_async_redis_lock = Lock()
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Асинхронный клиент Redis для текущего event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_redis_clients.get(loop)
+    if client is not None:
+        return client
+    with _async_redis_lock:
+        for closed_loop in [other for other in _async_redis_clients if other.is_closed()]:
+            del _async_redis_clients[closed_loop]
+        client = _async_redis_clients.setdefault(
+            loop, redis.asyncio.from_url(settings.REDIS_URL, decode_responses=True)
+        )
+    return client
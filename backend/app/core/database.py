@@ -1,9 +1,64 @@
+from typing import Tuple
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
-from app.core.config import settings
+from app.core.config import settings, to_async_url
+from app.core.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument
 
-engine = create_engine(settings.database_url)
+def _pool_options(pool_size: int, max_overflow: int) -> dict:
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+# Синхронный путь: Alembic, фоновые задачи и оставшиеся sync-эндпоинты
+engine = create_engine(
+    settings.database_url,
+    poolclass=InstrumentedQueuePool,
+    **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument("sync", engine)
+
+# Асинхронный путь для async-эндпоинтов: запрос не держит поток, пока ждет БД.
+# expire_on_commit=False — после commit атрибуты читаются без ленивой загрузки,
+# которая в AsyncSession недоступна
+async_engine = create_async_engine(
+    settings.async_database_url,
+    poolclass=InstrumentedAsyncQueuePool,
+    **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+instrument("async", async_engine.sync_engine)
+
+# Flask работает со своим пулом и не может занять все соединения API
+flask_engine = create_engine(
+    settings.database_url,
+    poolclass=InstrumentedQueuePool,
+    **_pool_options(settings.FLASK_DB_POOL_SIZE, settings.FLASK_DB_MAX_OVERFLOW)
+)
+FlaskSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=flask_engine)
+instrument("flask", flask_engine)
+
+def create_replica_engines(name: str, url: str) -> Tuple[Engine, AsyncEngine]:
+    """Создает sync- и async-движок реплики с тем же размером пула, что у основной БД."""
+    replica_engine = create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+    )
+    instrument(name, replica_engine)
+    replica_async_engine = create_async_engine(
+        to_async_url(url),
+        poolclass=InstrumentedAsyncQueuePool,
+        **_pool_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+    )
+    instrument(f"{name}-async", replica_async_engine.sync_engine)
+    return replica_engine, replica_async_engine
 
 Base = declarative_base()
 
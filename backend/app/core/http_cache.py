@@ -0,0 +1,103 @@
+"""Условные HTTP-запросы: ETag, Last-Modified и ответы 304 Not Modified."""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+# Задания не меняются после создания
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Изменяемые данные: клиент и nginx хранят копию, но каждый раз проверяют ее по ETag
+REVALIDATE = "no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Слабый ETag из версии данных: id, счетчиков, времени изменения."""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Слабый ETag из хеша уже сериализованного тела ответа."""
+    return f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+def _strip_weak(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Есть ли etag среди конкретных тегов If-None-Match; "*" не учитывается.
+
+    "*" совпадает с любым существующим ресурсом, поэтому без проверки
+    существования по нему нельзя отвечать 304.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    # Для GET сравнение слабое: W/"x" совпадает с "x"
+    return _strip_weak(etag) in {_strip_weak(tag) for tag in if_none_match.split(",")}
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Проверяет If-None-Match, а без него If-Modified-Since (RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag_matches(request, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # Last-Modified передается с точностью до секунды
+    return last_modified.replace(microsecond=0) <= since
+
+
+def _validator_headers(etag: str, cache_control: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+def set_validators(response: Response, etag: str, cache_control: str, last_modified: Optional[datetime] = None) -> None:
+    """Добавляет ETag, Cache-Control и Last-Modified к ответу эндпоинта."""
+    response.headers.update(_validator_headers(etag, cache_control, last_modified))
+
+
+def not_modified(etag: str, cache_control: str, last_modified: Optional[datetime] = None) -> Response:
+    """Ответ 304 без тела с теми же валидаторами."""
+    return Response(status_code=304, headers=_validator_headers(etag, cache_control, last_modified))
+
+
+def conditional_json(
+    request: Request,
+    adapter: TypeAdapter,
+    payload: Any,
+    cache_control: str = REVALIDATE,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Сериализует payload один раз, ставит ETag по хешу тела и отвечает 304 при совпадении.
+
+    Используется там, где нет дешевой версии данных и ETag можно получить
+    только из содержимого ответа.
+    """
+    body = adapter.dump_json(adapter.validate_python(payload, from_attributes=True))
+    etag = body_etag(body)
+    headers = {**(headers or {}), **_validator_headers(etag, cache_control, None)}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
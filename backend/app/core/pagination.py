@@ -0,0 +1,57 @@
+"""Keyset-пагинация по (created_at, id) с непрозрачным курсором."""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from sqlalchemy import Select, func, tuple_
+
+# Заголовок с курсором следующей страницы; тело ответа остается списком
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Разбирает курсор; некорректный курсор — ошибка 400."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(payload)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _sort_value(value: Any, dialect_name: str) -> Any:
+    # SQLite хранит DateTime строкой, и значения с микросекундами и без них
+    # (server_default и значения из Python) сравниваются как строки неверно
+    if dialect_name == "sqlite":
+        return func.datetime(value)
+    return value
+
+
+def keyset_page(stmt: Select, model: Any, dialect_name: str, cursor: Optional[str], limit: int) -> Select:
+    """Добавляет к запросу условие "после курсора", сортировку и лимит.
+
+    Выбирается limit + 1 строк: лишняя строка показывает, есть ли следующая страница.
+    """
+    created_at = _sort_value(model.created_at, dialect_name)
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(created_at, model.id) > tuple_(_sort_value(cursor_created_at, dialect_name), cursor_id)
+        )
+    return stmt.order_by(created_at, model.id).limit(limit + 1)
+
+
+def split_page(rows: Sequence[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """Отрезает лишнюю строку и возвращает (страница, курсор следующей страницы или None)."""
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,105 @@
+"""Пулы соединений с БД, которые собирают метрики ожидания и загрузки."""
+import time
+from threading import Lock
+from typing import Any, Dict
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Границы гистограммы времени получения соединения, мс
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+
+class PoolMetrics:
+    """Счетчики одного пула в текущем процессе."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._lock = Lock()
+
+    def observe_wait(self, seconds: float, timed_out: bool = False) -> None:
+        ms = seconds * 1000
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.wait_buckets[bucket] += 1
+
+    def snapshot(self, pool: QueuePool) -> Dict[str, Any]:
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": checked_out,
+                "checked_in": pool.checkedin(),
+                # overflow() отсчитывается от -pool_size, пока пул не заполнен
+                "overflow": max(pool.overflow(), 0),
+                "utilization": checked_out / capacity if capacity > 0 else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": self.wait_total * 1000 / attempts if attempts else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+                "wait_histogram_ms": {
+                    **{f"<={bound}": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)},
+                    f">{WAIT_BUCKETS_MS[-1]}": self.wait_buckets[-1],
+                },
+            }
+
+
+class InstrumentedPoolMixin:
+    """Замеряет время получения соединения: ожидание свободного места или установку нового."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.observe_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() создает новый пул того же класса — метрики переходят к нему
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_engines: Dict[str, Engine] = {}
+
+
+def instrument(name: str, engine: Engine) -> None:
+    """Подключает счетчики к пулу движка и регистрирует его в статистике процесса.
+
+    Для AsyncEngine передается его sync_engine.
+    """
+    engine.pool.metrics = PoolMetrics(name)
+    _engines[name] = engine
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Метрики пулов всех зарегистрированных движков текущего процесса."""
+    return {name: engine.pool.metrics.snapshot(engine.pool) for name, engine in _engines.items()}
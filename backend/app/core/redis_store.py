@@ -0,0 +1,208 @@
+"""Пакетный доступ к Redis: несколько команд за один сетевой проход."""
+import time
+from collections import Counter, defaultdict
+from contextlib import suppress
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from redis.asyncio.client import Pipeline as AsyncPipeline
+from redis.client import Pipeline
+from redis.commands.core import AsyncScript, Script
+from redis.exceptions import LockError
+from sqlalchemy.orm import Session
+from app.core.config import get_async_redis, redis_client, settings
+
+# Добавляет элементы в sorted set, только если он уже существует
+ZADD_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+return redis.call('ZADD', KEYS[1], unpack(ARGV))
+"""
+
+# Увеличивает поля хеша, только если он уже существует; ARGV — пары поле, приращение
+HINCRBY_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+for i = 1, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+_zadd_if_exists = redis_client.register_script(ZADD_IF_EXISTS_SCRIPT)
+_hincrby_if_exists = redis_client.register_script(HINCRBY_IF_EXISTS_SCRIPT)
+
+
+def pipeline(transaction: bool = False) -> Pipeline:
+    """Создает pipeline; по умолчанию без MULTI/EXEC, только для экономии round trip."""
+    return redis_client.pipeline(transaction=transaction)
+
+
+def async_pipeline(transaction: bool = False) -> AsyncPipeline:
+    """Pipeline асинхронного клиента; команды добавляются так же, выполняется через await execute()."""
+    return get_async_redis().pipeline(transaction=transaction)
+
+
+def register_async_script(script: str) -> AsyncScript:
+    """Lua-скрипт для асинхронного клиента; вызывается с client=get_async_redis().
+
+    Клиент у каждого event loop свой, поэтому скрипт к клиенту не привязан.
+    """
+    return AsyncScript(None, script.encode())
+
+
+def run_script(script: Script, keys: Sequence[Any], args: Sequence[Any], pipe=None) -> Any:
+    """Выполняет скрипт сразу или добавляет его в pipeline, в том числе асинхронный."""
+    if isinstance(pipe, AsyncPipeline):
+        # Pipeline сам загрузит скрипт перед выполнением, если Redis его не знает
+        pipe.scripts.add(script)
+        return pipe.evalsha(script.sha, len(keys), *keys, *args)
+    return script(keys=keys, args=args, client=pipe or redis_client)
+
+
+def hmget_many(keys: Sequence[str], *fields: str) -> List[List[Optional[str]]]:
+    """Читает одни и те же поля из нескольких хешей за один round trip."""
+    if not keys:
+        return []
+    pipe = pipeline()
+    for key in keys:
+        pipe.hmget(key, *fields)
+    return pipe.execute()
+
+
+def hset_many(mappings: Dict[str, Dict[str, Any]]) -> None:
+    """Записывает поля в несколько хешей за один round trip."""
+    if not mappings:
+        return
+    pipe = pipeline()
+    for key, mapping in mappings.items():
+        pipe.hset(key, mapping=mapping)
+    pipe.execute()
+
+
+def zrevrange_if_exists(key: str, start: int, stop: int, withscores: bool = False) -> Optional[list]:
+    """Читает диапазон sorted set по убыванию; None, если ключа нет.
+
+    Проверка существования и чтение выполняются атомарно за один round trip.
+    """
+    pipe = pipeline(transaction=True)
+    pipe.exists(key)
+    pipe.zrevrange(key, start, stop, withscores=withscores)
+    exists, items = pipe.execute()
+    return items if exists else None
+
+
+def zadd_if_exists(key: str, mapping: Dict[Any, float], pipe: Optional[Pipeline] = None) -> Any:
+    """Добавляет элементы в sorted set, только если он уже построен.
+
+    Если передан pipe, команда добавляется в него и выполнится вместе с остальными.
+    """
+    args = []
+    for member, score in mapping.items():
+        args.extend([score, member])
+    return run_script(_zadd_if_exists, [key], args, pipe)
+
+
+def hincrby_if_exists(key: str, deltas: Dict[str, int], pipe: Optional[Pipeline] = None) -> Any:
+    """Увеличивает поля хеша, только если он уже заполнен.
+
+    Иначе частично созданный хеш выглядел бы как настоящие значения.
+    Если передан pipe, команда добавляется в него.
+    """
+    args = []
+    for field, delta in deltas.items():
+        args.extend([field, delta])
+    return run_script(_hincrby_if_exists, [key], args, pipe)
+
+
+def read_or_rebuild(
+    db: Session,
+    key: str,
+    read: Callable[[], Optional[list]],
+    rebuild: Callable[[Session], int],
+    fallback: Callable[[], list]
+) -> list:
+    """Читает индекс из Redis; если его нет, перестраивает его только один воркер.
+
+    Остальные запросы ждут перестройки до CACHE_LOCK_WAIT секунд, а затем
+    отвечают приближенным результатом из БД, не запуская свою перестройку.
+    """
+    items = read()
+    if items is not None:
+        return items
+
+    lock = redis_client.lock(f"lock:{key}", timeout=settings.CACHE_LOCK_TIMEOUT)
+    if lock.acquire(blocking=False):
+        try:
+            rebuild(db)
+        finally:
+            with suppress(LockError):
+                lock.release()
+        return read() or []
+
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        items = read()
+        if items is not None:
+            return items
+        if not lock.locked():
+            break
+    return fallback()
+
+
+def key_namespace(key: str) -> str:
+    """Пространство имен ключа: "response:1" -> "response", "cache:tasks:1" -> "cache:tasks"."""
+    parts = key.split(":")
+    if len(parts) > 2:
+        return ":".join(parts[:2])
+    return parts[0]
+
+
+def scan_namespaces(cursor: int = 0, max_keys: int = 10000, count: int = 1000, memory_samples: int = 3) -> Dict[str, Any]:
+    """Считает ключи по пространствам имен через SCAN, не блокируя Redis.
+
+    За вызов просматривается не больше max_keys ключей; если обход не закончен,
+    возвращается cursor, с которого его можно продолжить. Память оценивается
+    по MEMORY USAGE нескольких первых ключей каждого пространства имен.
+    """
+    counts: Counter = Counter()
+    samples: Dict[str, List[str]] = defaultdict(list)
+    scanned = 0
+    while True:
+        cursor, keys = redis_client.scan(cursor=cursor, count=count)
+        for key in keys:
+            namespace = key_namespace(key)
+            counts[namespace] += 1
+            if len(samples[namespace]) < memory_samples:
+                samples[namespace].append(key)
+        scanned += len(keys)
+        if cursor == 0 or scanned >= max_keys:
+            break
+
+    pipe = pipeline()
+    sampled = [(namespace, key) for namespace, keys in samples.items() for key in keys]
+    for _, key in sampled:
+        pipe.memory_usage(key)
+    usage: Dict[str, List[int]] = defaultdict(list)
+    for (namespace, _), size in zip(sampled, pipe.execute() if sampled else []):
+        if size is not None:
+            usage[namespace].append(size)
+
+    namespaces = {}
+    for namespace, keys_count in counts.most_common():
+        sizes = usage.get(namespace)
+        avg_bytes = sum(sizes) / len(sizes) if sizes else None
+        namespaces[namespace] = {
+            "keys": keys_count,
+            "sampled_keys": len(sizes) if sizes else 0,
+            "avg_key_bytes": avg_bytes,
+            "estimated_bytes": int(avg_bytes * keys_count) if avg_bytes is not None else None,
+        }
+
+    return {
+        "namespaces": namespaces,
+        "scanned_keys": scanned,
+        "cursor": cursor,
+        "complete": cursor == 0,
+    }
@@ -0,0 +1,124 @@
+"""Маршрутизация чтения на реплики с учетом отставания и read-your-writes."""
+import itertools
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import create_replica_engines
+
+logger = logging.getLogger(__name__)
+
+# Время (unix), до которого клиент после своей записи читает с основной БД
+READ_YOUR_WRITES_COOKIE = "mutil_primary_until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Отставание реплики PostgreSQL в секундах. Если все полученное WAL уже применено,
+# реплика догнала основную БД, даже если последняя транзакция была давно
+POSTGRES_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+class Replica:
+    """Реплика только для чтения: движки, фабрики сессий и последнее замеренное отставание."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine, self.async_engine = create_replica_engines(name, url)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_session_factory = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+
+    def measure_lag(self) -> float:
+        with self.engine.connect() as connection:
+            if connection.dialect.name != "postgresql":
+                # У SQLite и других тестовых баз репликации нет
+                return 0.0
+            return float(connection.execute(text(POSTGRES_LAG_SQL)).scalar())
+
+    def needs_check(self) -> bool:
+        return time.monotonic() - self.checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL
+
+    def check_lag(self) -> float:
+        """Замеряет отставание; недоступная реплика считается бесконечно отставшей."""
+        try:
+            self.lag = self.measure_lag()
+        except Exception:
+            logger.warning("Реплика %s недоступна", self.name, exc_info=True)
+            self.lag = float("inf")
+        self.checked_at = time.monotonic()
+        return self.lag
+
+    def is_usable(self) -> bool:
+        if self.needs_check():
+            self.check_lag()
+        return self.lag <= settings.REPLICA_MAX_LAG
+
+
+replicas: List[Replica] = [
+    Replica(f"replica{number}", url) for number, url in enumerate(settings.replica_database_urls, start=1)
+]
+_round_robin = itertools.count()
+
+
+def reads_own_writes(request: Request) -> bool:
+    """Клиент недавно писал сам, и реплика может еще не видеть его запись."""
+    value = request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    try:
+        return value is not None and float(value) > time.time()
+    except ValueError:
+        return False
+
+
+def choose_replica(request: Request) -> Optional[Replica]:
+    """Выбирает реплику по кругу среди не отстающих; None — читать с основной БД."""
+    if not replicas or reads_own_writes(request):
+        return None
+    usable = [replica for replica in replicas if replica.is_usable()]
+    if not usable:
+        return None
+    return usable[next(_round_robin) % len(usable)]
+
+
+async def choose_replica_async(request: Request) -> Optional[Replica]:
+    """То же, что choose_replica; замер отставания выполняется вне event loop."""
+    if any(replica.needs_check() for replica in replicas):
+        return await run_in_threadpool(choose_replica, request)
+    return choose_replica(request)
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    """После успешного изменяющего запроса клиент какое-то время читает с основной БД."""
+    response = await call_next(request)
+    if replicas and request.method not in SAFE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            str(time.time() + settings.READ_YOUR_WRITES_SECONDS),
+            max_age=settings.READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+
+def get_replica_status() -> Dict[str, Dict[str, Any]]:
+    """Последнее замеренное отставание реплик текущего процесса."""
+    return {
+        replica.name: {
+            "available": replica.lag is None or math.isfinite(replica.lag),
+            "lag_seconds": replica.lag if replica.lag is None or math.isfinite(replica.lag) else None,
+            "usable": replica.lag is not None and replica.lag <= settings.REPLICA_MAX_LAG,
+        }
+        for replica in replicas
+    }
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import redis_client
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    name: str
+    interval: float
+    func: Callable[[Session], Any]
+
+
+_jobs: Dict[str, Job] = {}
+_running: List[asyncio.Task] = []
+
+
+def register_job(name: str, interval: float, func: Callable[[Session], Any]) -> None:
+    """Регистрирует периодическую задачу. Интервал <= 0 отключает ее запуск по расписанию."""
+    _jobs[name] = Job(name=name, interval=interval, func=func)
+
+
+def get_jobs() -> Dict[str, Job]:
+    """Возвращает зарегистрированные задачи."""
+    return dict(_jobs)
+
+
+def run_job(name: str) -> Any:
+    """Выполняет задачу один раз в отдельной сессии БД."""
+    job = _jobs[name]
+    db = SessionLocal()
+    try:
+        return job.func(db)
+    finally:
+        db.close()
+
+
+def _run_job_exclusive(job: Job) -> None:
+    # Несколько воркеров запускают одни и те же задачи — выполняет тот, кто взял блокировку
+    lock = redis_client.lock(f"jobs:{job.name}", timeout=max(job.interval, 60))
+    if not lock.acquire(blocking=False):
+        return
+    try:
+        result = run_job(job.name)
+        logger.info("Задача %s выполнена: %s", job.name, result)
+    finally:
+        lock.release()
+
+
+async def _run_periodically(job: Job) -> None:
+    while True:
+        await asyncio.sleep(job.interval)
+        try:
+            await run_in_threadpool(_run_job_exclusive, job)
+        except Exception:
+            logger.exception("Ошибка при выполнении задачи %s", job.name)
+
+
+async def start() -> None:
+    """Запускает все задачи с положительным интервалом."""
+    for job in _jobs.values():
+        if job.interval > 0:
+            _running.append(asyncio.create_task(_run_periodically(job)))
+
+
+async def stop() -> None:
+    """Останавливает запущенные задачи."""
+    for task in _running:
+        task.cancel()
+    await asyncio.gather(*_running, return_exceptions=True)
+    _running.clear()
@@ -1,7 +1,5 @@
 from flask import Flask
 from app.core.config import settings
-from app.core.database import engine
-from app.models.models import Base
 
 def create_flask_app():
     app = Flask(__name__)
@@ -13,8 +11,4 @@ def create_flask_app():
     from app.flask_app import routes
     app.register_blueprint(routes.bp)
     
-    # Создание таблиц 
-    with app.app_context():
-        Base.metadata.create_all(bind=engine)
-    
     return app
\ No newline at end of file
@@ -1,15 +1,16 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
-from app.services.task_service import generate_random_task, generate_task_with_ai
-from app.services.response_service import get_responses_for_task, get_response
-from app.services.vote_service import create_vote
+from app.core.database import FlaskSessionLocal
+from app.services.task_service import create_task, generate_random_task, generate_task_with_ai
+from app.services.response_service import create_response, get_responses_for_task, get_response
+from app.services.vote_service import submit_vote
 from app.models.models import Task, Response, Vote
+from app.schemas.schemas import ResponseCreate, TaskCreate, VoteCreate
 
 bp = Blueprint('main', __name__)
 
 def get_db():
-    db = SessionLocal()
+    db = FlaskSessionLocal()
     try:
         yield db
     finally:
@@ -36,10 +37,7 @@ def api_generate_task():
             task_text = generate_random_task()
         
         # Создаем задание в БД
-        task = Task(text=task_text)
-        db.add(task)
-        db.commit()
-        db.refresh(task)
+        task = create_task(db, TaskCreate(text=task_text))
         
         return jsonify({
             'id': task.id,
@@ -80,10 +78,7 @@ def api_create_response():
             return jsonify({'error': 'task_id is required'}), 400
             
         # Создаем ответ в БД
-        response = Response(text=text, task_id=task_id)
-        db.add(response)
-        db.commit()
-        db.refresh(response)
+        response = create_response(db, ResponseCreate(text=text, task_id=task_id))
         
         return jsonify({
             'id': response.id,
@@ -122,15 +117,15 @@ def api_create_vote():
         if not response_id:
             return jsonify({'error': 'response_id is required'}), 400
             
-        # Создаем голос в БД 
-        vote = Vote(response_id=response_id, value=value, user_id=1)
-        db.add(vote)
-        db.commit()
-        db.refresh(vote)
-        
-        # Обновляем рейтинг ответа
-        from app.services.vote_service import update_response_score_cache
-        update_response_score_cache(response_id, db)
+        # Создаем голос в БД (или в буфере) и обновляем рейтинг ответа
+        vote_in = VoteCreate(response_id=response_id, value=value)
+        vote = submit_vote(db, vote_in, user_id=1)
+        if vote is None:
+            return jsonify({
+                'status': 'accepted',
+                'response_id': vote_in.response_id,
+                'value': vote_in.value
+            }), 202
         
         return jsonify({
             'id': vote.id,
@@ -0,0 +1,45 @@
+"""Фоновые задачи приложения.
+
+Задачи выполняются по расписанию внутри FastAPI-воркера, их также можно
+запустить вручную: python -m app.jobs <имя задачи>
+"""
+import argparse
+from app.core import scheduler
+from app.core.config import settings
+from app.services import (
+    analytics_service, feed_service, ranking_service, recommendation_service, response_service, similarity_service,
+    tag_service, vote_service
+)
+
+scheduler.register_job("reconcile-votes", settings.VOTE_RECONCILE_INTERVAL, vote_service.reconcile_response_scores)
+scheduler.register_job("rebuild-hot", settings.HOT_REBUILD_INTERVAL, vote_service.rebuild_hot_rankings)
+scheduler.register_job(
+    "flush-votes",
+    settings.VOTE_BUFFER_FLUSH_INTERVAL if settings.VOTE_INGESTION_MODE == "buffered" else 0,
+    vote_service.flush_vote_buffer
+)
+scheduler.register_job("materialize-top", settings.TOP_RESPONSES_INTERVAL, ranking_service.materialize_top_responses)
+scheduler.register_job("materialize-top-full", settings.TOP_RESPONSES_FULL_INTERVAL, ranking_service.materialize_top_responses_full)
+scheduler.register_job("reconcile-stats", settings.STATS_RECONCILE_INTERVAL, analytics_service.reconcile_platform_stats)
+scheduler.register_job("rebuild-tags", settings.TAG_INDEX_REBUILD_INTERVAL, tag_service.rebuild_tag_index)
+scheduler.register_job("build-recommendations", settings.RECOMMENDATION_INTERVAL, recommendation_service.build_recommendations)
+scheduler.register_job(
+    "build-recommendations-full", settings.RECOMMENDATION_FULL_INTERVAL, recommendation_service.build_recommendations_full
+)
+scheduler.register_job("index-similar-responses", settings.SIMILAR_RESPONSES_INTERVAL, similarity_service.index_new_responses)
+scheduler.register_job("rebuild-feeds", settings.FEED_REBUILD_INTERVAL, feed_service.rebuild_feeds)
+# Только ручной запуск: после миграции и для проверки денормализованных счетчиков
+scheduler.register_job("backfill-aggregates", 0, response_service.backfill_response_aggregates)
+# Только ручной запуск: после смены векторизации похожих ответов
+scheduler.register_job("rebuild-similar-responses", 0, similarity_service.rebuild_similar_responses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запуск фоновых задач MUTIL")
+    parser.add_argument("job", choices=sorted(scheduler.get_jobs()))
+    args = parser.parse_args()
+    print(scheduler.run_job(args.job))
+
+
+if __name__ == "__main__":
+    main()
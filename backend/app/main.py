@@ -4,10 +4,12 @@ from fastapi.staticfiles import StaticFiles
 import os
 from app.core.config import settings
 from app.api.routes import api_router
-from app.core.database import Base, engine
+from app.core import scheduler
+from app.core.replicas import read_your_writes_middleware
+from app import jobs  # регистрирует фоновые задачи
 
-# Создание таблиц в БД 
-Base.metadata.create_all(bind=engine)
+# Схемой БД управляет Alembic (alembic -c alembic/alembic.ini upgrade head),
+# поэтому импорт приложения не выполняет DDL
 
 # FastAPI приложение
 fastapi_app = FastAPI(
@@ -30,20 +32,35 @@ fastapi_app.add_middleware(
 if os.path.exists(settings.MEDIA_ROOT):
     fastapi_app.mount("/media", StaticFiles(directory=settings.MEDIA_ROOT), name="media")
 
+# Ставит cookie, по которой клиент после своей записи читает с основной БД
+fastapi_app.middleware("http")(read_your_writes_middleware)
+
 fastapi_app.include_router(api_router, prefix="/api")
 
+@fastapi_app.on_event("startup")
+async def start_background_jobs():
+    await scheduler.start()
+
+@fastapi_app.on_event("shutdown")
+async def stop_background_jobs():
+    await scheduler.stop()
+
 @fastapi_app.get("/")
 async def root():
     return {"message": "Welcome to MUTIL API"}
 
-# Flask приложение
-from app.flask_app import create_flask_app
-flask_app = create_flask_app()
-
-# Настройка шаблонов для Flask
-from flask import render_template
-flask_app.template_folder = 'app/flask_app/templates'
-flask_app.static_folder = 'app/flask_app/static'  
+# Flask приложение создается при первом обращении к app.main.flask_app,
+# чтобы воркеры FastAPI не импортировали Flask
+def __getattr__(name):
+    if name == "flask_app":
+        from app.flask_app import create_flask_app
+        flask_app = create_flask_app()
+        # Настройка шаблонов для Flask
+        flask_app.template_folder = 'app/flask_app/templates'
+        flask_app.static_folder = 'app/flask_app/static'
+        globals()["flask_app"] = flask_app
+        return flask_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -37,7 +37,12 @@ class Task(Base):
     id = Column(Integer, primary_key=True, index=True)
     text = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    creator_id = Column(Integer, ForeignKey("users.id"))
+    creator_id = Column(Integer, ForeignKey("users.id"), index=True)
+
+    # Keyset-пагинация списков по (created_at, id)
+    __table_args__ = (
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+    )
 
     # Связи
     creator = relationship("User", back_populates="tasks")
@@ -54,8 +59,19 @@ class Response(Base):
     text = Column(Text)
     image_path = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    author_id = Column(Integer, ForeignKey("users.id"))
+    author_id = Column(Integer, ForeignKey("users.id"), index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"))
+    # Денормализованные счетчики, обновляются вместе с голосами и комментариями
+    vote_count = Column(Integer, nullable=False, default=0, server_default="0")
+    score = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_responses_vote_count_id", "vote_count", "id"),
+        Index("ix_responses_score_id", "score", "id"),
+        Index("ix_responses_created_at_id", "created_at", "id"),
+        Index("ix_responses_task_id_created_at_id", "task_id", "created_at", "id"),
+    )
 
     # Связи
     author = relationship("User", back_populates="responses")
@@ -72,9 +88,13 @@ class Comment(Base):
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    author_id = Column(Integer, ForeignKey("users.id"))
+    author_id = Column(Integer, ForeignKey("users.id"), index=True)
     response_id = Column(Integer, ForeignKey("responses.id"))
 
+    __table_args__ = (
+        Index("ix_comments_response_id_created_at_id", "response_id", "created_at", "id"),
+    )
+
     # Связи
     author = relationship("User", back_populates="comments")
     response = relationship("Response", back_populates="comments")
@@ -85,10 +105,16 @@ class Vote(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     value = Column(Integer)  # Например, 1 для голоса "за", -1 для "против"
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     response_id = Column(Integer, ForeignKey("responses.id"))
 
+    __table_args__ = (
+        # Пересчет vote_count/score по ответу читает только индекс
+        Index("ix_votes_response_id_value", "response_id", "value"),
+        Index("ix_votes_user_id_response_id", "user_id", "response_id"),
+    )
+
     # Связи
     user = relationship("User", back_populates="votes")
     response = relationship("Response", back_populates="votes")
@@ -98,21 +124,36 @@ class TopResponse(Base):
     __tablename__ = "top_responses"
 
     id = Column(Integer, primary_key=True, index=True)
-    response_id = Column(Integer, ForeignKey("responses.id"))
+    response_id = Column(Integer, ForeignKey("responses.id"), index=True)
+    period = Column(String, nullable=False, server_default="all")  # day, week, all
+    rank = Column(Integer)
     score = Column(Float, default=0.0)
     calculated_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_top_responses_period_rank", "period", "rank"),
+    )
+
     # Связь
     response = relationship("Response")
 
 
+class ResponseVector(Base):
+    """Вектор хешированных n-грамм текста ответа для поиска похожих ответов."""
+    __tablename__ = "response_vectors"
+
+    response_id = Column(Integer, ForeignKey("responses.id", ondelete="CASCADE"), primary_key=True)
+    # float32, нормированный по длине: скалярное произведение — косинусная близость
+    vector = Column(LargeBinary, nullable=False)
+
+
 class Report(Base):
     __tablename__ = "reports"
 
     id = Column(Integer, primary_key=True, index=True)
-    reporter_id = Column(Integer, ForeignKey("users.id"))
-    response_id = Column(Integer, ForeignKey("responses.id"), nullable=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True)
+    reporter_id = Column(Integer, ForeignKey("users.id"), index=True)
+    response_id = Column(Integer, ForeignKey("responses.id"), nullable=True, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True, index=True)
     reason = Column(String)  # Причина жалобы
     description = Column(Text)  # Дополнительное описание
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -141,7 +182,7 @@ class UserAchievement(Base):
     __tablename__ = "user_achievements"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     achievement_id = Column(Integer, ForeignKey("achievements.id"))
     earned_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -186,7 +227,8 @@ class TaskTag(Base):
     __tablename__ = "task_tags"
 
     task_id = Column(Integer, ForeignKey("tasks.id"), primary_key=True)
-    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+    # Первичный ключ (task_id, tag_id) не помогает искать задания по тегу
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True, index=True)
 
 
 # Система подписок
@@ -195,9 +237,13 @@ class Subscription(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     subscriber_id = Column(Integer, ForeignKey("users.id"))
-    target_user_id = Column(Integer, ForeignKey("users.id"))
+    target_user_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_subscriptions_subscriber_id_target_user_id", "subscriber_id", "target_user_id"),
+    )
+
     # Связи
     subscriber = relationship("User", foreign_keys=[subscriber_id], back_populates="subscriptions_as_subscriber")
     target_user = relationship("User", foreign_keys=[target_user_id], back_populates="subscriptions_as_target")
@@ -220,10 +266,14 @@ class UserBadge(Base):
     __tablename__ = "user_badges"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     badge_id = Column(Integer, ForeignKey("badges.id"))
     earned_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Связи
     user = relationship("User", back_populates="user_badges")
     badge = relationship("Badge", back_populates="user_badges")
+
+
+# Схема полнотекстового поиска создается вместе с таблицами tasks и responses
+from app.models import search  # noqa: E402,F401
@@ -0,0 +1,86 @@
+"""Схема полнотекстового поиска: tsvector и триграммы в PostgreSQL, FTS5 в SQLite.
+
+В рабочей БД ее создает миграция 0006; для таблиц из create_all (тесты,
+локальная разработка) тот же DDL выполняется по событиям метаданных.
+"""
+from typing import List
+from sqlalchemy import event
+from app.core.database import Base
+
+# Таблицы с поиском: таблица -> текстовая колонка
+SEARCHABLE_TABLES = {"tasks": "text", "responses": "text"}
+SEARCH_VECTOR_COLUMN = "search_vector"
+
+
+def fts_table(table: str) -> str:
+    return f"{table}_fts"
+
+
+def search_vector_sql(column: str) -> str:
+    """Выражение tsvector: русская и английская конфигурации вместе."""
+    return (
+        f"to_tsvector('russian', coalesce({column}, '')) || "
+        f"to_tsvector('english', coalesce({column}, ''))"
+    )
+
+
+def postgres_search_ddl(table: str, column: str) -> List[str]:
+    return [
+        f"ALTER TABLE {table} ADD COLUMN {SEARCH_VECTOR_COLUMN} tsvector "
+        f"GENERATED ALWAYS AS ({search_vector_sql(column)}) STORED",
+        f"CREATE INDEX ix_{table}_{SEARCH_VECTOR_COLUMN} ON {table} USING gin ({SEARCH_VECTOR_COLUMN})",
+        f"CREATE INDEX ix_{table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)",
+    ]
+
+
+def sqlite_search_ddl(table: str, column: str) -> List[str]:
+    """FTS5-таблица с внешним содержимым и триггеры, которые держат ее в актуальном состоянии."""
+    fts = fts_table(table)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({column}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {column} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+    ]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_schema(target, connection, tables=(), **kw):
+    created = {table.name for table in tables} & SEARCHABLE_TABLES.keys()
+    if not created:
+        return
+    dialect = connection.dialect.name
+    statements = []
+    if dialect == "postgresql":
+        statements.append("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in created:
+        if dialect == "postgresql":
+            statements += postgres_search_ddl(table, SEARCHABLE_TABLES[table])
+        elif dialect == "sqlite":
+            statements += sqlite_search_ddl(table, SEARCHABLE_TABLES[table])
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def _drop_search_schema(target, connection, tables=(), **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    for table in {table.name for table in tables} & SEARCHABLE_TABLES.keys():
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {fts_table(table)}")
+
+
+def is_search_object(object_, name, type_, reflected, compare_to) -> bool:
+    """Объект поисковой схемы, которого нет в моделях; autogenerate Alembic его пропускает."""
+    if type_ == "column":
+        return name == SEARCH_VECTOR_COLUMN
+    if type_ == "index":
+        return name is not None and (name.endswith(f"_{SEARCH_VECTOR_COLUMN}") or name.endswith("_trgm"))
+    if type_ == "table":
+        return any(name.startswith(fts_table(table)) for table in SEARCHABLE_TABLES)
+    return False
@@ -63,7 +63,7 @@ class VoteCreate(VoteBase):
 class Vote(VoteBase):
     id: int
     created_at: datetime
-    user_id: int
+    user_id: Optional[int] = None
     response_id: int
 
     class Config:
@@ -80,8 +80,11 @@ class TokenData(BaseModel):
 # TopResponse schemas
 class TopResponse(BaseModel):
     response_id: int
+    period: str
+    rank: int
     score: float
     calculated_at: datetime
+    response: Response
 
     class Config:
         from_attributes = True
@@ -95,7 +98,7 @@ class CommentCreate(CommentBase):
 class Comment(CommentBase):
     id: int
     created_at: datetime
-    author_id: int
+    author_id: Optional[int] = None
     response_id: int
 
     class Config:
@@ -113,6 +116,22 @@ class Tag(TagBase):
     class Config:
         from_attributes = True
 
+class TagsAttach(BaseModel):
+    names: List[str] = Field(..., min_length=1, max_length=20)
+
+class TagFacet(BaseModel):
+    name: str
+    count: int
+
+class Subscription(BaseModel):
+    id: int
+    subscriber_id: int
+    target_user_id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 
 #репорты
 class ReportBase(BaseModel):
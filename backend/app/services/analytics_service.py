@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+from redis.client import Pipeline
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from app.models.models import User, Task, Response, Vote
+from app.core.config import redis_client, settings
+from app.core.cache import ReadThroughCache
+from app.core import redis_store
+
+# Счетчики строк основных таблиц: поле hash -> модель
+STATS_COUNTERS_KEY = "stats:counters"
+COUNTED_MODELS = {
+    "users": User,
+    "tasks": Task,
+    "responses": Response,
+    "votes": Vote,
+}
+
+# Активные пользователи: HyperLogLog на каждый час, ~12 КБ на ключ при любом числе пользователей
+ACTIVE_USERS_KEY = "stats:active:{hour}"
+ACTIVE_USERS_WINDOW_HOURS = 24
+
+# Счетчики и HyperLogLog читаются за один round trip, а в памяти процесса
+# статистика живет CACHE_LOCAL_TTL секунд
+stats_cache = ReadThroughCache(
+    "stats",
+    Dict[str, int],
+    ttl=settings.STATS_CACHE_TTL,
+    local_maxsize=1,
+    local_ttl=settings.CACHE_LOCAL_TTL
+)
+
+def _active_users_key(at: datetime) -> str:
+    return ACTIVE_USERS_KEY.format(hour=at.astimezone(timezone.utc).strftime("%Y%m%d%H"))
+
+def increment_counters(pipe: Optional[Pipeline] = None, **deltas: int) -> None:
+    """Увеличивает счетчики строк, например increment_counters(votes=3).
+
+    Если передан pipe, команда выполнится вместе с остальными командами pipeline.
+    """
+    # Пока счетчиков нет, их целиком посчитает reconcile_platform_stats
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        redis_store.hincrby_if_exists(STATS_COUNTERS_KEY, deltas, pipe=pipe)
+
+def track_activity(user_ids: Iterable[Optional[int]], pipe: Optional[Pipeline] = None) -> None:
+    """Отмечает пользователей активными в текущем часе."""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if not user_ids:
+        return
+    key = _active_users_key(datetime.now(timezone.utc))
+    client = pipe if pipe is not None else redis_store.pipeline()
+    client.pfadd(key, *user_ids)
+    client.expire(key, (ACTIVE_USERS_WINDOW_HOURS + 1) * 3600)
+    if pipe is None:
+        client.execute()
+
+def _active_users_keys() -> list:
+    now = datetime.now(timezone.utc)
+    return [_active_users_key(now - timedelta(hours=hours)) for hours in range(ACTIVE_USERS_WINDOW_HOURS)]
+
+def count_rows(db: Session, name: str) -> int:
+    """Количество строк таблицы; для больших таблиц в PostgreSQL — оценка планировщика.
+
+    Оценка из pg_class.reltuples используется, только если она не меньше
+    STATS_ESTIMATE_MIN_ROWS; иначе выполняется точный COUNT(*).
+    """
+    model = COUNTED_MODELS[name]
+    if settings.STATS_ESTIMATE_MIN_ROWS > 0 and db.get_bind().dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": model.__tablename__}
+        ).scalar()
+        if estimate is not None and estimate >= settings.STATS_ESTIMATE_MIN_ROWS:
+            return estimate
+    return db.query(func.count(model.id)).scalar()
+
+def reconcile_platform_stats(db: Session) -> Dict[str, int]:
+    """Пересчитывает счетчики строк по таблицам и записывает их в Redis.
+
+    Записи, сделанные между подсчетом и записью, исправит следующий запуск.
+    """
+    counters = {name: count_rows(db, name) for name in COUNTED_MODELS}
+    redis_client.hset(STATS_COUNTERS_KEY, mapping=counters)
+    return counters
+
+def get_platform_stats(db: Session) -> Dict[str, int]:
+    """Получает статистику платформы из счетчиков в Redis.
+
+    Если счетчиков нет (первый запуск, сброс Redis), они один раз считаются из БД.
+    """
+    pipe = redis_store.pipeline()
+    pipe.hgetall(STATS_COUNTERS_KEY)
+    pipe.pfcount(*_active_users_keys())
+    counters, active_users = pipe.execute()
+    if not counters:
+        counters = reconcile_platform_stats(db)
+
+    stats = {f"total_{name}": int(counters.get(name, 0)) for name in COUNTED_MODELS}
+    stats["active_users_24h"] = active_users
+    return stats
+
+def get_platform_stats_cached(db: Session) -> Dict[str, int]:
+    """Получает статистику платформы через кэш с защитой от одновременного пересчета."""
+    return stats_cache.get("platform", lambda: get_platform_stats(db))
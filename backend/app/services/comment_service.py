@@ -0,0 +1,42 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models.models import Comment, Response
+from app.schemas.schemas import CommentCreate
+from app.core.pagination import keyset_page, split_page
+from app.services.analytics_service import track_activity
+
+def create_comment(db: Session, comment: CommentCreate) -> Comment:
+    """Создает новый комментарий."""
+    db_comment = Comment(**comment.model_dump())
+    db.add(db_comment)
+    # Счетчик комментариев обновляется в той же транзакции, что и комментарий
+    db.query(Response).filter(Response.id == comment.response_id).update(
+        {Response.comment_count: Response.comment_count + 1},
+        synchronize_session=False
+    )
+    db.commit()
+    db.refresh(db_comment)
+    track_activity([db_comment.author_id])
+    return db_comment
+
+def get_comments_for_response(db: Session, response_id: int, skip: int = 0, limit: Optional[int] = None) -> List[Comment]:
+    """Получает комментарии для ответа."""
+    return db.query(Comment).filter(Comment.response_id == response_id).order_by(Comment.id).offset(skip).limit(limit).all()
+
+def get_comments_page(db: Session, response_id: int, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Comment], Optional[str]]:
+    """Получает страницу комментариев ответа после курсора и курсор следующей страницы."""
+    stmt = keyset_page(
+        select(Comment).where(Comment.response_id == response_id), Comment, db.get_bind().dialect.name, cursor, limit
+    )
+    return split_page(db.execute(stmt).scalars().all(), limit)
+
+def get_comments_version(db: Session, response_id: int) -> Tuple[int, int]:
+    """Версия списка комментариев ответа: их количество и последний id.
+
+    Комментарии не редактируются, поэтому этой пары достаточно для ETag.
+    """
+    count, last_id = db.query(func.count(Comment.id), func.max(Comment.id)).filter(
+        Comment.response_id == response_id
+    ).one()
+    return count, last_id or 0
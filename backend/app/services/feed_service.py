@@ -0,0 +1,238 @@
+"""Лента подписок: новые ответы рассылаются подписчикам при записи.
+
+У каждого подписчика своя ограниченная лента в Redis. Ответы авторов с очень
+большим числом подписчиков не рассылаются: они хранятся в ленте автора и
+подмешиваются при чтении. Страница ленты читается одним вызовом скрипта.
+"""
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from app.models.models import Response, Subscription
+from app.core.config import redis_client, settings
+from app.core import redis_store
+
+# Лента подписчика: sorted set response_id -> response_id
+FEED_KEY = "feed:{user_id}"
+# На кого подписан пользователь, с меткой FEED_BUILT_MARKER: ключ есть — лента построена
+FOLLOWING_KEY = "feed:{user_id}:following"
+# Подписчики автора, которым рассылаются его ответы
+FOLLOWERS_KEY = "feed:author:{user_id}:followers"
+# Последние ответы автора, чьи ответы подмешиваются при чтении
+AUTHOR_RESPONSES_KEY = "feed:author:{user_id}"
+# Авторы, ответы которых не рассылаются, а подмешиваются при чтении
+PULLED_AUTHORS_KEY = "feed:pulled"
+
+# id пользователя, которого не бывает: пустое множество подписок в Redis не хранится
+FEED_BUILT_MARKER = 0
+
+# Скрипты ниже сами строят ключи лент подписчиков и авторов по шаблону из ARGV:
+# заранее эти ключи неизвестны, а их чтение отдельной командой добавило бы round
+# trip и гонку с подпиской. Поэтому ленте нужен один узел Redis (или Sentinel),
+# Redis Cluster не поддерживается — так же, как для скриптов read-through кэша
+
+# Рассылает ответ подписчикам автора. Если подписчиков больше порога, автор
+# переводится на подмешивание при чтении, и ответ пишется только в его ленту
+FAN_OUT_SCRIPT = """
+local response_id, max_length = ARGV[1], tonumber(ARGV[2])
+local pulled = redis.call('SISMEMBER', KEYS[3], ARGV[4]) == 1
+if not pulled and redis.call('SCARD', KEYS[1]) > tonumber(ARGV[3]) then
+    redis.call('SADD', KEYS[3], ARGV[4])
+    pulled = true
+end
+if pulled then
+    redis.call('ZADD', KEYS[2], response_id, response_id)
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -max_length - 1)
+    return 0
+end
+local followers = redis.call('SMEMBERS', KEYS[1])
+for _, follower in ipairs(followers) do
+    local feed = string.gsub(ARGV[5], '{user_id}', follower)
+    redis.call('ZADD', feed, response_id, response_id)
+    redis.call('ZREMRANGEBYRANK', feed, 0, -max_length - 1)
+end
+return #followers
+"""
+
+# Страница ленты: разосланные ответы вместе с ответами подмешиваемых авторов,
+# новые первыми. nil — лента пользователя еще не построена
+FEED_PAGE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return false
+end
+local limit = tonumber(ARGV[2])
+local ids = redis.call('ZREVRANGEBYSCORE', KEYS[1], ARGV[1], '-inf', 'LIMIT', 0, limit)
+for _, author in ipairs(redis.call('SINTER', KEYS[2], KEYS[3])) do
+    local author_key = string.gsub(ARGV[3], '{user_id}', author)
+    for _, id in ipairs(redis.call('ZREVRANGEBYSCORE', author_key, ARGV[1], '-inf', 'LIMIT', 0, limit)) do
+        table.insert(ids, id)
+    end
+end
+table.sort(ids, function(a, b) return tonumber(a) > tonumber(b) end)
+local page, last = {}, nil
+for _, id in ipairs(ids) do
+    if #page == limit then
+        break
+    end
+    if id ~= last then
+        table.insert(page, id)
+        last = id
+    end
+end
+return page
+"""
+
+_fan_out = redis_client.register_script(FAN_OUT_SCRIPT)
+_feed_page = redis_client.register_script(FEED_PAGE_SCRIPT)
+
+def _key(template: str, user_id: int) -> str:
+    return template.format(user_id=int(user_id))
+
+def push_response(response: Response, pipe) -> None:
+    """Добавляет в pipeline рассылку нового ответа подписчикам автора."""
+    if response.author_id is None:
+        return
+    _fan_out(
+        keys=[_key(FOLLOWERS_KEY, response.author_id), _key(AUTHOR_RESPONSES_KEY, response.author_id), PULLED_AUTHORS_KEY],
+        args=[response.id, settings.FEED_MAX_LENGTH, settings.FEED_FANOUT_MAX_FOLLOWERS, response.author_id, FEED_KEY],
+        client=pipe
+    )
+
+def _recent_response_ids(db: Session, author_ids) -> List[int]:
+    return db.execute(
+        select(Response.id).where(Response.author_id.in_(author_ids)).order_by(Response.id.desc()).limit(settings.FEED_MAX_LENGTH)
+    ).scalars().all()
+
+def subscribe(db: Session, subscriber_id: int, target_user_id: int) -> Subscription:
+    """Подписывает пользователя на автора и добавляет в ленту последние ответы автора."""
+    subscription = db.execute(
+        select(Subscription).where(Subscription.subscriber_id == subscriber_id, Subscription.target_user_id == target_user_id)
+    ).scalars().first()
+    if subscription is not None:
+        return subscription
+    subscription = Subscription(subscriber_id=subscriber_id, target_user_id=target_user_id)
+    db.add(subscription)
+    db.commit()
+    db.refresh(subscription)
+
+    feed_key = _key(FEED_KEY, subscriber_id)
+    response_ids = _recent_response_ids(db, [target_user_id])
+    pipe = redis_store.pipeline(transaction=True)
+    pipe.sadd(_key(FOLLOWERS_KEY, target_user_id), subscriber_id)
+    # Подписки меняются только в уже построенной ленте; иначе ее целиком построит чтение
+    if redis_client.exists(_key(FOLLOWING_KEY, subscriber_id)):
+        pipe.sadd(_key(FOLLOWING_KEY, subscriber_id), target_user_id)
+        if response_ids:
+            pipe.zadd(feed_key, {response_id: response_id for response_id in response_ids})
+            pipe.zremrangebyrank(feed_key, 0, -settings.FEED_MAX_LENGTH - 1)
+    pipe.execute()
+    return subscription
+
+def unsubscribe(db: Session, subscriber_id: int, target_user_id: int) -> bool:
+    """Отписывает пользователя от автора и убирает ответы автора из ленты."""
+    deleted = db.execute(
+        delete(Subscription).where(Subscription.subscriber_id == subscriber_id, Subscription.target_user_id == target_user_id)
+    ).rowcount
+    db.commit()
+    if not deleted:
+        return False
+    response_ids = _recent_response_ids(db, [target_user_id])
+    pipe = redis_store.pipeline(transaction=True)
+    pipe.srem(_key(FOLLOWERS_KEY, target_user_id), subscriber_id)
+    pipe.srem(_key(FOLLOWING_KEY, subscriber_id), target_user_id)
+    if response_ids:
+        pipe.zrem(_key(FEED_KEY, subscriber_id), *response_ids)
+    pipe.execute()
+    return True
+
+def rebuild_user_feed(db: Session, user_id: int) -> int:
+    """Строит ленту пользователя из подписок в БД. Возвращает число ответов в ленте.
+
+    Заодно возвращает пользователя в множества подписчиков его авторов: после
+    очистки Redis иначе новые ответы не попали бы в уже построенную ленту.
+    """
+    following = select(Subscription.target_user_id).where(Subscription.subscriber_id == user_id)
+    target_ids = db.execute(following).scalars().all()
+    response_ids = _recent_response_ids(db, following) if target_ids else []
+
+    feed_key = _key(FEED_KEY, user_id)
+    following_key = _key(FOLLOWING_KEY, user_id)
+    pipe = redis_store.pipeline(transaction=True)
+    pipe.delete(feed_key, following_key)
+    pipe.sadd(following_key, FEED_BUILT_MARKER, *target_ids)
+    for target_id in target_ids:
+        pipe.sadd(_key(FOLLOWERS_KEY, target_id), user_id)
+    if response_ids:
+        pipe.zadd(feed_key, {response_id: response_id for response_id in response_ids})
+    pipe.execute()
+    return len(response_ids)
+
+def get_feed_response_ids(db: Session, user_id: int, cursor: Optional[int] = None, limit: int = 20) -> List[int]:
+    """ID ответов страницы ленты, новые первыми; cursor — id последнего ответа прошлой страницы."""
+    keys = [_key(FEED_KEY, user_id), _key(FOLLOWING_KEY, user_id), PULLED_AUTHORS_KEY]
+    args = [f"({cursor}" if cursor else "+inf", limit, AUTHOR_RESPONSES_KEY]
+    page = _feed_page(keys=keys, args=args)
+    if page is None:
+        rebuild_user_feed(db, user_id)
+        page = _feed_page(keys=keys, args=args) or []
+    return [int(response_id) for response_id in page]
+
+def get_feed_page(db: Session, user_id: int, cursor: Optional[int] = None, limit: int = 20) -> Tuple[List[Response], Optional[int]]:
+    """Страница ленты и курсор следующей страницы."""
+    response_ids = get_feed_response_ids(db, user_id, cursor=cursor, limit=limit)
+    if not response_ids:
+        return [], None
+    responses = {response.id: response for response in db.execute(select(Response).where(Response.id.in_(response_ids))).scalars()}
+    # Удаленные ответы остаются в лентах до перестройки и просто пропускаются
+    page = [responses[response_id] for response_id in response_ids if response_id in responses]
+    return page, response_ids[-1] if len(response_ids) == limit else None
+
+def rebuild_feeds(db: Session) -> int:
+    """Перестраивает подписчиков авторов и ленты подмешиваемых авторов из БД.
+
+    Ленты подписчиков удаляются и строятся заново при следующем чтении; заодно
+    авторы, у которых стало меньше подписчиков, снова рассылают ответы.
+    Возвращает число авторов с подписчиками.
+    """
+    counts = db.execute(
+        select(Subscription.target_user_id, func.count(func.distinct(Subscription.subscriber_id))).group_by(
+            Subscription.target_user_id
+        )
+    ).all()
+    pulled = {target_id for target_id, count in counts if count > settings.FEED_FANOUT_MAX_FOLLOWERS}
+
+    pipe = redis_store.pipeline(transaction=True)
+    pipe.delete(PULLED_AUTHORS_KEY)
+    if pulled:
+        pipe.sadd(PULLED_AUTHORS_KEY, *pulled)
+    for author_id in pulled:
+        response_ids = _recent_response_ids(db, [author_id])
+        pipe.delete(_key(AUTHOR_RESPONSES_KEY, author_id))
+        if response_ids:
+            pipe.zadd(_key(AUTHOR_RESPONSES_KEY, author_id), {response_id: response_id for response_id in response_ids})
+    pipe.execute()
+
+    rows = db.execute(
+        select(Subscription.target_user_id, Subscription.subscriber_id).order_by(Subscription.target_user_id)
+    )
+    for target_id, group in groupby(rows, key=itemgetter(0)):
+        pipe = redis_store.pipeline(transaction=True)
+        pipe.delete(_key(FOLLOWERS_KEY, target_id))
+        pipe.sadd(_key(FOLLOWERS_KEY, target_id), *{subscriber_id for _, subscriber_id in group})
+        pipe.execute()
+
+    # Ключи подписчиков — feed:<id> и feed:<id>:following
+    for keys in _scan_batches("feed:[0-9]*"):
+        redis_client.delete(*keys)
+    return len(counts)
+
+def _scan_batches(pattern: str, count: int = 1000):
+    batch = []
+    for key in redis_client.scan_iter(match=pattern, count=count):
+        batch.append(key)
+        if len(batch) >= count:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
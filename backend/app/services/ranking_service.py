@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import List, Optional
+from sqlalchemy import func, select, union
+from sqlalchemy.orm import Session, joinedload
+from app.models.models import Response, TopResponse, Vote
+from app.schemas.schemas import TopResponse as TopResponseSchema
+from app.core.config import settings
+from app.core.cache import ReadThroughCache
+
+class RankingPeriod(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    ALL = "all"
+
+PERIOD_LENGTHS = {
+    RankingPeriod.DAY: timedelta(days=1),
+    RankingPeriod.WEEK: timedelta(weeks=1),
+}
+
+# Запас при выборе новых голосов: created_at голоса — время начала его транзакции,
+# и он может закоммититься уже после прошлого пересчета
+CANDIDATE_OVERLAP = timedelta(minutes=1)
+
+# Страницы галереи с материализованными топами; сбрасываются целиком после каждого пересчета
+gallery_cache = ReadThroughCache(
+    "gallery",
+    List[TopResponseSchema],
+    ttl=settings.GALLERY_CACHE_TTL,
+    local_maxsize=settings.CACHE_LOCAL_MAXSIZE,
+    local_ttl=settings.CACHE_LOCAL_TTL
+)
+
+def materialize_top_responses(db: Session, full: bool = False) -> int:
+    """Пересчитывает топы ответов за день, неделю и все время в таблице top_responses.
+
+    Возвращает общее количество записанных строк.
+    """
+    now = datetime.now(timezone.utc)
+    written = sum(_materialize_period(db, period, now, full) for period in RankingPeriod)
+    gallery_cache.invalidate_all()
+    return written
+
+def materialize_top_responses_full(db: Session) -> int:
+    """Полностью пересчитывает топы ответов по всем голосам в окнах."""
+    return materialize_top_responses(db, full=True)
+
+def _materialize_period(db: Session, period: RankingPeriod, now: datetime, full: bool) -> int:
+    limit = settings.TOP_RESPONSES_LIMIT
+    if period == RankingPeriod.ALL:
+        # Рейтинг за все время — просто первые строки индекса по score
+        rows = db.query(Response.id, Response.score).filter(
+            Response.vote_count > 0
+        ).order_by(Response.score.desc(), Response.id.desc()).limit(limit).all()
+    else:
+        window_score = func.sum(Vote.value)
+        query = db.query(Vote.response_id, window_score).filter(Vote.created_at >= now - PERIOD_LENGTHS[period])
+
+        last_run = db.query(func.max(TopResponse.calculated_at)).filter(TopResponse.period == period.value).scalar()
+        if last_run is not None and not full:
+            # Пересчитываем только текущий топ и ответы, получившие голоса после прошлого запуска.
+            # Ответ без новых голосов может подняться, только если он уже в хранимом топе,
+            # поэтому TOP_RESPONSES_LIMIT стоит держать больше, чем отдают эндпоинты.
+            candidates = union(
+                select(Vote.response_id).where(Vote.created_at >= last_run - CANDIDATE_OVERLAP),
+                select(TopResponse.response_id).where(TopResponse.period == period.value)
+            )
+            query = query.filter(Vote.response_id.in_(candidates))
+
+        rows = query.group_by(Vote.response_id).order_by(
+            window_score.desc(), Vote.response_id.desc()
+        ).limit(limit).all()
+
+    db.query(TopResponse).filter(TopResponse.period == period.value).delete(synchronize_session=False)
+    db.add_all([
+        TopResponse(response_id=response_id, period=period.value, rank=rank, score=score, calculated_at=now)
+        for rank, (response_id, score) in enumerate(rows, start=1)
+    ])
+    db.commit()
+    return len(rows)
+
+def get_top_responses_for_period(db: Session, period: RankingPeriod, limit: int = 10) -> List[TopResponse]:
+    """Получает материализованный топ ответов за период одним запросом."""
+    return db.query(TopResponse).options(joinedload(TopResponse.response)).filter(
+        TopResponse.period == period.value
+    ).order_by(TopResponse.rank).limit(limit).all()
+
+def get_top_responses_calculated_at(db: Session, period: RankingPeriod) -> Optional[datetime]:
+    """Время последнего пересчета топа за период; служит версией для ETag."""
+    return db.query(func.max(TopResponse.calculated_at)).filter(TopResponse.period == period.value).scalar()
+
+def get_top_responses_for_period_cached(db: Session, period: RankingPeriod, limit: int = 10) -> List[TopResponseSchema]:
+    """Получает материализованный топ ответов за период через кэш страниц галереи."""
+    return gallery_cache.get(
+        f"top:{period.value}:{limit}",
+        lambda: get_top_responses_for_period(db, period, limit=limit)
+    )
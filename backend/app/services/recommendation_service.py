@@ -1,25 +1,286 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import Select, func, literal, select, union_all
 from sqlalchemy.orm import Session
-from sqlalchemy import func  
-from app.models.models import Task, Response, User
-from typing import List
+from app.models.models import Comment, Task, Response, Vote
+from app.core.config import redis_client, settings
+from app.core import redis_store
+from app.services.similarity_service import get_similar_response_ids
 
-def get_recommended_tasks(db: Session, user_id: int, limit: int = 5) -> List[Task]:
+# Вес действий пользователя с заданием: ответ, комментарий к ответу, голос за ответ
+RESPONSE_WEIGHT = 3.0
+COMMENT_WEIGHT = 2.0
+VOTE_WEIGHT = 1.0
+
+# Соседи задания: sorted set task_id -> косинусная близость
+TASK_NEIGHBORS_KEY = "recs:task:{task_id}:neighbors"
+# Задания, с которыми работал пользователь: sorted set task_id -> вес
+USER_TASKS_KEY = "recs:user:{user_id}:tasks"
+# Популярность заданий для пользователей без истории: sorted set task_id -> суммарный вес
+POPULAR_TASKS_KEY = "recs:popular"
+# Норма столбца задания в матрице пользователь x задание: hash task_id -> норма
+TASK_NORMS_KEY = "recs:norms"
+# Время начала последнего пересчета (unix)
+LAST_RUN_KEY = "recs:last_run"
+
+# Запас при выборе новых действий, как в materialize_top_responses
+CANDIDATE_OVERLAP = timedelta(minutes=1)
+# Сколько заданий считать за одно умножение матриц, чтобы ограничить память
+SIMILARITY_CHUNK = 1000
+# Сколько заданий из истории пользователя учитывать при рекомендации
+PROFILE_TASKS = 50
+
+def _engagement_query(
+    since: Optional[datetime] = None,
+    user_ids: Optional[Sequence[int]] = None,
+    task_ids: Optional[Iterable[int]] = None
+) -> Select:
+    """(user_id, task_id, вес) по ответам, комментариям и голосам пользователя."""
+    parts = [
+        select(Response.author_id.label("user_id"), Response.task_id.label("task_id"), literal(RESPONSE_WEIGHT).label("weight")).where(
+            Response.author_id.is_not(None), Response.task_id.is_not(None)
+        ),
+        select(Comment.author_id, Response.task_id, literal(COMMENT_WEIGHT)).join(Response, Response.id == Comment.response_id).where(
+            Comment.author_id.is_not(None), Response.task_id.is_not(None)
+        ),
+        select(Vote.user_id, Response.task_id, literal(VOTE_WEIGHT)).join(Response, Response.id == Vote.response_id).where(
+            Vote.user_id.is_not(None), Response.task_id.is_not(None)
+        ),
+    ]
+    if since is not None:
+        parts = [
+            parts[0].where(Response.created_at >= since),
+            parts[1].where(Comment.created_at >= since),
+            parts[2].where(Vote.created_at >= since),
+        ]
+    if user_ids is not None:
+        parts = [
+            parts[0].where(Response.author_id.in_(user_ids)),
+            parts[1].where(Comment.author_id.in_(user_ids)),
+            parts[2].where(Vote.user_id.in_(user_ids)),
+        ]
+    if task_ids is not None:
+        parts = [part.where(Response.task_id.in_(list(task_ids))) for part in parts]
+    events = union_all(*parts).subquery()
+    return select(events.c.user_id, events.c.task_id, func.sum(events.c.weight)).group_by(events.c.user_id, events.c.task_id)
+
+def _engagement_matrix(rows):
+    """Разреженная матрица пользователь x задание и id строк и столбцов.
+
+    Повторные действия дают убывающую отдачу: вес ячейки — log(1 + сумма весов).
+    """
+    import numpy as np
+    from scipy import sparse
+
+    rows = list(rows)
+    users = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    tasks = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    weights = np.log1p(np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows)))
+    user_ids, user_index = np.unique(users, return_inverse=True)
+    task_ids, task_index = np.unique(tasks, return_inverse=True)
+    matrix = sparse.csr_matrix((weights, (user_index, task_index)), shape=(len(user_ids), len(task_ids)))
+    return matrix, user_ids, task_ids
+
+def _column_norms(matrix):
+    import numpy as np
+
+    return np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+
+def _top_neighbors(matrix, columns, norms, k: int) -> Iterator[Tuple[int, "object", "object"]]:
+    """Для каждого столбца из columns — k самых близких столбцов по косинусу.
+
+    Близость считается умножением X[:, chunk].T @ X, по SIMILARITY_CHUNK столбцов за раз.
+    """
+    import numpy as np
+
+    by_column = matrix.tocsc()
+    for start in range(0, len(columns), SIMILARITY_CHUNK):
+        chunk = columns[start:start + SIMILARITY_CHUNK]
+        co_engagement = (by_column[:, chunk].T @ matrix).tocsr()
+        for row, column in enumerate(chunk):
+            begin, end = co_engagement.indptr[row], co_engagement.indptr[row + 1]
+            neighbors = co_engagement.indices[begin:end]
+            scores = co_engagement.data[begin:end] / (norms[column] * norms[neighbors])
+            keep = neighbors != column
+            neighbors, scores = neighbors[keep], scores[keep]
+            if len(scores) > k:
+                top = np.argpartition(-scores, k)[:k]
+                neighbors, scores = neighbors[top], scores[top]
+            yield column, neighbors, scores
+
+def _neighbors_key(task_id) -> str:
+    return TASK_NEIGHBORS_KEY.format(task_id=int(task_id))
+
+def _user_tasks_key(user_id) -> str:
+    return USER_TASKS_KEY.format(user_id=int(user_id))
+
+def _write_user_profiles(pipe, matrix, user_ids, task_ids) -> None:
+    for row, user_id in enumerate(user_ids):
+        begin, end = matrix.indptr[row], matrix.indptr[row + 1]
+        pipe.delete(_user_tasks_key(user_id))
+        if end > begin:
+            pipe.zadd(_user_tasks_key(user_id), {
+                int(task_ids[column]): float(weight)
+                for column, weight in zip(matrix.indices[begin:end], matrix.data[begin:end])
+            })
+
+def build_recommendations(db: Session, full: bool = False) -> int:
+    """Пересчитывает соседей заданий по совместной активности пользователей.
+
+    Без full пересчитываются только задания с новыми ответами, комментариями и
+    голосами после прошлого запуска. Возвращает число пересчитанных заданий.
+    """
+    started = datetime.now(timezone.utc)
+    last_run = redis_client.get(LAST_RUN_KEY)
+    if full or last_run is None:
+        count = _build_all(db)
+    else:
+        since = datetime.fromtimestamp(float(last_run), timezone.utc) - CANDIDATE_OVERLAP
+        count = _build_incremental(db, since)
+    redis_client.set(LAST_RUN_KEY, started.timestamp())
+    return count
+
+def build_recommendations_full(db: Session) -> int:
+    """Полностью пересчитывает соседей всех заданий и профили пользователей."""
+    return build_recommendations(db, full=True)
+
+def _build_all(db: Session) -> int:
+    import numpy as np
+
+    matrix, user_ids, task_ids = _engagement_matrix(db.execute(_engagement_query()))
+    norms = _column_norms(matrix)
+    k = settings.RECOMMENDATION_NEIGHBORS
+
+    # Ключи пишутся пачками без транзакции: при сбое посередине останутся соседи
+    # прошлого пересчета, и следующий запуск их заменит
+    pipe = redis_store.pipeline()
+    for column, neighbors, scores in _top_neighbors(matrix, np.arange(len(task_ids)), norms, k):
+        key = _neighbors_key(task_ids[column])
+        pipe.delete(key)
+        if len(neighbors):
+            pipe.zadd(key, {int(task_ids[neighbor]): float(score) for neighbor, score in zip(neighbors, scores)})
+        if len(pipe) >= SIMILARITY_CHUNK:
+            pipe.execute()
+    _write_user_profiles(pipe, matrix, user_ids, task_ids)
+
+    popularity = np.asarray(matrix.sum(axis=0)).ravel()
+    pipe.delete(POPULAR_TASKS_KEY, TASK_NORMS_KEY)
+    if len(task_ids):
+        pipe.zadd(POPULAR_TASKS_KEY, {int(task_id): float(score) for task_id, score in zip(task_ids, popularity)})
+        pipe.hset(TASK_NORMS_KEY, mapping={int(task_id): float(norm) for task_id, norm in zip(task_ids, norms)})
+    pipe.execute()
+    return len(task_ids)
+
+def _build_incremental(db: Session, since: datetime) -> int:
+    """Пересчитывает соседей заданий с новой активностью.
+
+    Все, кто работал с такими заданиями, загружаются целиком, поэтому их столбцы
+    и строки полные. Нормы остальных заданий не менялись и берутся из Redis.
+    """
+    import numpy as np
+
+    recent = _engagement_query(since=since).subquery()
+    dirty_ids = set(db.execute(select(recent.c.task_id).distinct()).scalars())
+    if not dirty_ids:
+        return 0
+    engaged = _engagement_query(task_ids=dirty_ids).subquery()
+    user_ids = db.execute(select(engaged.c.user_id).distinct()).scalars().all()
+    matrix, user_ids, task_ids = _engagement_matrix(db.execute(_engagement_query(user_ids=user_ids)))
+
+    norms = _column_norms(matrix)
+    dirty = np.flatnonzero(np.isin(task_ids, list(dirty_ids)))
+    stored = redis_client.hmget(TASK_NORMS_KEY, [int(task_id) for task_id in task_ids])
+    for column, norm in enumerate(stored):
+        if norm is not None and task_ids[column] not in dirty_ids:
+            norms[column] = float(norm)
+    k = settings.RECOMMENDATION_NEIGHBORS
+
+    pipe = redis_store.pipeline()
+    for column, neighbors, scores in _top_neighbors(matrix, dirty, norms, k):
+        task_id = int(task_ids[column])
+        key = _neighbors_key(task_id)
+        pipe.delete(key)
+        if len(neighbors):
+            pipe.zadd(key, {int(task_ids[neighbor]): float(score) for neighbor, score in zip(neighbors, scores)})
+        # Близость симметрична: задание попадает и в списки своих соседей, где
+        # вытесняет самого далекого, если соседей больше k
+        for neighbor, score in zip(neighbors, scores):
+            if task_ids[neighbor] not in dirty_ids:
+                pipe.zadd(_neighbors_key(task_ids[neighbor]), {task_id: float(score)})
+                pipe.zremrangebyrank(_neighbors_key(task_ids[neighbor]), 0, -k - 1)
+        if len(pipe) >= SIMILARITY_CHUNK:
+            pipe.execute()
+    _write_user_profiles(pipe, matrix, user_ids, task_ids)
+
+    popularity = np.asarray(matrix[:, dirty].sum(axis=0)).ravel()
+    if len(dirty):
+        pipe.zadd(POPULAR_TASKS_KEY, {int(task_ids[column]): float(score) for column, score in zip(dirty, popularity)})
+        pipe.hset(TASK_NORMS_KEY, mapping={int(task_ids[column]): float(norms[column]) for column in dirty})
+    pipe.execute()
+    return len(dirty)
+
+def _popular_task_ids(db: Session, limit: int) -> List[int]:
+    task_ids = redis_client.zrevrange(POPULAR_TASKS_KEY, 0, limit - 1)
+    if task_ids or redis_client.exists(LAST_RUN_KEY):
+        return [int(task_id) for task_id in task_ids]
+    # Рекомендации еще ни разу не считались: популярность по числу ответов из БД
+    return db.execute(
+        select(Response.task_id).where(Response.task_id.is_not(None)).group_by(Response.task_id).order_by(
+            func.count(Response.id).desc(), Response.task_id.desc()
+        ).limit(limit)
+    ).scalars().all()
+
+def get_recommended_task_ids(db: Session, user_id: Optional[int], limit: int = 5) -> List[int]:
+    """ID рекомендованных заданий: соседи заданий из истории пользователя, взвешенные по активности.
+
+    Задания, с которыми пользователь уже работал, не рекомендуются; если соседей не
+    хватает или истории нет, список дополняется популярными заданиями.
+    """
+    profile = []
+    if user_id is not None:
+        profile = redis_client.zrevrange(_user_tasks_key(user_id), 0, PROFILE_TASKS - 1, withscores=True)
+    seen = {int(task_id) for task_id, _ in profile}
+
+    scores: Dict[int, float] = defaultdict(float)
+    if profile:
+        pipe = redis_store.pipeline()
+        for task_id, _ in profile:
+            pipe.zrevrange(_neighbors_key(task_id), 0, -1, withscores=True)
+        for (_, weight), neighbors in zip(profile, pipe.execute()):
+            for neighbor, similarity in neighbors:
+                scores[int(neighbor)] += weight * similarity
+    ranked = [task_id for task_id, _ in sorted(scores.items(), key=lambda item: (-item[1], -item[0])) if task_id not in seen]
+
+    if len(ranked) < limit:
+        chosen = set(ranked)
+        for task_id in _popular_task_ids(db, limit + len(seen) + len(ranked)):
+            if task_id not in seen and task_id not in chosen:
+                ranked.append(task_id)
+                chosen.add(task_id)
+    return ranked[:limit]
+
+def get_recommended_tasks(db: Session, user_id: Optional[int], limit: int = 5) -> List[Task]:
     """Получает рекомендованные задания для пользователя."""
-    recommended = db.query(Task).join(Response).group_by(Task.id).order_by(
-        func.count(Response.id).desc()
-    ).limit(limit).all()
-    
-    return recommended
+    task_ids = get_recommended_task_ids(db, user_id, limit)
+    if not task_ids:
+        return []
+    tasks = {task.id: task for task in db.execute(select(Task).where(Task.id.in_(task_ids))).scalars()}
+    return [tasks[task_id] for task_id in task_ids if task_id in tasks]
 
 def get_similar_responses(db: Session, response_id: int, limit: int = 5) -> List[Response]:
-    """Получает похожие ответы."""
-    response = db.query(Response).filter(Response.id == response_id).first()
-    if not response:
-        return []
-    
-    similar = db.query(Response).filter(
-        Response.task_id == response.task_id,
-        Response.id != response_id
-    ).limit(limit).all()
-    
-    return similar
+    """Получает похожие по тексту ответы, самые близкие первыми.
+
+    Пока ответ не проиндексирован, отдаются лучшие ответы того же задания.
+    """
+    similar_ids = get_similar_response_ids(response_id, limit=limit)
+    if similar_ids:
+        responses = {response.id: response for response in db.execute(select(Response).where(Response.id.in_(similar_ids))).scalars()}
+        return [responses[similar_id] for similar_id in similar_ids if similar_id in responses]
+
+    task_id = select(Response.task_id).where(Response.id == response_id).scalar_subquery()
+    return list(db.execute(
+        select(Response).where(Response.task_id == task_id, Response.id != response_id).order_by(
+            Response.score.desc(), Response.id.desc()
+        ).limit(limit)
+    ).scalars())
@@ -1,9 +1,46 @@
+import contextlib
 import os
-from typing import Optional, List
+import tempfile
+from typing import Optional, List, Tuple
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models.models import Response
-from app.schemas.schemas import ResponseCreate, ResponseUpdate
+from starlette.concurrency import run_in_threadpool
+from app.models.models import Comment, Response, Vote
+from app.schemas.schemas import ResponseCreate, ResponseUpdate, Response as ResponseSchema
 from app.core.config import settings
+from app.core.cache import ReadThroughCache
+from app.core.pagination import keyset_page, split_page
+from app.core import redis_store
+from app.services.analytics_service import increment_counters, track_activity
+from app.services.feed_service import push_response
+from app.services.similarity_service import forget_response_vector, remove_similar_responses
+from app.services.vote_service import remove_response_from_rankings, update_response_hot_score_cache
+
+response_cache = ReadThroughCache(
+    "responses",
+    ResponseSchema,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    local_maxsize=settings.CACHE_LOCAL_MAXSIZE,
+    local_ttl=settings.CACHE_LOCAL_TTL
+)
+
+class ImageUploadError(Exception):
+    """Загруженный файл нельзя сохранить как изображение ответа."""
+
+class ImageTooLarge(ImageUploadError):
+    """Файл больше MAX_UPLOAD_SIZE."""
+
+class UnsupportedImage(ImageUploadError):
+    """Содержимое файла не JPEG, PNG, GIF или WebP."""
+
+# Сигнатуры разрешенных изображений: начало файла -> расширение (WebP проверяется отдельно)
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
 
 def create_response(db: Session, response: ResponseCreate, author_id: Optional[int] = None) -> Response:
     """Создает новый ответ."""
@@ -11,12 +48,42 @@ def create_response(db: Session, response: ResponseCreate, author_id: Optional[i
     db.add(db_response)
     db.commit()
     db.refresh(db_response)
+    _record_response_created(db_response)
     return db_response
 
+async def create_response_async(db: AsyncSession, response: ResponseCreate, author_id: Optional[int] = None) -> Response:
+    """Создает новый ответ через асинхронную сессию."""
+    db_response = Response(**response.model_dump(), author_id=author_id)
+    db.add(db_response)
+    await db.commit()
+    await db.refresh(db_response)
+    await run_in_threadpool(_record_response_created, db_response)
+    return db_response
+
+def _record_response_created(db_response: Response):
+    pipe = redis_store.pipeline()
+    update_response_hot_score_cache(db_response, pipe=pipe)
+    increment_counters(pipe, responses=1)
+    track_activity([db_response.author_id], pipe)
+    push_response(db_response, pipe)
+    pipe.execute()
+
 def get_response(db: Session, response_id: int) -> Optional[Response]:
     """Получает ответ по ID."""
     return db.query(Response).filter(Response.id == response_id).first()
 
+def get_response_cached(db: Session, response_id: int) -> Optional[ResponseSchema]:
+    """Получает ответ по ID через read-through кэш."""
+    return response_cache.get(response_id, lambda: get_response(db, response_id))
+
+async def get_response_async(db: AsyncSession, response_id: int) -> Optional[Response]:
+    """Получает ответ по ID через асинхронную сессию."""
+    return (await db.execute(select(Response).where(Response.id == response_id))).scalar_one_or_none()
+
+async def get_response_cached_async(db: AsyncSession, response_id: int) -> Optional[ResponseSchema]:
+    """Получает ответ по ID через read-through кэш и асинхронную сессию."""
+    return await response_cache.aget(response_id, lambda: get_response_async(db, response_id))
+
 def get_responses(db: Session, skip: int = 0, limit: int = 100) -> List[Response]:
     """Получает список ответов."""
     return db.query(Response).offset(skip).limit(limit).all()
@@ -25,14 +92,75 @@ def get_responses_for_task(db: Session, task_id: int) -> List[Response]:
     """Получает все ответы для задания."""
     return db.query(Response).filter(Response.task_id == task_id).all()
 
+async def get_responses_async(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Response]:
+    """Получает список ответов через асинхронную сессию."""
+    return list((await db.execute(select(Response).offset(skip).limit(limit))).scalars())
+
+async def get_responses_for_task_async(db: AsyncSession, task_id: int, skip: int = 0, limit: Optional[int] = None) -> List[Response]:
+    """Получает ответы для задания через асинхронную сессию."""
+    stmt = select(Response).where(Response.task_id == task_id).order_by(Response.id).offset(skip).limit(limit)
+    return list((await db.execute(stmt)).scalars())
+
+async def get_responses_page_async(
+    db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, task_id: Optional[int] = None
+) -> Tuple[List[Response], Optional[str]]:
+    """Получает страницу ответов (всех или одного задания) после курсора и курсор следующей страницы."""
+    stmt = select(Response)
+    if task_id is not None:
+        stmt = stmt.where(Response.task_id == task_id)
+    stmt = keyset_page(stmt, Response, db.bind.dialect.name, cursor, limit)
+    return split_page((await db.execute(stmt)).scalars().all(), limit)
+
 def update_response(db: Session, response_id: int, response_update: ResponseUpdate) -> Optional[Response]:
     """Обновляет ответ."""
     db_response = db.query(Response).filter(Response.id == response_id).first()
     if db_response:
-        for key, value in response_update.model_dump(exclude_unset=True).items():
+        changes = response_update.model_dump(exclude_unset=True)
+        for key, value in changes.items():
             setattr(db_response, key, value)
+        if "text" in changes:
+            # Ответ с новым текстом заново проиндексирует index_new_responses
+            forget_response_vector(db, response_id)
         db.commit()
         db.refresh(db_response)
+        response_cache.invalidate(response_id)
+    return db_response
+
+async def update_response_async(db: AsyncSession, response_id: int, response_update: ResponseUpdate) -> Optional[Response]:
+    """Обновляет ответ через асинхронную сессию."""
+    db_response = await get_response_async(db, response_id)
+    if db_response:
+        changes = response_update.model_dump(exclude_unset=True)
+        for key, value in changes.items():
+            setattr(db_response, key, value)
+        if "text" in changes:
+            await db.run_sync(forget_response_vector, response_id)
+        await db.commit()
+        await db.refresh(db_response)
+        await run_in_threadpool(response_cache.invalidate, response_id)
+    return db_response
+
+def set_response_image(db: Session, response_id: int, image_path: str) -> Optional[Response]:
+    """Записывает путь к сохраненному изображению ответа.
+
+    Путь задает только сервер после save_response_image, поэтому его нет в ResponseUpdate.
+    """
+    db_response = db.query(Response).filter(Response.id == response_id).first()
+    if db_response:
+        db_response.image_path = image_path
+        db.commit()
+        db.refresh(db_response)
+        response_cache.invalidate(response_id)
+    return db_response
+
+async def set_response_image_async(db: AsyncSession, response_id: int, image_path: str) -> Optional[Response]:
+    """Асинхронный вариант set_response_image."""
+    db_response = await get_response_async(db, response_id)
+    if db_response:
+        db_response.image_path = image_path
+        await db.commit()
+        await db.refresh(db_response)
+        await run_in_threadpool(response_cache.invalidate, response_id)
     return db_response
 
 def delete_response(db: Session, response_id: int) -> bool:
@@ -41,18 +169,114 @@ def delete_response(db: Session, response_id: int) -> bool:
     if db_response:
         db.delete(db_response)
         db.commit()
+        _forget_response(response_id)
         return True
     return False
 
-def save_response_image(file, response_id: int) -> str:
-    """Сохраняет изображение ответа и возвращает путь к нему."""
-    media_dir = os.path.join(settings.MEDIA_ROOT, settings.RESPONSES_MEDIA_DIR)
+async def delete_response_async(db: AsyncSession, response_id: int) -> bool:
+    """Удаляет ответ через асинхронную сессию."""
+    db_response = await get_response_async(db, response_id)
+    if db_response:
+        await db.delete(db_response)
+        await db.commit()
+        await run_in_threadpool(_forget_response, response_id)
+        return True
+    return False
+
+def _forget_response(response_id: int):
+    remove_response_from_rankings(response_id)
+    remove_similar_responses(response_id)
+    response_cache.invalidate(response_id)
+    increment_counters(responses=-1)
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Расширение изображения по первым байтам файла; None — не изображение."""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def _media_dir() -> str:
+    return os.path.join(settings.MEDIA_ROOT, settings.RESPONSES_MEDIA_DIR)
+
+def stage_response_image(file) -> Tuple[str, str]:
+    """Проверяет загруженное изображение и копирует его во временный файл.
+
+    Возвращает путь временного файла и расширение. Файл копируется блоками в ту же
+    папку, что и изображения, и переименовывается в publish_response_image, поэтому
+    по итоговому пути никогда не лежит недописанный файл. Вызывается до создания
+    ответа, чтобы отклоненная загрузка его не создавала. Функция блокирующая —
+    вызывать через run_in_threadpool.
+    """
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise ImageTooLarge()
+    source = file.file
+    head = source.read(settings.UPLOAD_CHUNK_SIZE)
+    # Тип определяется по содержимому: имя файла и Content-Type задает клиент
+    extension = sniff_image_type(head)
+    if extension is None:
+        raise UnsupportedImage()
+
+    media_dir = _media_dir()
     os.makedirs(media_dir, exist_ok=True)
-    
-    filename = f"response_{response_id}_{file.filename}"
-    file_path = os.path.join(media_dir, filename)
-    
-    with open(file_path, "wb") as buffer:
-        buffer.write(file.file.read())
-    
-    return f"{settings.RESPONSES_MEDIA_DIR}/{filename}"
\ No newline at end of file
+    fd, temp_path = tempfile.mkstemp(dir=media_dir, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            written = 0
+            chunk = head
+            while chunk:
+                written += len(chunk)
+                # Размер проверяется по мере записи: size известен не для всех источников
+                if written > settings.MAX_UPLOAD_SIZE:
+                    raise ImageTooLarge()
+                buffer.write(chunk)
+                chunk = source.read(settings.UPLOAD_CHUNK_SIZE)
+            buffer.flush()
+            os.fsync(buffer.fileno())
+    except BaseException:
+        discard_staged_image(temp_path)
+        raise
+    return temp_path, extension
+
+def publish_response_image(temp_path: str, extension: str, response_id: int) -> str:
+    """Переносит проверенное изображение на место изображения ответа и возвращает путь к нему."""
+    filename = f"response_{response_id}.{extension}"
+    os.replace(temp_path, os.path.join(_media_dir(), filename))
+    return f"{settings.RESPONSES_MEDIA_DIR}/{filename}"
+
+def discard_staged_image(temp_path: str) -> None:
+    """Удаляет временный файл изображения, которое не понадобилось."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(temp_path)
+
+def discard_response_image(image_path: str) -> None:
+    """Удаляет уже перенесенное изображение по пути из publish_response_image."""
+    discard_staged_image(os.path.join(settings.MEDIA_ROOT, image_path))
+
+def save_response_image(file, response_id: int) -> str:
+    """Проверяет и сохраняет изображение уже созданного ответа; возвращает путь к нему."""
+    return publish_response_image(*stage_response_image(file), response_id)
+
+def backfill_response_aggregates(db: Session) -> int:
+    """Пересчитывает vote_count, score и comment_count ответов из таблиц votes и comments.
+
+    Обновляет только строки с расхождениями и возвращает их количество.
+    """
+    vote_count = select(func.count(Vote.id)).where(Vote.response_id == Response.id).scalar_subquery()
+    score = select(func.coalesce(func.sum(Vote.value), 0)).where(Vote.response_id == Response.id).scalar_subquery()
+    comment_count = select(func.count(Comment.id)).where(Comment.response_id == Response.id).scalar_subquery()
+
+    result = db.execute(
+        update(Response)
+        .where(or_(
+            Response.vote_count != vote_count,
+            Response.score != score,
+            Response.comment_count != comment_count
+        ))
+        .values(vote_count=vote_count, score=score, comment_count=comment_count)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
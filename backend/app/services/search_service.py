@@ -0,0 +1,105 @@
+import re
+from enum import Enum
+from typing import List, Optional
+from sqlalchemy import Select, column, func, literal, literal_column, select, table, union
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
+from sqlalchemy.orm import Session
+from app.models.models import Response, Tag, Task, TaskTag
+from app.models.search import SEARCH_VECTOR_COLUMN, fts_table
+from app.services.tag_service import normalize_tag
+
+class SearchMode(str, Enum):
+    FULLTEXT = "fulltext"
+    SUBSTRING = "substring"
+
+# Конфигурации PostgreSQL, по которым построен search_vector
+SEARCH_CONFIGS = ("russian", "english")
+
+def _terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())
+
+def _fts5_query(terms: List[str]) -> str:
+    # Все слова запроса, каждое как префикс: "кот"* найдет и "котики"
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _postgres_search(model, query: str, fuzzy: bool, extra: List[Select]) -> Select:
+    vector = literal_column(f"{model.__tablename__}.{SEARCH_VECTOR_COLUMN}", TSVECTOR)
+    ts_query = func.websearch_to_tsquery(literal(SEARCH_CONFIGS[0], REGCONFIG), query)
+    for config in SEARCH_CONFIGS[1:]:
+        ts_query = ts_query.op("||")(func.websearch_to_tsquery(literal(config, REGCONFIG), query))
+
+    candidates = [select(model.id).where(vector.op("@@")(ts_query))]
+    rank = func.ts_rank_cd(vector, ts_query)
+    if fuzzy:
+        # Оператор <% (word_similarity выше порога pg_trgm) использует триграммный индекс
+        # и находит слова с опечатками
+        candidates.append(select(model.id).where(literal(query).op("<%")(model.text)))
+        rank = rank + func.word_similarity(query, model.text)
+    return select(model).where(model.id.in_(union(*candidates, *extra))).order_by(rank.desc(), model.id.desc())
+
+def _sqlite_search(model, query: str, extra: List[Select]) -> Optional[Select]:
+    terms = _terms(query)
+    if not terms:
+        return None
+    fts = table(fts_table(model.__tablename__), column("rowid"))
+    # В MATCH и bm25() FTS5-таблица указывается по имени, как колонка
+    fts_ref = literal_column(fts.name)
+    match = fts_ref.op("MATCH")(_fts5_query(terms))
+    # bm25 тем меньше, чем релевантнее строка; совпавшие только по тегу идут после
+    rank = select(func.bm25(fts_ref)).select_from(fts).where(match, fts.c.rowid == model.id).scalar_subquery()
+    candidates = select(fts.c.rowid).where(match)
+    return select(model).where(model.id.in_(union(candidates, *extra))).order_by(
+        func.coalesce(rank, 0), model.id.desc()
+    )
+
+def _substring_search(model, query: str, extra: List[Select]) -> Select:
+    # Прежний поиск по подстроке без учета регистра: ILIKE '%q%' без индекса
+    return select(model).where(
+        model.id.in_(union(select(model.id).where(model.text.icontains(query)), *extra))
+    ).order_by(model.id.desc())
+
+def build_search_query(dialect_name: str, model, query: str, fuzzy: bool = True, extra: Optional[List[Select]] = None) -> Optional[Select]:
+    """Запрос полнотекстового поиска с сортировкой по релевантности; None — искать нечего.
+
+    extra — дополнительные запросы id, совпадения из которых тоже попадают в выдачу.
+    Для СУБД без полнотекстового индекса — поиск по подстроке.
+    """
+    extra = extra or []
+    if dialect_name == "postgresql":
+        return _postgres_search(model, query, fuzzy, extra)
+    if dialect_name == "sqlite":
+        return _sqlite_search(model, query, extra)
+    return _substring_search(model, query, extra)
+
+def _search(db: Session, model, query: str, mode: SearchMode, fuzzy: bool, skip: int, limit: int, extra: List[Select]) -> list:
+    if mode == SearchMode.SUBSTRING:
+        stmt = _substring_search(model, query, extra)
+    else:
+        stmt = build_search_query(db.get_bind().dialect.name, model, query, fuzzy=fuzzy, extra=extra)
+        if stmt is None:
+            return []
+    return list(db.execute(stmt.offset(skip).limit(limit)).scalars())
+
+def search_tasks(
+    db: Session,
+    query: str,
+    mode: SearchMode = SearchMode.FULLTEXT,
+    fuzzy: bool = True,
+    skip: int = 0,
+    limit: int = 20
+) -> List[Task]:
+    """Ищет задания по тексту и точному названию тега, самые релевантные первыми."""
+    # Имена тегов хранятся нормализованными, поэтому и запрос сравнивается так же
+    by_tag = select(TaskTag.task_id).join(Tag, Tag.id == TaskTag.tag_id).where(Tag.name == normalize_tag(query))
+    return _search(db, Task, query, mode, fuzzy, skip, limit, [by_tag])
+
+def search_responses(
+    db: Session,
+    query: str,
+    mode: SearchMode = SearchMode.FULLTEXT,
+    fuzzy: bool = True,
+    skip: int = 0,
+    limit: int = 20
+) -> List[Response]:
+    """Ищет ответы по тексту, самые релевантные первыми."""
+    return _search(db, Response, query, mode, fuzzy, skip, limit, [])
@@ -0,0 +1,253 @@
+"""Индекс похожих ответов: векторы хешированных n-грамм и заранее найденные соседи.
+
+Новые ответы индексируются фоновой задачей: вектор сохраняется в response_vectors
+и дописывается в копию всех векторов на диске. Соседи ищутся умножением только
+новых векторов на эту матрицу через memmap, без чтения таблицы, и пишутся в
+Redis. Чтение соседей — один ZREVRANGE.
+"""
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Iterator, List, Sequence, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from app.models.models import Response, ResponseVector
+from app.core.config import redis_client, settings
+from app.core import redis_store
+
+# Похожие ответы: sorted set response_id -> косинусная близость
+SIMILAR_RESPONSES_KEY = "similar:{response_id}"
+# Сколько строк должно быть в копии векторов на диске. Если в файлах другое число
+# строк (их нет на этом сервере, запись прервалась, Redis очищен), копия
+# строится заново из response_vectors
+VECTOR_ROWS_KEY = "similar:vector_rows"
+
+# Копия векторов: матрица float32 по строкам и id ответов этих строк
+VECTORS_FILE = "vectors.f32"
+VECTOR_IDS_FILE = "vector_ids.i64"
+
+# Размерность вектора; при изменении нужна полная переиндексация
+VECTOR_DIMENSIONS = 256
+# Сколько векторов читать из БД и умножать за раз
+VECTOR_CHUNK = 10000
+# Сколько новых ответов индексировать за одну выборку
+INDEX_BATCH = 1000
+
+def _similar_key(response_id) -> str:
+    return SIMILAR_RESPONSES_KEY.format(response_id=int(response_id))
+
+def _features(text: str) -> Counter:
+    # Слова целиком и триграммы букв с границами слова: "<кот>" -> "<ко", "кот", "от>";
+    # триграммы находят и разные формы одного слова
+    words = re.findall(r"\w+", (text or "").lower())
+    features = Counter(words)
+    for word in words:
+        padded = f"<{word}>"
+        features.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+def text_vector(text: str):
+    """Нормированный вектор float32 хешированных признаков текста."""
+    import numpy as np
+
+    vector = np.zeros(VECTOR_DIMENSIONS, dtype=np.float32)
+    for feature, count in _features(text).items():
+        # crc32, а не hash(): хеш строк в Python меняется от запуска к запуску.
+        # Знак из старшего бита уменьшает искажение от коллизий
+        digest = zlib.crc32(feature.encode())
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        vector[digest % VECTOR_DIMENSIONS] += sign * (1.0 + math.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _vector_chunks(db: Session) -> Iterator[Tuple["object", "object"]]:
+    """Все сохраненные векторы блоками по VECTOR_CHUNK: (id ответов, матрица)."""
+    import numpy as np
+
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(ResponseVector.response_id, ResponseVector.vector).where(
+                ResponseVector.response_id > last_id
+            ).order_by(ResponseVector.response_id).limit(VECTOR_CHUNK)
+        ).all()
+        if not rows:
+            return
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        vectors = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), VECTOR_DIMENSIONS)
+        yield ids, vectors
+        last_id = int(ids[-1])
+
+def _vector_paths() -> Tuple[str, str]:
+    return (
+        os.path.join(settings.SIMILAR_VECTORS_DIR, VECTORS_FILE),
+        os.path.join(settings.SIMILAR_VECTORS_DIR, VECTOR_IDS_FILE),
+    )
+
+def _file_rows(path: str, row_size: int) -> int:
+    return os.path.getsize(path) // row_size if os.path.exists(path) else -1
+
+def _write_vector_files(db: Session) -> int:
+    """Переписывает копию векторов из БД; возвращает число строк."""
+    os.makedirs(settings.SIMILAR_VECTORS_DIR, exist_ok=True)
+    rows = 0
+    paths = _vector_paths()
+    with open(f"{paths[0]}.tmp", "wb") as vectors_file, open(f"{paths[1]}.tmp", "wb") as ids_file:
+        for ids, vectors in _vector_chunks(db):
+            vectors_file.write(vectors.tobytes())
+            ids_file.write(ids.tobytes())
+            rows += len(ids)
+    for path in paths:
+        os.replace(f"{path}.tmp", path)
+    redis_client.set(VECTOR_ROWS_KEY, rows)
+    return rows
+
+def _load_matrix(db: Session):
+    """Все векторы как memmap-матрица и id ответов ее строк; при расхождении копия строится заново."""
+    import numpy as np
+
+    vectors_path, ids_path = _vector_paths()
+    rows = _file_rows(ids_path, 8)
+    expected = redis_client.get(VECTOR_ROWS_KEY)
+    if expected is None or int(expected) != rows or _file_rows(vectors_path, VECTOR_DIMENSIONS * 4) != rows:
+        rows = _write_vector_files(db)
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, VECTOR_DIMENSIONS), dtype=np.float32)
+    ids = np.memmap(ids_path, dtype=np.int64, mode="r", shape=(rows,))
+    return ids, np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(rows, VECTOR_DIMENSIONS))
+
+def _append_vectors(ids, vectors) -> None:
+    """Дописывает векторы в копию на диске; прежние строки тех же ответов обнуляются."""
+    import numpy as np
+
+    vectors_path, ids_path = _vector_paths()
+    rows = _file_rows(ids_path, 8)
+    if rows > 0:
+        # После правки текста ответ индексируется заново. Нулевой вектор дает
+        # близость 0, и такие соседи отбрасываются; место освобождает перестройка
+        stale = np.flatnonzero(np.isin(np.memmap(ids_path, dtype=np.int64, mode="r", shape=(rows,)), ids))
+        if len(stale):
+            matrix = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(rows, VECTOR_DIMENSIONS))
+            matrix[stale] = 0
+            matrix.flush()
+    with open(vectors_path, "ab") as vectors_file, open(ids_path, "ab") as ids_file:
+        vectors_file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        ids_file.write(np.ascontiguousarray(ids, dtype=np.int64).tobytes())
+    redis_client.incrby(VECTOR_ROWS_KEY, len(ids))
+
+def _nearest(ids, vectors, matrix_ids, matrix, k: int):
+    """k ближайших строк matrix для каждой строки vectors, без самого ответа."""
+    import numpy as np
+
+    best_ids = np.empty((len(ids), 0), dtype=np.int64)
+    best_scores = np.empty((len(ids), 0), dtype=np.float32)
+    for start in range(0, len(matrix_ids), VECTOR_CHUNK):
+        # Срез memmap читает с диска только этот блок
+        chunk_ids = np.asarray(matrix_ids[start:start + VECTOR_CHUNK])
+        scores = vectors @ np.asarray(matrix[start:start + VECTOR_CHUNK]).T
+        scores[ids[:, None] == chunk_ids[None, :]] = -np.inf
+        candidate_ids = np.concatenate([best_ids, np.broadcast_to(chunk_ids, scores.shape)], axis=1)
+        candidate_scores = np.concatenate([best_scores, scores], axis=1)
+        if candidate_scores.shape[1] > k:
+            top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+            candidate_ids = np.take_along_axis(candidate_ids, top, axis=1)
+            candidate_scores = np.take_along_axis(candidate_scores, top, axis=1)
+        best_ids, best_scores = candidate_ids, candidate_scores
+    return best_ids, best_scores
+
+def _write_neighbors(ids, vectors, matrix_ids, matrix, symmetric: bool) -> None:
+    k = settings.SIMILAR_RESPONSES_NEIGHBORS
+    neighbor_ids, neighbor_scores = _nearest(ids, vectors, matrix_ids, matrix, k)
+    pipe = redis_store.pipeline()
+    for response_id, row_ids, row_scores in zip(ids, neighbor_ids, neighbor_scores):
+        # Несвязанные тексты дают близость около нуля; такие соседи не нужны
+        neighbors = {int(other): float(score) for other, score in zip(row_ids, row_scores) if score > 0}
+        pipe.delete(_similar_key(response_id))
+        if neighbors:
+            pipe.zadd(_similar_key(response_id), neighbors)
+        if symmetric:
+            # Новый ответ попадает и в списки своих соседей, вытесняя самого далекого
+            for other, score in neighbors.items():
+                pipe.zadd(_similar_key(other), {int(response_id): score})
+                pipe.zremrangebyrank(_similar_key(other), 0, -k - 1)
+    pipe.execute()
+
+def _text_vectors(rows: Sequence[Tuple[int, str]]):
+    import numpy as np
+
+    ids = np.array([response_id for response_id, _ in rows], dtype=np.int64)
+    return ids, np.vstack([text_vector(text) for _, text in rows])
+
+def _save_vectors(db: Session, ids, vectors) -> None:
+    db.add_all([
+        ResponseVector(response_id=int(response_id), vector=vector.tobytes())
+        for response_id, vector in zip(ids, vectors)
+    ])
+    db.commit()
+
+def index_new_responses(db: Session) -> int:
+    """Строит векторы ответов, у которых их еще нет, и находит им соседей.
+
+    Возвращает число проиндексированных ответов.
+    """
+    indexed = 0
+    while True:
+        rows = db.execute(
+            select(Response.id, Response.text).outerjoin(
+                ResponseVector, ResponseVector.response_id == Response.id
+            ).where(ResponseVector.response_id.is_(None)).order_by(Response.id).limit(INDEX_BATCH)
+        ).all()
+        if not rows:
+            return indexed
+        # Вектор в БД отмечает ответ проиндексированным, поэтому он сохраняется
+        # последним: если дозапись или Redis упадут раньше, следующий запуск
+        # проиндексирует эти ответы снова. Строки прерванной попытки он обнулит
+        # в _append_vectors, а при расхождении числа строк копия построится из БД
+        ids, vectors = _text_vectors(rows)
+        _load_matrix(db)
+        _append_vectors(ids, vectors)
+        _write_neighbors(ids, vectors, *_load_matrix(db), symmetric=True)
+        _save_vectors(db, ids, vectors)
+        indexed += len(rows)
+
+def rebuild_similar_responses(db: Session) -> int:
+    """Заново строит все векторы и соседей; нужен после смены векторизации.
+
+    Перебор всех пар: на больших объемах это долгая задача, поэтому она
+    запускается только вручную, а новые ответы индексирует index_new_responses.
+    Заодно заново пишется копия векторов на диске без строк удаленных ответов.
+    """
+    import numpy as np
+
+    db.execute(delete(ResponseVector))
+    db.commit()
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Response.id, Response.text).where(Response.id > last_id).order_by(Response.id).limit(VECTOR_CHUNK)
+        ).all()
+        if not rows:
+            break
+        _save_vectors(db, *_text_vectors(rows))
+        last_id = rows[-1][0]
+
+    _write_vector_files(db)
+    matrix_ids, matrix = _load_matrix(db)
+    for start in range(0, len(matrix_ids), INDEX_BATCH):
+        ids = np.asarray(matrix_ids[start:start + INDEX_BATCH])
+        _write_neighbors(ids, np.asarray(matrix[start:start + INDEX_BATCH]), matrix_ids, matrix, symmetric=False)
+    return len(matrix_ids)
+
+def forget_response_vector(db: Session, response_id: int) -> None:
+    """Удаляет вектор ответа, чтобы после изменения текста ответ проиндексировался заново."""
+    db.execute(delete(ResponseVector).where(ResponseVector.response_id == response_id))
+
+def remove_similar_responses(response_id: int) -> None:
+    """Удаляет список соседей удаленного ответа; из чужих списков он отсеивается при чтении."""
+    redis_client.delete(_similar_key(response_id))
+
+def get_similar_response_ids(response_id: int, limit: int = 5) -> List[int]:
+    """ID похожих ответов из индекса, самые близкие первыми."""
+    return [int(other) for other in redis_client.zrevrange(_similar_key(response_id), 0, limit - 1)]
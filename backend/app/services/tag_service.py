@@ -0,0 +1,158 @@
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models.models import Tag, Task, TaskTag
+from app.core.config import redis_client, settings
+from app.core import redis_store
+
+# Имена всех тегов с нулевым весом: ZRANGEBYLEX отдает их по префиксу
+TAG_NAMES_KEY = "tags:names"
+# Число заданий с тегом: sorted set имя -> количество, для фасетов и сортировки подсказок
+TAG_COUNTS_KEY = "tags:counts"
+# Задания с тегом, новые первыми: sorted set task_id -> task_id
+TAG_TASKS_KEY = "tag:{name}:tasks"
+
+MAX_TAG_LENGTH = 50
+
+# Добавляет задание в индекс тега, только если индекс уже построен; иначе
+# частичный индекс выглядел бы полным, и его целиком построит rebuild_tag_index
+ATTACH_TAG_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+redis.call('ZADD', KEYS[1], 0, ARGV[1])
+redis.call('ZINCRBY', KEYS[2], 1, ARGV[1])
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[2])
+return 1
+"""
+
+_attach_tag = redis_client.register_script(ATTACH_TAG_SCRIPT)
+
+def normalize_tag(name: str) -> str:
+    """Имя тега в нижнем регистре с одиночными пробелами."""
+    return " ".join(name.lower().split())[:MAX_TAG_LENGTH]
+
+def _tag_tasks_key(name: str) -> str:
+    return TAG_TASKS_KEY.format(name=name)
+
+def attach_tags(db: Session, task_id: int, names: Sequence[str]) -> List[Tag]:
+    """Добавляет заданию теги, создавая новые, и обновляет индекс тегов в Redis."""
+    names = list(dict.fromkeys(name for name in map(normalize_tag, names) if name))
+    if not names:
+        return []
+    tags = {tag.name: tag for tag in db.execute(select(Tag).where(Tag.name.in_(names))).scalars()}
+    for name in names:
+        if name not in tags:
+            tags[name] = Tag(name=name)
+            db.add(tags[name])
+    db.flush()
+
+    attached = set(db.execute(
+        select(TaskTag.tag_id).where(TaskTag.task_id == task_id, TaskTag.tag_id.in_([tag.id for tag in tags.values()]))
+    ).scalars())
+    new_names = [name for name in names if tags[name].id not in attached]
+    db.add_all([TaskTag(task_id=task_id, tag_id=tags[name].id) for name in new_names])
+    db.commit()
+
+    # Счетчики увеличиваются только для новых связей, повторная привязка их не меняет
+    pipe = redis_store.pipeline()
+    for name in new_names:
+        _attach_tag(keys=[TAG_NAMES_KEY, TAG_COUNTS_KEY, _tag_tasks_key(name)], args=[name, task_id], client=pipe)
+    if new_names:
+        pipe.execute()
+    return [tags[name] for name in names]
+
+def rebuild_tag_index(db: Session) -> int:
+    """Перестраивает индекс тегов в Redis из task_tags одной транзакцией MULTI/EXEC."""
+    rows = db.execute(select(Tag.name, TaskTag.task_id).join(TaskTag, TaskTag.tag_id == Tag.id)).all()
+    names = db.execute(select(Tag.name)).scalars().all()
+    tasks_by_tag: Dict[str, Dict[int, int]] = {name: {} for name in names}
+    for name, task_id in rows:
+        tasks_by_tag[name][task_id] = task_id
+
+    pipe = redis_store.pipeline(transaction=True)
+    pipe.delete(TAG_NAMES_KEY, TAG_COUNTS_KEY)
+    for name, task_ids in tasks_by_tag.items():
+        pipe.delete(_tag_tasks_key(name))
+        if task_ids:
+            pipe.zadd(_tag_tasks_key(name), task_ids)
+    if tasks_by_tag:
+        pipe.zadd(TAG_NAMES_KEY, {name: 0 for name in tasks_by_tag})
+        pipe.zadd(TAG_COUNTS_KEY, {name: len(task_ids) for name, task_ids in tasks_by_tag.items()})
+    pipe.execute()
+    return len(tasks_by_tag)
+
+def _read_if_indexed(read) -> Optional[list]:
+    # Индекс построен, если есть ключ имен; чтение и проверка — один round trip
+    pipe = redis_store.pipeline(transaction=True)
+    pipe.exists(TAG_NAMES_KEY)
+    read(pipe)
+    exists, items = pipe.execute()
+    return items if exists else None
+
+def autocomplete_tags(db: Session, prefix: str, limit: int = 10) -> List[Dict[str, int]]:
+    """Подсказки тегов по префиксу, популярные первыми."""
+    prefix = normalize_tag(prefix)
+    if not prefix:
+        return []
+    # Верхняя граница — байт 0xff после префикса в UTF-8, а не символ: так диапазон
+    # верен и для кириллицы
+    start = b"[" + prefix.encode()
+    stop = b"[" + prefix.encode() + b"\xff"
+    names = redis_store.read_or_rebuild(
+        db,
+        TAG_NAMES_KEY,
+        lambda: _read_if_indexed(
+            lambda pipe: pipe.zrangebylex(TAG_NAMES_KEY, start, stop, start=0, num=settings.TAG_AUTOCOMPLETE_CANDIDATES)
+        ),
+        rebuild_tag_index,
+        lambda: db.execute(
+            select(Tag.name).where(Tag.name.startswith(prefix)).order_by(Tag.name).limit(settings.TAG_AUTOCOMPLETE_CANDIDATES)
+        ).scalars().all()
+    )
+    if not names:
+        return []
+    counts = redis_client.zmscore(TAG_COUNTS_KEY, names)
+    facets = [{"name": name, "count": int(count or 0)} for name, count in zip(names, counts)]
+    facets.sort(key=lambda facet: (-facet["count"], facet["name"]))
+    return facets[:limit]
+
+def get_tag_facets(db: Session, limit: int = 20) -> List[Dict[str, int]]:
+    """Самые популярные теги с числом заданий."""
+    top = redis_store.read_or_rebuild(
+        db,
+        TAG_NAMES_KEY,
+        lambda: _read_if_indexed(lambda pipe: pipe.zrevrange(TAG_COUNTS_KEY, 0, limit - 1, withscores=True)),
+        rebuild_tag_index,
+        lambda: db.execute(
+            select(Tag.name, func.count(TaskTag.task_id)).join(TaskTag, TaskTag.tag_id == Tag.id).group_by(Tag.name).order_by(
+                func.count(TaskTag.task_id).desc(), Tag.name
+            ).limit(limit)
+        ).all()
+    )
+    return [{"name": name, "count": int(count)} for name, count in top]
+
+def get_task_ids_for_tag(db: Session, name: str, skip: int = 0, limit: int = 20) -> List[int]:
+    """ID заданий с тегом, новые первыми, из индекса в Redis."""
+    name = normalize_tag(name)
+    key = _tag_tasks_key(name)
+    task_ids = redis_store.read_or_rebuild(
+        db,
+        TAG_NAMES_KEY,
+        lambda: _read_if_indexed(lambda pipe: pipe.zrevrange(key, skip, skip + limit - 1)),
+        rebuild_tag_index,
+        lambda: db.execute(
+            select(TaskTag.task_id).join(Tag, Tag.id == TaskTag.tag_id).where(Tag.name == name).order_by(
+                TaskTag.task_id.desc()
+            ).offset(skip).limit(limit)
+        ).scalars().all()
+    )
+    return [int(task_id) for task_id in task_ids]
+
+def get_tasks_for_tag(db: Session, name: str, skip: int = 0, limit: int = 20) -> List[Task]:
+    """Страница заданий с тегом: id из Redis, сами задания по первичному ключу."""
+    task_ids = get_task_ids_for_tag(db, name, skip=skip, limit=limit)
+    if not task_ids:
+        return []
+    tasks = {task.id: task for task in db.execute(select(Task).where(Task.id.in_(task_ids))).scalars()}
+    return [tasks[task_id] for task_id in task_ids if task_id in tasks]
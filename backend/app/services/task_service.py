@@ -1,10 +1,16 @@
 import random
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from openai import OpenAI
+from starlette.concurrency import run_in_threadpool
 from app.models.models import Task
-from app.schemas.schemas import TaskCreate
+from app.schemas.schemas import TaskCreate, Task as TaskSchema
 from app.core.config import settings
+from app.core.cache import ReadThroughCache
+from app.core.pagination import keyset_page, split_page
+from app.core import redis_store
+from app.services.analytics_service import increment_counters, track_activity
 from enum import Enum
 
 class TaskCategory(Enum):
@@ -15,6 +21,15 @@ class TaskCategory(Enum):
     DRAWING = "drawing"
     ACTING = "acting"
 
+# Задания не меняются после создания, поэтому их можно долго держать и в памяти процесса
+task_cache = ReadThroughCache(
+    "tasks",
+    TaskSchema,
+    ttl=settings.TASK_CACHE_TTL,
+    local_maxsize=settings.CACHE_LOCAL_MAXSIZE,
+    local_ttl=settings.TASK_CACHE_TTL
+)
+
 # Расширенный список заданий с категориями
 TASKS_BY_CATEGORY = {
     TaskCategory.CREATIVE: [
@@ -95,13 +110,50 @@ def create_task(db: Session, task: TaskCreate, creator_id: Optional[int] = None)
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
+    _record_task_created(creator_id)
+    return db_task
+
+async def create_task_async(db: AsyncSession, task: TaskCreate, creator_id: Optional[int] = None) -> Task:
+    """Создает новое задание через асинхронную сессию."""
+    db_task = Task(**task.model_dump(), creator_id=creator_id)
+    db.add(db_task)
+    await db.commit()
+    await db.refresh(db_task)
+    await run_in_threadpool(_record_task_created, creator_id)
     return db_task
 
+def _record_task_created(creator_id: Optional[int]):
+    pipe = redis_store.pipeline()
+    increment_counters(pipe, tasks=1)
+    track_activity([creator_id], pipe)
+    pipe.execute()
+
 def get_task(db: Session, task_id: int) -> Optional[Task]:
     """Получает задание по ID."""
     return db.query(Task).filter(Task.id == task_id).first()
 
+def get_task_cached(db: Session, task_id: int) -> Optional[TaskSchema]:
+    """Получает задание по ID через read-through кэш."""
+    return task_cache.get(task_id, lambda: get_task(db, task_id))
+
 def get_tasks(db: Session, skip: int = 0, limit: int = 100) -> List[Task]:
     """Получает список заданий."""
 
     return db.query(Task).offset(skip).limit(limit).all()
+
+async def get_task_async(db: AsyncSession, task_id: int) -> Optional[Task]:
+    """Получает задание по ID через асинхронную сессию."""
+    return (await db.execute(select(Task).where(Task.id == task_id))).scalar_one_or_none()
+
+async def get_task_cached_async(db: AsyncSession, task_id: int) -> Optional[TaskSchema]:
+    """Получает задание по ID через read-through кэш и асинхронную сессию."""
+    return await task_cache.aget(task_id, lambda: get_task_async(db, task_id))
+
+async def get_tasks_async(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Task]:
+    """Получает список заданий через асинхронную сессию."""
+    return list((await db.execute(select(Task).offset(skip).limit(limit))).scalars())
+
+async def get_tasks_page_async(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100) -> Tuple[List[Task], Optional[str]]:
+    """Получает страницу заданий после курсора и курсор следующей страницы."""
+    stmt = keyset_page(select(Task), Task, db.bind.dialect.name, cursor, limit)
+    return split_page((await db.execute(stmt)).scalars().all(), limit)
@@ -1,36 +1,241 @@
 import json
+import logging
+from collections import defaultdict
 from typing import Optional
+import redis
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.models import Vote, Response
 from app.schemas.schemas import VoteCreate
-from app.core.config import redis_client
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from app.core.config import redis_client, settings
+from app.core import redis_store
+from app.services.analytics_service import increment_counters, track_activity
+from datetime import datetime, timedelta, timezone
+from math import log10
+from sqlalchemy import func, insert, select
 
-def calculate_hot_score(votes_count: int, created_at: datetime) -> float:
-    """Рассчитывает 'горячий' рейтинг как на Reddit."""
-    hours_since_creation = (datetime.utcnow() - created_at).total_seconds() / 3600
-    return votes_count / ((hours_since_creation + 2) ** 1.8)
+logger = logging.getLogger(__name__)
 
-def update_response_hot_score_cache(response_id: int, db: Session):
-    """Обновляет 'горячий' рейтинг ответа в Redis."""
-    response = db.query(Response).filter(Response.id == response_id).first()
-    if response:
-        votes = db.query(Vote).filter(Vote.response_id == response_id).all()
-        votes_count = len(votes)
-        hot_score = calculate_hot_score(votes_count, response.created_at)
-        redis_client.hset(f"response:{response_id}", "hot_score", hot_score)
-        redis_client.hset(f"response:{response_id}", "votes_count", votes_count)
+# Сколько ответов сверять с Redis за один pipeline при реконсиляции
+RECONCILE_BATCH_SIZE = 500
+
+# Рейтинг ответов по числу голосов: sorted set response_id -> votes_count
+LEADERBOARD_KEY = "leaderboard:votes"
+# "Горячий" рейтинг ответов за активное окно: sorted set response_id -> hot_score
+HOT_LEADERBOARD_KEY = "leaderboard:hot"
+
+# Точка отсчета и шаг "горячего" рейтинга: ответ, опубликованный на 12.5 часов
+# позже, обгоняет ответ с рейтингом в 10 раз выше
+HOT_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+HOT_TIME_SCALE = 45000
+
+# Буфер голосов для режима отложенной записи (VOTE_INGESTION_MODE = "buffered")
+VOTE_STREAM_KEY = "votes:stream"
+VOTE_STREAM_GROUP = "vote-writers"
+VOTE_STREAM_CONSUMER = "flusher"
+
+# Атомарно увеличивает счетчики ответа и его позиции в рейтингах. Рейтинги
+# обновляются, только если они уже построены, "горячий" — только для ответов
+# из активного окна. Если счетчиков ответа нет (первый голос, сброс
+# кэша), возвращает nil — тогда значения нужно один раз посчитать из БД.
+# Формула "горячего" рейтинга повторяет calculate_hot_score.
+INCREMENT_SCORE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('ZINCRBY', KEYS[2], ARGV[2], ARGV[3])
+end
+if redis.call('HEXISTS', KEYS[1], 'score') == 0 then
+    return nil
+end
+local created_ts = tonumber(redis.call('HGET', KEYS[1], 'created_ts'))
+if not created_ts then
+    return nil
+end
+local score = redis.call('HINCRBY', KEYS[1], 'score', ARGV[1])
+local votes_count = redis.call('HINCRBY', KEYS[1], 'votes_count', ARGV[2])
+if created_ts >= tonumber(ARGV[6]) and redis.call('EXISTS', KEYS[3]) == 1 then
+    local sign = 0
+    if score > 0 then sign = 1 elseif score < 0 then sign = -1 end
+    local hot = sign * math.log10(math.max(math.abs(score), 1)) + (created_ts - tonumber(ARGV[4])) / tonumber(ARGV[5])
+    redis.call('ZADD', KEYS[3], hot, ARGV[3])
+end
+return {score, votes_count}
+"""
+
+_increment_score = redis_client.register_script(INCREMENT_SCORE_SCRIPT)
+
+def _timestamp(dt: datetime) -> float:
+    # SQLite возвращает naive datetime в UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
 
-def create_vote(db: Session, vote: VoteCreate, user_id: int) -> Vote:
+def _hot_window_start() -> float:
+    return (datetime.now(timezone.utc) - timedelta(days=settings.HOT_WINDOW_DAYS)).timestamp()
+
+def calculate_hot_score(score: int, created_at: datetime) -> float:
+    """Рассчитывает 'горячий' рейтинг как на Reddit.
+
+    Рейтинг растет логарифмически от голосов и линейно от времени публикации,
+    поэтому порядок ответов не меняется со временем и не требует пересчета.
+    """
+    sign = 1 if score > 0 else -1 if score < 0 else 0
+    order = log10(max(abs(score), 1))
+    return sign * order + (_timestamp(created_at) - HOT_EPOCH) / HOT_TIME_SCALE
+
+def update_response_hot_score_cache(response: Response, score: int = 0, pipe=None):
+    """Обновляет 'горячий' рейтинг ответа в Redis, если ответ в активном окне."""
+    # Пока рейтинг не построен, его целиком соберет rebuild_hot_rankings
+    if _timestamp(response.created_at) >= _hot_window_start():
+        redis_store.zadd_if_exists(HOT_LEADERBOARD_KEY, {response.id: calculate_hot_score(score, response.created_at)}, pipe=pipe)
+
+def create_vote(db: Session, vote: VoteCreate, user_id: Optional[int]) -> Vote:
     """Создает новый голос."""
     db_vote = Vote(**vote.model_dump(), user_id=user_id)
     db.add(db_vote)
+    # Счетчики ответа обновляются в той же транзакции, что и голос
+    bump_response_aggregates(db, vote.response_id, score_delta=vote.value)
     db.commit()
     db.refresh(db_vote)
-    update_response_score_cache(vote.response_id, db)
+    increment_response_score_caches(db, {vote.response_id: (vote.value, 1)}, pipe=_vote_recorded_pipeline(user_id))
     return db_vote
 
+async def create_vote_async(db: AsyncSession, vote: VoteCreate, user_id: Optional[int]) -> Vote:
+    """Создает новый голос через асинхронную сессию."""
+    db_vote = Vote(**vote.model_dump(), user_id=user_id)
+    db.add(db_vote)
+    await db.run_sync(bump_response_aggregates, vote.response_id, vote.value)
+    await db.commit()
+    await db.refresh(db_vote)
+
+    missing = await apply_score_increments_async(
+        {vote.response_id: (vote.value, 1)}, _vote_recorded_pipeline(user_id, redis_store.async_pipeline())
+    )
+    for response_id in missing:
+        # populate_existing: в сессии может быть объект ответа со значениями до UPDATE
+        response = (await db.execute(
+            select(Response).where(Response.id == response_id).execution_options(populate_existing=True)
+        )).scalar_one_or_none()
+        if response is not None:
+            await write_response_score_cache_async(response)
+    return db_vote
+
+def _vote_recorded_pipeline(user_id: Optional[int], pipe=None):
+    # Счетчик голосов платформы и активность пользователя уходят вместе со счетчиками ответа
+    pipe = pipe if pipe is not None else redis_store.pipeline()
+    increment_counters(pipe, votes=1)
+    track_activity([user_id], pipe)
+    return pipe
+
+def submit_vote(db: Session, vote: VoteCreate, user_id: Optional[int]) -> Optional[Vote]:
+    """Принимает голос: записывает сразу или кладет в буфер, если включен режим отложенной записи.
+
+    В режиме буфера возвращает None — голос появится в БД после flush_vote_buffer.
+    """
+    if settings.VOTE_INGESTION_MODE == "buffered":
+        buffer_vote(vote, user_id)
+        return None
+    return create_vote(db, vote, user_id)
+
+async def submit_vote_async(db: AsyncSession, vote: VoteCreate, user_id: Optional[int]) -> Optional[Vote]:
+    """Асинхронный вариант submit_vote."""
+    if settings.VOTE_INGESTION_MODE == "buffered":
+        await buffer_vote_async(vote, user_id)
+        return None
+    return await create_vote_async(db, vote, user_id)
+
+def _queue_buffered_vote(vote: VoteCreate, user_id: Optional[int], pipe) -> None:
+    fields = {
+        "response_id": vote.response_id,
+        "value": vote.value,
+        "user_id": "" if user_id is None else user_id,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    # Активность отмечаем в момент голоса, а не при записи буфера в БД
+    pipe.xadd(VOTE_STREAM_KEY, fields)
+    track_activity([user_id], pipe)
+
+def buffer_vote(vote: VoteCreate, user_id: Optional[int]) -> str:
+    """Добавляет голос в поток Redis и возвращает ID записи."""
+    pipe = redis_store.pipeline()
+    _queue_buffered_vote(vote, user_id, pipe)
+    return pipe.execute()[0]
+
+async def buffer_vote_async(vote: VoteCreate, user_id: Optional[int]) -> str:
+    """Асинхронный вариант buffer_vote."""
+    pipe = redis_store.async_pipeline()
+    _queue_buffered_vote(vote, user_id, pipe)
+    return (await pipe.execute())[0]
+
+def flush_vote_buffer(db: Session, batch_size: Optional[int] = None) -> int:
+    """Переносит голоса из буфера в БД пачками.
+
+    Каждая пачка записывается одним многострочным INSERT, затем счетчики
+    каждого ответа обновляются один раз на всю пачку. Сначала дочитываются
+    записи, не подтвержденные прошлым запуском, поэтому падение между COMMIT
+    и XACK может привести к повторной записи голосов этой пачки.
+    Возвращает количество записанных голосов.
+    """
+    batch_size = batch_size or settings.VOTE_BUFFER_BATCH_SIZE
+    try:
+        redis_client.xgroup_create(VOTE_STREAM_KEY, VOTE_STREAM_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+    flushed = 0
+    # "0" — неподтвержденные записи прошлого запуска, ">" — новые
+    for start_id in ("0", ">"):
+        while True:
+            entries = redis_client.xreadgroup(
+                VOTE_STREAM_GROUP, VOTE_STREAM_CONSUMER, {VOTE_STREAM_KEY: start_id}, count=batch_size
+            )
+            messages = entries[0][1] if entries else []
+            if not messages:
+                break
+            flushed += _write_vote_batch(db, messages)
+            if len(messages) < batch_size:
+                break
+    return flushed
+
+def _write_vote_batch(db: Session, messages: list) -> int:
+    rows = [
+        {
+            "response_id": int(fields["response_id"]),
+            "value": int(fields["value"]),
+            "user_id": int(fields["user_id"]) if fields["user_id"] else None,
+            "created_at": datetime.fromisoformat(fields["created_at"])
+        }
+        for _, fields in messages
+    ]
+
+    # Голоса за несуществующие ответы отбрасываем, чтобы не блокировать весь буфер
+    response_ids = {row["response_id"] for row in rows}
+    existing = {response_id for (response_id,) in db.query(Response.id).filter(Response.id.in_(response_ids))}
+    valid_rows = [row for row in rows if row["response_id"] in existing]
+    if len(valid_rows) < len(rows):
+        logger.warning("Отброшено %d голосов за несуществующие ответы", len(rows) - len(valid_rows))
+
+    if valid_rows:
+        deltas = defaultdict(lambda: (0, 0))
+        for row in valid_rows:
+            score_delta, votes_delta = deltas[row["response_id"]]
+            deltas[row["response_id"]] = (score_delta + row["value"], votes_delta + 1)
+
+        db.execute(insert(Vote), valid_rows)
+        for response_id, (score_delta, votes_delta) in deltas.items():
+            bump_response_aggregates(db, response_id, score_delta=score_delta, votes_delta=votes_delta)
+        db.commit()
+
+        increment_response_score_caches(db, deltas)
+
+    message_ids = [message_id for message_id, _ in messages]
+    pipe = redis_store.pipeline()
+    increment_counters(pipe, votes=len(valid_rows))
+    pipe.xack(VOTE_STREAM_KEY, VOTE_STREAM_GROUP, *message_ids)
+    pipe.xdel(VOTE_STREAM_KEY, *message_ids)
+    pipe.execute()
+    return len(valid_rows)
+
 def get_vote(db: Session, vote_id: int) -> Optional[Vote]:
     """Получает голос по ID."""
     return db.query(Vote).filter(Vote.id == vote_id).first()
@@ -39,29 +244,191 @@ def get_votes_for_response(db: Session, response_id: int) -> list[Vote]:
     """Получает все голоса для ответа."""
     return db.query(Vote).filter(Vote.response_id == response_id).all()
 
+async def get_vote_async(db: AsyncSession, vote_id: int) -> Optional[Vote]:
+    """Получает голос по ID через асинхронную сессию."""
+    return (await db.execute(select(Vote).where(Vote.id == vote_id))).scalar_one_or_none()
+
+async def get_votes_for_response_async(db: AsyncSession, response_id: int) -> list[Vote]:
+    """Получает все голоса для ответа через асинхронную сессию."""
+    return list((await db.execute(select(Vote).where(Vote.response_id == response_id))).scalars())
+
+def bump_response_aggregates(db: Session, response_id: int, score_delta: int, votes_delta: int = 1):
+    """Увеличивает счетчики ответа в БД. Коммит остается за вызывающим кодом."""
+    db.query(Response).filter(Response.id == response_id).update({
+        Response.score: Response.score + score_delta,
+        Response.vote_count: Response.vote_count + votes_delta
+    }, synchronize_session=False)
+
+def increment_response_score_caches(db: Session, deltas: dict, pipe=None):
+    """Атомарно увеличивает рейтинг и число голосов ответов в Redis за O(1) на ответ.
+
+    deltas: response_id -> (score_delta, votes_delta). Все ответы обновляются
+    за один round trip; если передан pipe, его уже добавленные команды
+    выполняются в том же round trip.
+    """
+    for response_id in apply_score_increments(deltas, pipe=pipe):
+        # Счетчиков в кэше нет — инициализируем их из БД
+        update_response_score_cache(response_id, db)
+
+def _queue_score_increments(deltas: dict, pipe) -> None:
+    window_start = _hot_window_start()
+    for response_id, (score_delta, votes_delta) in deltas.items():
+        redis_store.run_script(
+            _increment_score,
+            [f"response:{response_id}", LEADERBOARD_KEY, HOT_LEADERBOARD_KEY],
+            [score_delta, votes_delta, response_id, HOT_EPOCH, HOT_TIME_SCALE, window_start],
+            pipe
+        )
+
+def apply_score_increments(deltas: dict, pipe=None) -> list[int]:
+    """Выполняет скрипты приращения счетчиков и возвращает ID ответов, чьих счетчиков нет в Redis."""
+    pipe = pipe if pipe is not None else redis_store.pipeline()
+    queued = len(pipe)
+    _queue_score_increments(deltas, pipe)
+    results = pipe.execute()[queued:]
+    return [response_id for response_id, result in zip(deltas, results) if result is None]
+
+async def apply_score_increments_async(deltas: dict, pipe) -> list[int]:
+    """Вариант apply_score_increments для pipeline асинхронного клиента."""
+    queued = len(pipe)
+    _queue_score_increments(deltas, pipe)
+    results = (await pipe.execute())[queued:]
+    return [response_id for response_id, result in zip(deltas, results) if result is None]
+
 def update_response_score_cache(response_id: int, db: Session):
-    """Обновляет рейтинг ответа в Redis."""
+    """Копирует счетчики ответа из БД в Redis."""
     response = db.query(Response).filter(Response.id == response_id).first()
     if response:
-        votes = db.query(Vote).filter(Vote.response_id == response_id).all()
-        score = sum(vote.value for vote in votes)
-        redis_client.hset(f"response:{response_id}", "score", score)
-        redis_client.hset(f"response:{response_id}", "votes_count", len(votes))
-        update_top_responses_cache(db)
-
-def update_top_responses_cache(db: Session, limit: int = 10):
-    """Обновляет кэш топовых ответов."""
-    # Получаем топ ответов из БД
-    from sqlalchemy import func
-    vote_counts = db.query(
-        Response.id,
-        func.count(Vote.id).label('vote_count')
-    ).join(Vote, Response.id == Vote.response_id).group_by(Response.id).order_by(func.count(Vote.id).desc()).limit(limit).all()
-    
-    # Преобразуем в список ID
-    top_ids = [str(item[0]) for item in vote_counts]
-    
-    # Сохраняем в Redis
-    redis_client.delete("top_responses")
-    if top_ids:
-        redis_client.lpush("top_responses", *top_ids)
\ No newline at end of file
+        write_response_score_cache(response)
+
+def _queue_response_score_cache(response: Response, pipe) -> None:
+    pipe.hset(f"response:{response.id}", mapping={
+        "score": response.score,
+        "votes_count": response.vote_count,
+        "created_ts": _timestamp(response.created_at)
+    })
+    update_response_hot_score_cache(response, response.score, pipe=pipe)
+
+def write_response_score_cache(response: Response):
+    """Записывает счетчики загруженного ответа в Redis."""
+    pipe = redis_store.pipeline()
+    _queue_response_score_cache(response, pipe)
+    pipe.execute()
+
+async def write_response_score_cache_async(response: Response):
+    """Асинхронный вариант write_response_score_cache."""
+    pipe = redis_store.async_pipeline()
+    _queue_response_score_cache(response, pipe)
+    await pipe.execute()
+
+def reconcile_response_scores(db: Session) -> int:
+    """Сверяет счетчики в Redis с таблицей votes и исправляет расхождения.
+
+    Заодно перестраивает рейтинг ответов. Возвращает количество исправленных
+    ответов. Голос, закоммиченный во время сверки, может быть временно потерян
+    в кэше — его вернет следующий запуск.
+    """
+    totals = db.query(
+        Vote.response_id,
+        func.coalesce(func.sum(Vote.value), 0),
+        func.count(Vote.id)
+    ).group_by(Vote.response_id).all()
+
+    repaired = 0
+    for start in range(0, len(totals), RECONCILE_BATCH_SIZE):
+        batch = totals[start:start + RECONCILE_BATCH_SIZE]
+
+        cached = redis_store.hmget_many([f"response:{response_id}" for response_id, _, _ in batch], "score", "votes_count")
+
+        drifted = {
+            f"response:{response_id}": {"score": score, "votes_count": votes_count}
+            for (response_id, score, votes_count), (cached_score, cached_votes) in zip(batch, cached)
+            if cached_score != str(score) or cached_votes != str(votes_count)
+        }
+        redis_store.hset_many(drifted)
+        repaired += len(drifted)
+
+    _write_leaderboard({response_id: votes_count for response_id, _, votes_count in totals})
+    return repaired
+
+def rebuild_leaderboard(db: Session) -> int:
+    """Перестраивает рейтинг ответов по числу голосов из счетчиков в БД."""
+    vote_counts = db.query(Response.id, Response.vote_count).filter(Response.vote_count > 0).all()
+    _write_leaderboard(dict(vote_counts))
+    return len(vote_counts)
+
+def _write_leaderboard(vote_counts: dict):
+    # Собираем рейтинг во временном ключе и атомарно подменяем им текущий
+    tmp_key = f"{LEADERBOARD_KEY}:rebuild"
+    pipe = redis_client.pipeline()
+    pipe.delete(tmp_key)
+    if vote_counts:
+        pipe.zadd(tmp_key, vote_counts)
+        pipe.rename(tmp_key, LEADERBOARD_KEY)
+    else:
+        pipe.delete(LEADERBOARD_KEY)
+    pipe.execute()
+
+def remove_response_from_rankings(response_id: int):
+    """Удаляет ответ из рейтингов и его счетчики из Redis."""
+    pipe = redis_client.pipeline()
+    pipe.zrem(LEADERBOARD_KEY, response_id)
+    pipe.zrem(HOT_LEADERBOARD_KEY, response_id)
+    pipe.delete(f"response:{response_id}")
+    pipe.execute()
+
+def get_top_response_ids(db: Session, limit: int = 10, offset: int = 0) -> list[tuple[int, int]]:
+    """Возвращает (response_id, votes_count) топовых ответов из рейтинга в Redis."""
+    top = redis_store.read_or_rebuild(
+        db,
+        LEADERBOARD_KEY,
+        lambda: redis_store.zrevrange_if_exists(LEADERBOARD_KEY, offset, offset + limit - 1, withscores=True),
+        rebuild_leaderboard,
+        # Тот же порядок дает индекс ix_responses_vote_count_id
+        lambda: db.query(Response.id, Response.vote_count).filter(Response.vote_count > 0).order_by(
+            Response.vote_count.desc(), Response.id.desc()
+        ).offset(offset).limit(limit).all()
+    )
+    return [(int(response_id), int(votes_count)) for response_id, votes_count in top]
+
+def get_top_responses_with_scores(db: Session, limit: int = 10, offset: int = 0) -> list[tuple[int, int, int]]:
+    """Возвращает (response_id, votes_count, score) топовых ответов за два round trip."""
+    top = get_top_response_ids(db, limit=limit, offset=offset)
+    scores = redis_store.hmget_many([f"response:{response_id}" for response_id, _ in top], "score")
+    return [
+        (response_id, votes_count, int(score or 0))
+        for (response_id, votes_count), (score,) in zip(top, scores)
+    ]
+
+def rebuild_hot_rankings(db: Session) -> int:
+    """Перестраивает 'горячий' рейтинг только по ответам из активного окна."""
+    since = datetime.now(timezone.utc) - timedelta(days=settings.HOT_WINDOW_DAYS)
+    rows = db.query(Response.id, Response.created_at, Response.score).filter(
+        Response.created_at >= since
+    ).all()
+
+    tmp_key = f"{HOT_LEADERBOARD_KEY}:rebuild"
+    pipe = redis_client.pipeline()
+    pipe.delete(tmp_key)
+    if rows:
+        pipe.zadd(tmp_key, {response_id: calculate_hot_score(score, created_at) for response_id, created_at, score in rows})
+        pipe.rename(tmp_key, HOT_LEADERBOARD_KEY)
+    else:
+        pipe.delete(HOT_LEADERBOARD_KEY)
+    pipe.execute()
+    return len(rows)
+
+def get_hot_response_ids(db: Session, limit: int = 10, offset: int = 0) -> list[int]:
+    """Возвращает ID ответов из 'горячего' рейтинга в Redis."""
+    since = datetime.now(timezone.utc) - timedelta(days=settings.HOT_WINDOW_DAYS)
+    hot_ids = redis_store.read_or_rebuild(
+        db,
+        HOT_LEADERBOARD_KEY,
+        lambda: redis_store.zrevrange_if_exists(HOT_LEADERBOARD_KEY, offset, offset + limit - 1),
+        rebuild_hot_rankings,
+        # Пока рейтинг перестраивается, приближаем его рейтингом ответов из окна
+        lambda: [response_id for response_id, in db.query(Response.id).filter(Response.created_at >= since).order_by(
+            Response.score.desc(), Response.created_at.desc()
+        ).offset(offset).limit(limit)]
+    )
+    return [int(response_id) for response_id in hot_ids]
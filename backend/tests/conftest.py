@@ -1,5 +1,8 @@
 import os
+import uuid
 import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.database import Base
@@ -12,7 +15,11 @@ os.environ['REDIS_URL'] = "redis://localhost:6379/0"
 os.environ['SECRET_KEY'] = "test-secret-key-for-tests"
 
 
-from app.core.config import settings
+from app.core.config import settings, redis_client
+from app.models import models  # регистрирует таблицы в метаданных
+from app.api.deps import get_db
+from app.api.routes import api_router
+from app.core.replicas import read_your_writes_middleware
 SQLALCHEMY_DATABASE_URL = settings.database_url # Это будет "sqlite:///./test.db"
 
 engine = create_engine(
@@ -29,3 +36,38 @@ def db():
         yield db
     finally:
         db.close()
+
+@pytest.fixture
+def redis():
+    redis_client.flushdb()
+    try:
+        yield redis_client
+    finally:
+        redis_client.flushdb()
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def api_client():
+    """Клиент API приложения на тестовой БД, без фоновых задач и статики."""
+    app = FastAPI()
+    app.middleware("http")(read_your_writes_middleware)
+    app.include_router(api_router, prefix="/api")
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+@pytest.fixture
+def make_users(db):
+    """Создает пользователей с уникальными для запуска именами; id назначает БД."""
+    def make(*names):
+        run = uuid.uuid4().hex
+        users = [models.User(username=f"{name}_{run}", email=f"{name}_{run}@example.com") for name in names]
+        db.add_all(users)
+        db.commit()
+        return users
+    return make
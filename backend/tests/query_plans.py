@@ -0,0 +1,62 @@
+"""Планы запросов: какие таблицы запрос читает полным сканированием."""
+import json
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+
+@contextmanager
+def capture_selects(engine: Engine) -> Iterator[List[Tuple[str, Any]]]:
+    """Собирает SELECT-запросы, выполненные через engine внутри блока."""
+    statements: List[Tuple[str, Any]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _sqlite_scans(connection: Connection, statement: str, parameters: Any) -> List[str]:
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    scans = []
+    for row in rows:
+        detail = row[-1]
+        # "SCAN votes" — полный проход; "SCAN responses USING INDEX ..." — обход индекса
+        if detail.startswith("SCAN ") and "USING" not in detail:
+            table = detail.split()[1]
+            if not table.startswith("("):
+                scans.append(table)
+    return scans
+
+
+def _postgres_scans(connection: Connection, statement: str, parameters: Any) -> List[str]:
+    # На маленьком наборе данных планировщик и так выбрал бы Seq Scan,
+    # поэтому он запрещается: если Seq Scan остался, подходящего индекса нет
+    with connection.begin_nested():
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan":
+            scans.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return scans
+
+
+def sequential_scans(engine: Engine, statement: str, parameters: Any = ()) -> List[str]:
+    """Таблицы, которые запрос читает полным сканированием (SQLite или PostgreSQL)."""
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            return _postgres_scans(connection, statement, parameters)
+        return _sqlite_scans(connection, statement, parameters)
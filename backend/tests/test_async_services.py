@@ -0,0 +1,47 @@
+import pytest
+from app.core.database import AsyncSessionLocal
+from app.models.models import Response
+from app.schemas.schemas import ResponseCreate, TaskCreate, VoteCreate
+from app.services.response_service import create_response_async, get_response_cached_async
+from app.services.task_service import create_task_async, get_task_cached_async
+from app.services.vote_service import create_vote_async
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_async_services_write_db_and_counters(redis):
+    """Тест асинхронных сервисов: запись через AsyncSession и счетчики в Redis."""
+    async with AsyncSessionLocal() as db:
+        task = await create_task_async(db, TaskCreate(text="Асинхронное задание"))
+        response = await create_response_async(db, ResponseCreate(text="Асинхронный ответ", task_id=task.id))
+        await create_vote_async(db, VoteCreate(response_id=response.id, value=1), user_id=1)
+        await create_vote_async(db, VoteCreate(response_id=response.id, value=1), user_id=2)
+
+        db_response = await db.get(Response, response.id, populate_existing=True)
+        assert db_response.vote_count == 2
+        assert db_response.score == 2
+        assert redis.hget(f"response:{response.id}", "votes_count") == "2"
+
+        assert (await get_task_cached_async(db, task.id)).text == "Асинхронное задание"
+        assert (await get_response_cached_async(db, response.id)).text == "Асинхронный ответ"
+        assert await get_response_cached_async(db, 999999) is None
+
+
+@pytest.mark.anyio
+async def test_async_vote_restores_counters_after_redis_reset(redis):
+    """Тест асинхронного голоса после сброса Redis: скрипты загружаются заново, счетчики берутся из БД."""
+    async with AsyncSessionLocal() as db:
+        task = await create_task_async(db, TaskCreate(text="Задание для сброса Redis"))
+        response = await create_response_async(db, ResponseCreate(text="Ответ для сброса Redis", task_id=task.id))
+        await create_vote_async(db, VoteCreate(response_id=response.id, value=1), user_id=1)
+
+        redis.delete(f"response:{response.id}")
+        redis.script_flush()
+        await create_vote_async(db, VoteCreate(response_id=response.id, value=-1), user_id=2)
+
+        assert redis.hget(f"response:{response.id}", "votes_count") == "2"
+        assert redis.hget(f"response:{response.id}", "score") == "0"
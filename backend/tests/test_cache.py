@@ -0,0 +1,153 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from app.core.cache import LRUCache, ReadThroughCache
+from app.core.config import settings
+from app.core.redis_store import scan_namespaces
+from app.models.models import Response, Task
+from app.schemas.schemas import ResponseUpdate
+from app.services.response_service import get_response_cached, response_cache, update_response
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Тест вытеснения давно не использованных ключей."""
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries():
+    """Тест истечения TTL записей."""
+    cache = LRUCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_read_through_cache_tiers_and_invalidation(db, redis):
+    """Тест двухуровневого кэша ответов и его инвалидации при обновлении."""
+    task = Task(text="Задание для кэша")
+    db.add(task)
+    db.commit()
+    response = Response(text="Исходный текст", task_id=task.id)
+    db.add(response)
+    db.commit()
+    response_cache.local.clear()
+    stats_before = response_cache.stats()
+
+    assert get_response_cached(db, response.id).text == "Исходный текст"
+    assert get_response_cached(db, response.id).text == "Исходный текст"
+    response_cache.local.clear()
+    assert get_response_cached(db, response.id).text == "Исходный текст"
+
+    stats = response_cache.stats()
+    assert stats["misses"] - stats_before["misses"] == 1
+    assert stats["local_hits"] - stats_before["local_hits"] == 1
+    assert stats["redis_hits"] - stats_before["redis_hits"] == 1
+
+    update_response(db, response.id, ResponseUpdate(text="Новый текст"))
+    assert get_response_cached(db, response.id).text == "Новый текст"
+
+
+def test_scan_namespaces_counts_keys_incrementally(redis):
+    """Тест подсчета ключей по пространствам имен через SCAN с продолжением по cursor."""
+    for i in range(30):
+        redis.set(f"cache:tasks:{i}", "{}")
+    for i in range(20):
+        redis.hset(f"response:{i}", mapping={"score": i})
+
+    first = scan_namespaces(max_keys=10, count=5)
+    assert not first["complete"]
+    assert first["scanned_keys"] < 50
+
+    total = sum(ns["keys"] for ns in first["namespaces"].values())
+    cursor = first["cursor"]
+    while cursor:
+        page = scan_namespaces(cursor=cursor, max_keys=10, count=5)
+        total += sum(ns["keys"] for ns in page["namespaces"].values())
+        cursor = page["cursor"]
+    assert total == 50
+
+    full = scan_namespaces(max_keys=1000)
+    assert full["complete"]
+    assert full["namespaces"]["cache:tasks"]["keys"] == 30
+    assert full["namespaces"]["response"]["keys"] == 20
+    assert full["namespaces"]["response"]["estimated_bytes"] > 0
+
+
+def test_invalidate_all_switches_generation_without_touching_counters(db, redis):
+    """Тест сброса пространства имен сменой поколения: счетчики голосов остаются."""
+    task = Task(text="Задание для поколений кэша")
+    db.add(task)
+    db.commit()
+    response = Response(text="Старый текст", task_id=task.id)
+    db.add(response)
+    db.commit()
+    redis.hset(f"response:{response.id}", mapping={"score": 5, "votes_count": 5})
+
+    assert get_response_cached(db, response.id).text == "Старый текст"
+    db.query(Response).filter(Response.id == response.id).update({"text": "Новый текст"})
+    db.commit()
+    response_cache.local.clear()
+    assert get_response_cached(db, response.id).text == "Старый текст"
+
+    response_cache.invalidate_all()
+
+    assert get_response_cached(db, response.id).text == "Новый текст"
+    assert redis.hget(f"response:{response.id}", "score") == "5"
+
+
+def test_read_through_cache_loads_once_under_concurrency(redis):
+    """Тест защиты от лавины: при одновременных промахах значение загружает один поток."""
+    cache = ReadThroughCache("stampede", Dict[str, int], ttl=60, local_maxsize=10, local_ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"value": 42}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: cache.get("key", loader), range(8)))
+
+    assert results == [{"value": 42}] * 8
+    assert len(calls) == 1
+
+
+def test_read_through_cache_refreshes_early_and_serves_stale_value(redis, monkeypatch):
+    """Тест раннего обновления: значение пересчитывается до истечения TTL."""
+    cache = ReadThroughCache("early", Dict[str, int], ttl=60, local_maxsize=10, local_ttl=60)
+    cache.get("key", lambda: {"value": 1})
+    cache.local.clear()
+
+    monkeypatch.setattr("app.core.cache._should_refresh_early", lambda compute_ms, ttl_ms: True)
+    lock = redis.lock("lock:cache:early:key", timeout=5)
+    lock.acquire()
+    # Пока пересчет идет в другом воркере, отдается текущее значение
+    assert cache.get("key", lambda: {"value": 2}) == {"value": 1}
+    lock.release()
+
+    cache.local.clear()
+    assert cache.get("key", lambda: {"value": 2}) == {"value": 2}
+
+
+def test_invalidate_all_reaches_local_cache_of_other_processes(redis, monkeypatch):
+    """Тест сброса поколения: LRU другого процесса перестает отдавать старые значения."""
+    # Два экземпляра с одним пространством имен — кэши двух воркеров
+    worker, other_worker = (
+        ReadThroughCache("generations", Dict[str, int], ttl=60, local_maxsize=10, local_ttl=3600) for _ in range(2)
+    )
+    assert worker.get("key", lambda: {"value": 1}) == {"value": 1}
+    assert other_worker.get("key", lambda: {"value": 2}) == {"value": 1}
+
+    worker.invalidate_all()
+    # До проверки поколения другой воркер отдает значение из своего LRU
+    assert other_worker.get("key", lambda: {"value": 2}) == {"value": 1}
+    monkeypatch.setattr(settings, "CACHE_GENERATION_CHECK_INTERVAL", 0)
+    assert other_worker.get("key", lambda: {"value": 2}) == {"value": 2}
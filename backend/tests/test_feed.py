@@ -0,0 +1,69 @@
+from app.core.config import settings
+from app.models.models import Task
+from app.schemas.schemas import ResponseCreate
+from app.services.feed_service import FEED_KEY, PULLED_AUTHORS_KEY, rebuild_feeds
+from app.services.response_service import create_response
+
+
+def _feed(client, user_id, cursor=None, limit=20):
+    params = {"user_id": user_id, "limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    response = client.get("/api/feed/", params=params)
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()], response.headers.get("X-Next-Cursor")
+
+
+def test_feed_fan_out_on_write_and_read(api_client, db, redis, make_users, monkeypatch):
+    """Тест ленты: рассылка при записи, подмешивание популярных авторов, страницы и отписка."""
+    monkeypatch.setattr(settings, "FEED_FANOUT_MAX_FOLLOWERS", 2)
+    author, celebrity, reader, fan, other_fan = make_users("feed_author", "feed_celebrity", "feed_reader", "feed_fan", "feed_other_fan")
+    task = Task(text="Лента")
+    db.add(task)
+    db.commit()
+
+    old = create_response(db, ResponseCreate(text="старый ответ", task_id=task.id), author_id=author.id)
+    for subscriber, target in [(reader, author), (reader, celebrity), (fan, celebrity), (other_fan, celebrity)]:
+        response = api_client.post(f"/api/feed/subscriptions/{target.id}", params={"user_id": subscriber.id})
+        assert response.status_code == 201
+    assert api_client.post(f"/api/feed/subscriptions/{reader.id}", params={"user_id": reader.id}).status_code == 400
+
+    # Первое чтение строит ленту из подписок, включая ответы до подписки
+    assert _feed(api_client, reader.id) == ([old.id], None)
+
+    first = create_response(db, ResponseCreate(text="первый", task_id=task.id), author_id=author.id)
+    famous = create_response(db, ResponseCreate(text="известный", task_id=task.id), author_id=celebrity.id)
+    last = create_response(db, ResponseCreate(text="последний", task_id=task.id), author_id=author.id)
+
+    # Ответы обычного автора разосланы в ленту, ответ популярного автора подмешивается при чтении
+    assert redis.sismember(PULLED_AUTHORS_KEY, celebrity.id)
+    assert redis.zscore(FEED_KEY.format(user_id=reader.id), last.id) is not None
+    assert redis.zscore(FEED_KEY.format(user_id=reader.id), famous.id) is None
+
+    # Страница ленты — один вызов скрипта в Redis
+    redis.config_resetstat()
+    page, cursor = _feed(api_client, reader.id, limit=2)
+    stats = redis.info("commandstats")
+    assert page == [last.id, famous.id]
+    assert stats["cmdstat_evalsha"]["calls"] == 1
+    # Команды внутри скрипта тоже попадают в статистику
+    assert set(stats) <= {"cmdstat_config", "cmdstat_evalsha", "cmdstat_exists", "cmdstat_sinter", "cmdstat_zrevrangebyscore"}
+    assert _feed(api_client, reader.id, cursor=cursor, limit=2) == ([first.id, old.id], str(old.id))
+
+    # После очистки Redis чтение строит ленту и возвращает читателя в подписчики
+    # автора, поэтому следующий ответ снова рассылается
+    redis.flushdb()
+    assert _feed(api_client, reader.id)[0] == [last.id, famous.id, first.id, old.id]
+    after_flush = create_response(db, ResponseCreate(text="после очистки", task_id=task.id), author_id=author.id)
+    assert redis.zscore(FEED_KEY.format(user_id=reader.id), after_flush.id) is not None
+
+    # Перестройка удаляет ленты, следующее чтение строит их заново с тем же содержимым
+    rebuild_feeds(db)
+    assert not redis.exists(FEED_KEY.format(user_id=reader.id))
+    assert _feed(api_client, reader.id)[0] == [after_flush.id, last.id, famous.id, first.id, old.id]
+
+    # После отписки ответы автора пропадают из ленты
+    assert api_client.delete(f"/api/feed/subscriptions/{author.id}", params={"user_id": reader.id}).status_code == 204
+    assert _feed(api_client, reader.id)[0] == [famous.id]
+    assert api_client.delete(f"/api/feed/subscriptions/{author.id}", params={"user_id": reader.id}).status_code == 404
+
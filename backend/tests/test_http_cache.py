@@ -0,0 +1,55 @@
+from datetime import datetime
+import pytest
+from app.core.pagination import encode_cursor
+from app.services.task_service import task_cache
+
+
+def test_task_etag_short_circuits_without_lookup(api_client, redis):
+    """Тест ответа 304 для неизменяемого задания без обращения к кэшу и БД."""
+    created = api_client.post("/api/tasks/", json={"text": "Задание для ETag"}).json()
+    response = api_client.get(f"/api/tasks/{created['id']}")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+    assert "last-modified" in response.headers
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    task_cache.local.clear()
+    stats_before = task_cache.stats()
+    response = api_client.get(f"/api/tasks/{created['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert task_cache.stats()["misses"] == stats_before["misses"]
+    assert task_cache.stats()["redis_hits"] == stats_before["redis_hits"]
+
+    response = api_client.get(
+        f"/api/tasks/{created['id']}",
+        headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+    assert api_client.get(f"/api/tasks/{created['id']}", headers={"If-None-Match": "*"}).status_code == 304
+
+
+def test_task_etag_wildcard_requires_existing_task(api_client, redis):
+    """Тест If-None-Match: * для несуществующего задания: 404, а не 304."""
+    missing_id = api_client.post("/api/tasks/", json={"text": "Последнее задание"}).json()["id"] + 1000
+    response = api_client.get(f"/api/tasks/{missing_id}", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+
+
+def test_list_etag_changes_with_content(api_client, redis):
+    """Тест ETag по содержимому списка и его смены после изменения данных."""
+    first_task = api_client.post("/api/tasks/", json={"text": "Первое задание списка"}).json()
+    # Страница начинается с созданного задания, поэтому на нее попадет и следующее,
+    # сколько бы заданий ни накопилось в тестовой БД
+    params = {"cursor": encode_cursor(datetime.fromisoformat(first_task["created_at"]), first_task["id"] - 1)}
+    first = api_client.get("/api/tasks/", params=params)
+    assert [task["id"] for task in first.json()] == [first_task["id"]]
+    etag = first.headers["etag"]
+    assert api_client.get("/api/tasks/", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    second_task = api_client.post("/api/tasks/", json={"text": "Второе задание списка"}).json()
+    changed = api_client.get("/api/tasks/", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert [task["id"] for task in changed.json()] == [first_task["id"], second_task["id"]]
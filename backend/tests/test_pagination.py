@@ -0,0 +1,57 @@
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.models.models import Response, Task
+from app.schemas.schemas import CommentCreate
+from app.services.comment_service import create_comment
+
+
+def _read_all(api_client, url, limit):
+    items, pages, cursor = [], 0, None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = api_client.get(url, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= limit
+        items.extend(page)
+        pages += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return items, pages
+
+
+def test_task_cursor_pages_cover_list_once(api_client, redis):
+    """Тест обхода заданий по курсору без пропусков и повторов."""
+    created = [api_client.post("/api/tasks/", json={"text": f"Задание страницы {i}"}).json()["id"] for i in range(7)]
+    items, pages = _read_all(api_client, "/api/tasks/", limit=3)
+    ids = [item["id"] for item in items]
+    assert len(ids) == len(set(ids))
+    assert ids[-len(created):] == created
+    assert pages == -(-len(ids) // 3)
+
+    offset_page = api_client.get("/api/tasks/", params={"skip": 0, "limit": 3})
+    assert NEXT_CURSOR_HEADER not in offset_page.headers
+    assert len(offset_page.json()) == 3
+
+
+def test_comment_cursor_pages_and_bad_cursor(api_client, db, redis):
+    """Тест постраничной выдачи комментариев и ошибки на некорректный курсор."""
+    task = Task(text="Задание для комментариев")
+    db.add(task)
+    db.commit()
+    response = Response(task_id=task.id, text="Ответ с комментариями")
+    db.add(response)
+    db.commit()
+    created = [
+        create_comment(db, CommentCreate(response_id=response.id, content=f"Комментарий {i}")).id
+        for i in range(5)
+    ]
+
+    items, pages = _read_all(api_client, f"/api/comments/response/{response.id}", limit=2)
+    assert [item["id"] for item in items] == created
+    assert pages == 3
+
+    bad = api_client.get(f"/api/comments/response/{response.id}", params={"cursor": "not-a-cursor"})
+    assert bad.status_code == 400
+    assert api_client.get("/api/tasks/", params={"limit": 100000}).status_code == 422
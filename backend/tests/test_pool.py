@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from app.core import pool
+from app.core.pool import InstrumentedQueuePool, get_pool_stats, instrument
+
+
+def test_instrumented_pool_reports_usage_and_timeouts(tmp_path, monkeypatch):
+    """Тест метрик пула: занятые соединения, загрузка и таймауты ожидания."""
+    # Тестовый движок регистрируется в копии реестра и не попадает в статистику процесса
+    monkeypatch.setattr(pool, "_engines", dict(pool._engines))
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05
+    )
+    instrument("test", engine)
+
+    connection = engine.connect()
+    stats = get_pool_stats()["test"]
+    assert stats["checked_out"] == 1
+    assert stats["utilization"] == 1.0
+    assert stats["checkouts"] == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    stats = get_pool_stats()["test"]
+    assert stats["timeouts"] == 1
+    assert stats["wait_max_ms"] >= 50
+
+    connection.close()
+    engine.dispose()
+    # После пересоздания пула метрики сохраняются
+    engine.connect().close()
+    assert get_pool_stats()["test"]["checkouts"] == 2
+    engine.dispose()
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import pytest
+from sqlalchemy import insert, select
+from app.models.models import Comment, Response, Subscription, Task, User, Vote
+from app.services.comment_service import get_comments_page, get_comments_version
+from app.services.ranking_service import RankingPeriod, get_top_responses_for_period, materialize_top_responses
+from app.services.response_service import get_responses_for_task
+from app.services.vote_service import get_votes_for_response
+from tests.conftest import engine
+from tests.query_plans import capture_selects, sequential_scans
+
+
+@pytest.fixture
+def seeded(db, redis):
+    """Небольшой набор данных: задания, ответы, голоса, комментарии и подписки."""
+    run = uuid4().hex[:8]
+    users = [User(username=f"plan_user_{i}_{run}", email=f"plan_{i}_{run}@example.com") for i in range(20)]
+    db.add_all(users)
+    db.commit()
+    tasks = [Task(text=f"Задание плана {i}", creator_id=users[i % 20].id) for i in range(10)]
+    db.add_all(tasks)
+    db.commit()
+    responses = [
+        Response(text=f"Ответ плана {i}", task_id=tasks[i % 10].id, author_id=users[i % 20].id)
+        for i in range(50)
+    ]
+    db.add_all(responses)
+    db.commit()
+
+    now = datetime.now(timezone.utc)
+    db.execute(insert(Vote), [
+        {"response_id": responses[i % 50].id, "user_id": users[i % 20].id, "value": 1,
+         "created_at": now - timedelta(hours=i % 200)}
+        for i in range(1000)
+    ])
+    db.execute(insert(Comment), [
+        {"response_id": responses[i % 50].id, "author_id": users[i % 20].id, "content": f"Комментарий {i}"}
+        for i in range(300)
+    ])
+    db.add_all([Subscription(subscriber_id=users[i].id, target_user_id=users[(i + 1) % 20].id) for i in range(20)])
+    db.commit()
+    return {"users": users, "tasks": tasks, "responses": responses}
+
+
+def _gallery(db, seeded):
+    materialize_top_responses(db)
+    # Второй пересчет идет по инкрементальной ветке с кандидатами
+    materialize_top_responses(db)
+    for period in RankingPeriod:
+        get_top_responses_for_period(db, period)
+
+
+def _comments(db, seeded):
+    response_id = seeded["responses"][0].id
+    get_comments_version(db, response_id)
+    _, cursor = get_comments_page(db, response_id, limit=2)
+    get_comments_page(db, response_id, cursor=cursor, limit=2)
+
+
+def _task_responses(db, seeded):
+    get_responses_for_task(db, seeded["tasks"][0].id)
+
+
+def _response_votes(db, seeded):
+    get_votes_for_response(db, seeded["responses"][0].id)
+
+
+def _subscriptions(db, seeded):
+    user_id = seeded["users"][0].id
+    db.execute(select(Subscription).where(Subscription.target_user_id == user_id)).all()
+    db.execute(select(Subscription).where(Subscription.subscriber_id == user_id)).all()
+
+
+@pytest.mark.parametrize("queries", [_gallery, _comments, _task_responses, _response_votes, _subscriptions])
+def test_key_queries_use_indexes(db, seeded, queries):
+    """Тест планов ключевых запросов: ни одна таблица не читается полным сканированием."""
+    with capture_selects(engine) as statements:
+        queries(db, seeded)
+    assert statements
+
+    for statement, parameters in statements:
+        assert sequential_scans(engine, statement, parameters) == [], statement
@@ -0,0 +1,50 @@
+from app.core.config import settings
+from app.models.models import Response, Task
+from app.schemas.schemas import VoteCreate
+from app.services.ranking_service import RankingPeriod, get_top_responses_for_period, materialize_top_responses
+from app.services.vote_service import create_vote
+
+
+def create_test_responses(db, count):
+    task = Task(text="Задание для рейтинга")
+    db.add(task)
+    db.commit()
+    responses = [Response(text=f"Ответ {i}", task_id=task.id) for i in range(count)]
+    db.add_all(responses)
+    db.commit()
+    return responses
+
+
+def test_materialized_rankings(db, redis):
+    """Тест материализации топов за день, неделю и все время."""
+    first, second = create_test_responses(db, 2)
+    for user_id in range(1, 51):
+        create_vote(db, VoteCreate(response_id=first.id, value=1), user_id=user_id)
+    for user_id in range(1, 101):
+        create_vote(db, VoteCreate(response_id=second.id, value=1), user_id=user_id)
+
+    materialize_top_responses(db, full=True)
+
+    # В test.db остаются ответы прошлых запусков, поэтому проверяется порядок своих ответов
+    for period in RankingPeriod:
+        top = [
+            entry for entry in get_top_responses_for_period(db, period, limit=settings.TOP_RESPONSES_LIMIT)
+            if entry.response_id in (first.id, second.id)
+        ]
+        assert [entry.response_id for entry in top] == [second.id, first.id]
+        assert top[0].rank < top[1].rank
+        assert top[0].response.text == second.text
+
+
+def test_incremental_rankings_pick_up_new_votes(db, redis):
+    """Тест инкрементального пересчета топа по новым голосам."""
+    materialize_top_responses(db, full=True)
+    (response,) = create_test_responses(db, 1)
+    for user_id in range(1, 151):
+        create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=user_id)
+
+    materialize_top_responses(db)
+
+    top = get_top_responses_for_period(db, RankingPeriod.DAY, limit=settings.TOP_RESPONSES_LIMIT)
+    (entry,) = [entry for entry in top if entry.response_id == response.id]
+    assert entry.score == 150
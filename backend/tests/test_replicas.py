@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from app.core import pool, replicas
+from app.core.database import Base
+from app.core.pagination import encode_cursor
+from app.core.replicas import READ_YOUR_WRITES_COOKIE, Replica
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """Пустая SQLite-база в роли реплики, которая еще не получила записи основной БД."""
+    # Движки реплики регистрируются в копии реестра и не попадают в статистику пулов процесса
+    monkeypatch.setattr(pool, "_engines", dict(pool._engines))
+    replica = Replica("test-replica", f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=replica.engine)
+    monkeypatch.setattr(replicas, "replicas", [replica])
+    try:
+        yield replica
+    finally:
+        replica.engine.dispose()
+        asyncio.run(replica.async_engine.dispose())
+
+
+def _task_ids(client, task):
+    # Страница списка, которая начинается с задания: чтение идет через тот же
+    # маршрут, что и весь список, но не зависит от числа заданий в тестовой БД.
+    # Чтение по id здесь не подходит — оно отвечает из кэша
+    cursor = encode_cursor(datetime.fromisoformat(task["created_at"]), task["id"] - 1)
+    response = client.get("/api/tasks/", params={"cursor": cursor})
+    assert response.status_code == 200
+    return {item["id"] for item in response.json()}
+
+
+def test_reads_go_to_replica_with_lag_fallback_and_read_your_writes(api_client, replica, redis):
+    """Тест маршрутизации чтения: реплика, возврат на основную БД при отставании и после своей записи."""
+    writer = api_client
+    created = writer.post("/api/tasks/", json={"text": "Задание до репликации"})
+    assert created.status_code == 201
+    assert READ_YOUR_WRITES_COOKIE in created.cookies
+    task = created.json()
+    task_id = task["id"]
+
+    # Автор записи читает с основной БД и сразу видит свое задание
+    assert task_id in _task_ids(writer, task)
+
+    # Остальные читают с реплики, куда запись еще не дошла
+    reader = TestClient(api_client.app)
+    assert task_id not in _task_ids(reader, task)
+    assert replica.lag == 0.0
+
+    # Реплика отстала сильнее REPLICA_MAX_LAG — чтение уходит на основную БД
+    replica.measure_lag = lambda: replicas.settings.REPLICA_MAX_LAG + 60
+    replica.checked_at = 0.0
+    assert task_id in _task_ids(reader, task)
+    assert replicas.get_replica_status()["test-replica"]["usable"] is False
+
+    # Недоступная реплика тоже не используется
+    def unavailable():
+        raise ConnectionError("replica is down")
+    replica.measure_lag = unavailable
+    replica.checked_at = 0.0
+    assert task_id in _task_ids(reader, task)
+    assert replicas.get_replica_status()["test-replica"]["available"] is False
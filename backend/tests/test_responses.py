@@ -0,0 +1,169 @@
+import asyncio
+import io
+import os
+import pytest
+from fastapi import UploadFile
+from app.api.api_v1.endpoints import responses
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.models import Response, Task
+from app.schemas.schemas import CommentCreate, ResponseCreate, VoteCreate
+from app.services.comment_service import create_comment
+from app.services.response_service import (
+    ImageTooLarge,
+    UnsupportedImage,
+    backfill_response_aggregates,
+    save_response_image,
+    set_response_image,
+)
+from app.services.vote_service import create_vote
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+def create_test_response(db, text="Тестовый ответ"):
+    task = Task(text="Тестовое задание")
+    db.add(task)
+    db.commit()
+    response = Response(text=text, task_id=task.id)
+    db.add(response)
+    db.commit()
+    db.refresh(response)
+    return response
+
+
+def test_vote_and_comment_update_aggregates(db, redis):
+    """Тест обновления денормализованных счетчиков ответа."""
+    response = create_test_response(db)
+
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=1)
+    create_vote(db, VoteCreate(response_id=response.id, value=-1), user_id=2)
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=3)
+    create_comment(db, CommentCreate(response_id=response.id, content="Отлично!"))
+
+    db.refresh(response)
+    assert response.vote_count == 3
+    assert response.score == 1
+    assert response.comment_count == 1
+
+
+def test_backfill_response_aggregates(db, redis):
+    """Тест пересчета счетчиков ответа из таблиц votes и comments."""
+    response = create_test_response(db)
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=1)
+    create_comment(db, CommentCreate(response_id=response.id, content="Комментарий"))
+
+    response.vote_count = 0
+    response.score = 10
+    response.comment_count = 5
+    db.commit()
+
+    assert backfill_response_aggregates(db) >= 1
+
+    db.refresh(response)
+    assert response.vote_count == 1
+    assert response.score == 1
+    assert response.comment_count == 1
+
+
+@pytest.fixture
+def media_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 16)
+    return tmp_path
+
+
+def test_save_response_image_streams_and_sniffs(media_root, monkeypatch):
+    """Тест сохранения изображения: тип по содержимому, лимит размера и отсутствие недописанных файлов."""
+    # Имя файла от клиента не используется: ни расширение, ни путь
+    path = save_response_image(UploadFile(io.BytesIO(PNG), filename="../../photo.exe"), 7)
+    assert path == f"{settings.RESPONSES_MEDIA_DIR}/response_7.png"
+    media_dir = media_root / settings.RESPONSES_MEDIA_DIR
+    assert (media_dir / "response_7.png").read_bytes() == PNG
+    assert os.listdir(media_dir) == ["response_7.png"]
+
+    with pytest.raises(UnsupportedImage):
+        save_response_image(UploadFile(io.BytesIO(b"#!/bin/sh\necho hi\n"), filename="photo.png"), 8)
+
+    # Размер источника неизвестен: лимит срабатывает во время записи, временный файл удаляется
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 64)
+    with pytest.raises(ImageTooLarge):
+        save_response_image(UploadFile(io.BytesIO(PNG), filename="big.png"), 9)
+    assert os.listdir(media_dir) == ["response_7.png"]
+
+
+def test_create_response_with_image(api_client, db, redis, media_root, monkeypatch):
+    """Тест загрузки изображения с ответом: путь сохраняется, отклоненная загрузка не создает ответ."""
+    task = Task(text="Задание с картинкой")
+    db.add(task)
+    db.commit()
+
+    created = api_client.post("/api/responses/", data={"task_id": task.id, "text": "с картинкой"}, files={"image": ("a.png", PNG, "image/png")})
+    assert created.status_code == 201
+    assert created.json()["image_path"] == f"{settings.RESPONSES_MEDIA_DIR}/response_{created.json()['id']}.png"
+
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 64)
+    rejected = api_client.post("/api/responses/", data={"task_id": task.id}, files={"image": ("a.png", PNG, "image/png")})
+    assert rejected.status_code == 413
+    unsupported = api_client.post("/api/responses/", data={"task_id": task.id}, files={"image": ("a.png", b"not an image", "image/png")})
+    assert unsupported.status_code == 415
+    assert db.query(Response).filter(Response.task_id == task.id).count() == 1
+    # Временные файлы отклоненных загрузок удалены
+    assert os.listdir(media_root / settings.RESPONSES_MEDIA_DIR) == [f"response_{created.json()['id']}.png"]
+
+
+def test_set_response_image(api_client, db, redis):
+    """Тест записи пути к изображению: поле задает только сервер, не ResponseUpdate."""
+    response = create_test_response(db)
+    updated = set_response_image(db, response.id, f"{settings.RESPONSES_MEDIA_DIR}/response_{response.id}.png")
+    assert updated.image_path == f"{settings.RESPONSES_MEDIA_DIR}/response_{response.id}.png"
+    assert set_response_image(db, 0, "x.png") is None
+
+    # Путь из тела PUT-запроса игнорируется
+    assert api_client.put(f"/api/responses/{response.id}", json={"text": "новый", "image_path": "../../etc/passwd"}).status_code == 200
+    db.refresh(response)
+    assert response.image_path == f"{settings.RESPONSES_MEDIA_DIR}/response_{response.id}.png"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def _task(db):
+    task = Task(text="Задание со сбоем загрузки")
+    db.add(task)
+    db.commit()
+    return task
+
+
+def test_image_failure_after_publish_removes_response_and_file(api_client, db, redis, media_root, monkeypatch):
+    """Тест сбоя после переноса изображения: ответ удаляется вместе с уже перенесенным файлом."""
+    task = _task(db)
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("db is down")
+    monkeypatch.setattr(responses, "set_response_image_async", fail)
+
+    failed = api_client.post("/api/responses/", data={"task_id": task.id}, files={"image": ("a.png", PNG, "image/png")})
+    assert failed.status_code == 500
+    assert db.query(Response).filter(Response.task_id == task.id).count() == 0
+    assert os.listdir(media_root / settings.RESPONSES_MEDIA_DIR) == []
+
+
+@pytest.mark.anyio
+async def test_cancelled_upload_removes_response_and_file(db, redis, media_root, monkeypatch):
+    """Тест отмены запроса после создания ответа: не остаются ни ответ без изображения, ни файлы."""
+    task = _task(db)
+
+    async def cancel(*args, **kwargs):
+        raise asyncio.CancelledError()
+    monkeypatch.setattr(responses, "set_response_image_async", cancel)
+
+    async with AsyncSessionLocal() as session:
+        with pytest.raises(asyncio.CancelledError):
+            await responses._create_response_with_image(
+                session, ResponseCreate(task_id=task.id), UploadFile(io.BytesIO(PNG), filename="a.png")
+            )
+    assert db.query(Response).filter(Response.task_id == task.id).count() == 0
+    assert os.listdir(media_root / settings.RESPONSES_MEDIA_DIR) == []
@@ -0,0 +1,73 @@
+import uuid
+from sqlalchemy.dialects import mysql, postgresql
+from app.models.models import Response, Tag, Task
+from app.services.search_service import build_search_query
+
+
+def _ids(client, url, **params):
+    response = client.get(url, params=params)
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()]
+
+
+def test_task_search_ranks_paginates_and_matches_tags(api_client, db):
+    """Тест полнотекстового поиска заданий: релевантность, префиксы, страницы и теги."""
+    # Слово и тег уникальны для запуска: в test.db остаются задания прошлых запусков
+    word = f"жираф{uuid.uuid4().hex[:8]}"
+    once = Task(text=f"Нарисуйте {word} на закате")
+    twice = Task(text=f"{word.capitalize()} и еще один {word} в зоопарке")
+    other = Task(text="Сфотографируйте облака")
+    tagged = Task(text="Задание без нужного слова", tags=[Tag(name=f"{word}-тег")])
+    db.add_all([once, twice, other, tagged])
+    db.commit()
+
+    assert _ids(api_client, "/api/search/tasks", query=word) == [twice.id, once.id]
+    assert set(_ids(api_client, "/api/search/tasks", query=word[:-3])) >= {once.id, twice.id}
+    assert other.id not in _ids(api_client, "/api/search/tasks", query=word)
+    assert tagged.id in _ids(api_client, "/api/search/tasks", query=f"{word}-тег")
+
+    first_page = _ids(api_client, "/api/search/tasks", query=word, limit=1)
+    second_page = _ids(api_client, "/api/search/tasks", query=word, limit=1, skip=1)
+    assert first_page == [twice.id] and second_page == [once.id]
+
+    assert _ids(api_client, "/api/search/tasks", query="!!!") == []
+    assert once.id in _ids(api_client, "/api/search/tasks", query=f"{word} на", mode="substring")
+    assert twice.id in _ids(api_client, "/api/search/tasks", query=word[-8:].upper(), mode="substring")
+
+
+def test_response_search_follows_updates_and_deletes(api_client, db):
+    """Тест индекса ответов: изменение и удаление текста сразу видны в поиске."""
+    task = Task(text="Задание для поиска ответов")
+    db.add(task)
+    db.commit()
+    run = uuid.uuid4().hex[:8]
+    response = Response(task_id=task.id, text=f"Песня про капибару{run}")
+    db.add(response)
+    db.commit()
+    assert _ids(api_client, "/api/search/responses", query=f"капибару{run}") == [response.id]
+
+    response.text = f"Песня про выдру{run}"
+    db.commit()
+    assert _ids(api_client, "/api/search/responses", query=f"капибару{run}") == []
+    assert _ids(api_client, "/api/search/responses", query=f"выдру{run}") == [response.id]
+
+    db.delete(response)
+    db.commit()
+    assert _ids(api_client, "/api/search/responses", query=f"выдру{run}") == []
+
+
+def test_postgres_search_query_uses_tsvector_and_trigrams():
+    """Тест запроса для PostgreSQL: tsvector с обеими конфигурациями и триграммы."""
+    sql = str(build_search_query("postgresql", Task, "жираф").compile(dialect=postgresql.dialect()))
+    assert "tasks.search_vector @@" in sql
+    assert sql.count("websearch_to_tsquery") >= 2
+    assert "<%" in sql and "ts_rank_cd" in sql
+
+    strict = str(build_search_query("postgresql", Task, "жираф", fuzzy=False).compile(dialect=postgresql.dialect()))
+    assert "<%" not in strict
+
+
+def test_search_query_falls_back_to_substring():
+    """Тест поиска на СУБД без полнотекстового индекса: подстрока без учета регистра вместо ошибки."""
+    sql = str(build_search_query("mysql", Task, "жираф").compile(dialect=mysql.dialect())).lower()
+    assert "like" in sql and "lower(tasks.text)" in sql
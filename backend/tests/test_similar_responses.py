@@ -0,0 +1,95 @@
+import uuid
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.models.models import Response, ResponseVector, Task
+from app.schemas.schemas import ResponseUpdate
+from app.services.response_service import update_response
+from app.services import similarity_service
+from app.services.similarity_service import SIMILAR_RESPONSES_KEY, VECTOR_ROWS_KEY, index_new_responses, text_vector
+
+
+def _similar(client, response_id, limit=3):
+    response = client.get(f"/api/gallery/{response_id}/similar", params={"limit": limit})
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()]
+
+
+def test_text_vector_is_normalized_and_stable():
+    """Тест векторизации: единичная длина, одинаковый текст — одинаковый вектор."""
+    vector = text_vector("Рыжий кот спит на подоконнике")
+    assert vector.dtype.name == "float32"
+    assert abs(float(vector @ vector) - 1.0) < 1e-5
+    assert (vector == text_vector("рыжий  КОТ спит на подоконнике")).all()
+    assert not text_vector("").any()
+
+
+@pytest.fixture
+def vectors_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SIMILAR_VECTORS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_similar_responses_index(api_client, db, redis, vectors_dir, monkeypatch):
+    """Тест индекса похожих ответов: соседи по тексту, дозапись новых ответов и сброс при правке."""
+    task, other_task = Task(text="Похожие ответы"), Task(text="Другое задание")
+    db.add_all([task, other_task])
+    db.commit()
+    # Слова уникальны для запуска: в test.db остаются проиндексированные ответы
+    # прошлых запусков, и те же тексты оказались бы ближайшими соседями
+    a, b, c, d, e, f, g, h, i, j, k = (uuid.uuid4().hex[:10] for _ in range(11))
+    cat, kitten, physics = answers = [
+        Response(text=f"{a} {b} {c} {d}", task_id=task.id, score=1),
+        Response(text=f"{a} {b} {c} {e}", task_id=other_task.id),
+        Response(text=f"{f} {g} {h} {i}", task_id=task.id, score=5),
+    ]
+    db.add_all(answers)
+    db.commit()
+
+    # До индексации отдаются лучшие ответы того же задания
+    assert _similar(api_client, cat.id) == [physics.id]
+
+    assert index_new_responses(db) >= 3
+    assert _similar(api_client, cat.id)[0] == kitten.id
+    assert _similar(api_client, kitten.id)[0] == cat.id
+    assert physics.id not in _similar(api_client, cat.id, limit=1)
+
+    assert int(redis.get(VECTOR_ROWS_KEY)) == (vectors_dir / "vector_ids.i64").stat().st_size // 8
+
+    # Новый ответ индексируется отдельно и попадает в списки своих соседей; остальные
+    # векторы читаются из копии на диске, а не из таблицы
+    sleepy = Response(text=f"{a} {b} {c} {d} {j}", task_id=task.id)
+    db.add(sleepy)
+    db.commit()
+    with monkeypatch.context() as patch:
+        patch.setattr(similarity_service, "_vector_chunks", None)
+        assert index_new_responses(db) == 1
+    assert _similar(api_client, cat.id)[0] == sleepy.id
+    assert redis.zscore(SIMILAR_RESPONSES_KEY.format(response_id=kitten.id), sleepy.id) > 0
+
+    # Сбой до записи соседей не отмечает ответ проиндексированным: следующий запуск
+    # индексирует его снова, а строка прерванной попытки в копии обнуляется
+    retry = Response(text=f"{f} {g} {h} {k}", task_id=task.id)
+    db.add(retry)
+    db.commit()
+    with monkeypatch.context() as patch:
+        patch.setattr(similarity_service, "_write_neighbors", lambda *args, **kwargs: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            index_new_responses(db)
+    assert db.get(ResponseVector, retry.id) is None
+    assert index_new_responses(db) == 1
+    assert _similar(api_client, retry.id)[0] == physics.id
+    matrix_ids, matrix = similarity_service._load_matrix(db)
+    assert np.count_nonzero(np.asarray(matrix_ids) == retry.id) == 2
+    assert np.count_nonzero(np.asarray(matrix[np.asarray(matrix_ids) == retry.id]).any(axis=1)) == 1
+
+    # После правки текста вектор удаляется, и ответ индексируется заново
+    update_response(db, physics.id, ResponseUpdate(text=f"{a} {b} {c} {d} {j} {e}"))
+    assert db.get(ResponseVector, physics.id) is None
+    assert index_new_responses(db) == 1
+    assert physics.id in _similar(api_client, sleepy.id)
+
+    # Без счетчика строк в Redis копия строится заново из таблицы
+    redis.delete(VECTOR_ROWS_KEY)
+    rows = similarity_service._load_matrix(db)[0]
+    assert physics.id in rows and int(redis.get(VECTOR_ROWS_KEY)) == len(rows)
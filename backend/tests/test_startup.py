@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Необязательные тяжелые зависимости: загружаются только там, где нужны
+LAZY_MODULES = ("flask", "openai", "numpy", "scipy")
+# Бюджет собственного времени импорта модулей app.* без сторонних библиотек, мс
+APP_IMPORT_BUDGET_MS = float(os.environ.get("APP_IMPORT_BUDGET_MS", 500))
+
+
+def _import_profile(tmp_path):
+    """Импортирует app.main в отдельном процессе с -X importtime.
+
+    БД и Redis указывают на недоступные адреса: импорт не должен к ним обращаться.
+    """
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'missing' / 'app.db'}",
+        "REDIS_URL": "redis://127.0.0.1:1/0",
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    # Строки вида "import time:   self |   cumulative | package.module"
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(self_us)
+    return profile
+
+
+def test_app_import_is_lazy_and_within_budget(tmp_path):
+    """Тест импорта app.main: без DDL и соединений, без Flask и OpenAI, в пределах бюджета."""
+    profile = _import_profile(tmp_path)
+
+    loaded = {name.split(".")[0] for name in profile}
+    assert not loaded & set(LAZY_MODULES)
+
+    app_ms = sum(us for name, us in profile.items() if name == "app" or name.startswith("app.")) / 1000
+    assert app_ms < APP_IMPORT_BUDGET_MS, f"app.* import took {app_ms:.0f} ms"
+
+
+def test_flask_app_is_created_on_first_access():
+    """Тест ленивого создания Flask-приложения."""
+    import app.main
+
+    assert app.main.flask_app is app.main.flask_app
+    assert app.main.flask_app.url_map.bind("localhost").match("/") is not None
@@ -0,0 +1,38 @@
+from app.models.models import Response, Task
+from app.schemas.schemas import ResponseCreate, TaskCreate, VoteCreate
+from app.services.analytics_service import get_platform_stats, reconcile_platform_stats
+from app.services.response_service import create_response
+from app.services.task_service import create_task
+from app.services.vote_service import create_vote
+
+
+def test_platform_stats_counters_follow_writes(db, redis):
+    """Тест счетчиков статистики, обновляемых при записи."""
+    before = get_platform_stats(db)
+
+    task = create_task(db, TaskCreate(text="Задание для статистики"))
+    response = create_response(db, ResponseCreate(text="Ответ для статистики", task_id=task.id), author_id=7)
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=7)
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=8)
+
+    after = get_platform_stats(db)
+    assert after["total_tasks"] - before["total_tasks"] == 1
+    assert after["total_responses"] - before["total_responses"] == 1
+    assert after["total_votes"] - before["total_votes"] == 2
+    assert after["active_users_24h"] == 2
+
+
+def test_reconcile_platform_stats_repairs_drift(db, redis):
+    """Тест точного пересчета счетчиков статистики по таблицам."""
+    exact = reconcile_platform_stats(db)
+    redis.hset("stats:counters", "tasks", 100500)
+
+    assert reconcile_platform_stats(db)["tasks"] == exact["tasks"] == db.query(Task).count()
+    assert get_platform_stats(db)["total_responses"] == db.query(Response).count()
+
+
+def test_counters_are_not_created_partially(db, redis):
+    """Тест: приращение без построенных счетчиков не создает неполный hash."""
+    create_task(db, TaskCreate(text="Задание без счетчиков"))
+    assert not redis.exists("stats:counters")
+    assert get_platform_stats(db)["total_tasks"] == db.query(Task).count()
@@ -0,0 +1,60 @@
+import uuid
+from app.models.models import Task
+from app.services.tag_service import TAG_NAMES_KEY
+from tests.conftest import engine
+from tests.query_plans import capture_selects
+
+
+def _attach(client, task_id, *names):
+    response = client.post(f"/api/tags/task/{task_id}", json={"names": list(names)})
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_tag_autocomplete_facets_and_pages(api_client, db, redis):
+    """Тест индекса тегов: подсказки по префиксу, счетчики и страницы тегов без task_tags."""
+    # Общий префикс тегов уникален для запуска: в test.db остаются теги прошлых запусков
+    prefix = f"тег{uuid.uuid4().hex[:8]}-"
+    capybara = f"{prefix}капибара"
+    first, second, third = Task(text="Первое"), Task(text="Второе"), Task(text="Третье")
+    db.add_all([first, second, third])
+    db.commit()
+
+    # Индекса еще нет: теги пишутся только в БД, первое чтение строит индекс
+    _attach(api_client, first.id, f"{prefix}Капибара", f"{prefix}капуста")
+    assert not redis.exists(TAG_NAMES_KEY)
+    assert api_client.get("/api/tags/autocomplete", params={"prefix": f"{prefix}кап"}).json() == [
+        {"name": capybara, "count": 1},
+        {"name": f"{prefix}капуста", "count": 1},
+    ]
+    assert redis.exists(TAG_NAMES_KEY)
+
+    # Дальше индекс обновляется при привязке; повторная привязка счетчики не меняет
+    _attach(api_client, second.id, f"{prefix}КАПИБАРА")
+    _attach(api_client, third.id, capybara, f"{prefix}облака")
+    _attach(api_client, third.id, capybara)
+    assert api_client.get("/api/tags/autocomplete", params={"prefix": f"{prefix}кап"}).json()[0] == {"name": capybara, "count": 3}
+    assert api_client.get("/api/tags/autocomplete", params={"prefix": f"{prefix}обл"}).json() == [{"name": f"{prefix}облака", "count": 1}]
+    assert api_client.get("/api/tags/autocomplete", params={"prefix": f"{prefix}я"}).json() == []
+
+    facets = api_client.get("/api/tags/facets", params={"limit": 100}).json()
+    counts = [facet["count"] for facet in facets]
+    assert counts == sorted(counts, reverse=True) and counts[0] >= 3
+
+    with capture_selects(engine) as statements:
+        page = api_client.get(f"/api/tags/{capybara}/tasks", params={"limit": 2}).json()
+    assert [task["id"] for task in page] == [third.id, second.id]
+    assert not any("task_tags" in statement for statement, _ in statements)
+    next_page = api_client.get(f"/api/tags/{capybara}/tasks", params={"skip": 2, "limit": 2}).json()
+    assert [task["id"] for task in next_page] == [first.id]
+
+    # После потери Redis индекс перестраивается из task_tags
+    redis.flushdb()
+    assert api_client.get("/api/tags/autocomplete", params={"prefix": capybara}).json() == [{"name": capybara, "count": 3}]
+    assert api_client.get("/api/tags/facets", params={"limit": 1}).json()[0]["count"] >= 3
+
+    # Поиск по тегу сравнивает нормализованное имя: регистр и пробелы запроса не важны
+    found = api_client.get("/api/search/tasks", params={"query": f"  {prefix}КАПИБАРА "}).json()
+    assert {first.id, second.id, third.id} <= {task["id"] for task in found}
+
+    assert api_client.post("/api/tags/task/999999", json={"names": [capybara]}).status_code == 404
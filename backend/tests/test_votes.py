@@ -0,0 +1,121 @@
+import pytest
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.models.models import Response, Task, Vote
+from app.schemas.schemas import VoteCreate
+from app.services.vote_service import (
+    calculate_hot_score,
+    create_vote,
+    flush_vote_buffer,
+    get_hot_response_ids,
+    get_top_response_ids,
+    reconcile_response_scores,
+    submit_vote,
+)
+
+
+@pytest.fixture
+def response(db):
+    task = Task(text="Задание для голосования")
+    db.add(task)
+    db.commit()
+    db_response = Response(text="Ответ для голосования", task_id=task.id)
+    db.add(db_response)
+    db.commit()
+    db.refresh(db_response)
+    return db_response
+
+
+def test_create_vote_updates_score_counters(db, redis, response):
+    """Тест инкрементального обновления рейтинга при голосовании."""
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=1)
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=2)
+    create_vote(db, VoteCreate(response_id=response.id, value=-1), user_id=3)
+
+    cached = redis.hgetall(f"response:{response.id}")
+    assert cached["score"] == "1"
+    assert cached["votes_count"] == "3"
+
+
+def test_create_vote_initializes_counters_from_db(db, redis, response):
+    """Тест инициализации счетчиков из БД после сброса кэша."""
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=1)
+    redis.flushdb()
+
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=2)
+
+    cached = redis.hgetall(f"response:{response.id}")
+    assert cached["score"] == "2"
+    assert cached["votes_count"] == "2"
+
+
+def test_reconcile_repairs_drift(db, redis, response):
+    """Тест исправления расхождений счетчиков с таблицей votes."""
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=1)
+    redis.hset(f"response:{response.id}", mapping={"score": 42, "votes_count": 42})
+
+    assert reconcile_response_scores(db) >= 1
+
+    cached = redis.hgetall(f"response:{response.id}")
+    assert cached["score"] == "1"
+    assert cached["votes_count"] == "1"
+
+
+def test_leaderboard_orders_by_votes(db, redis, response):
+    """Тест рейтинга ответов, обновляемого при каждом голосе."""
+    other = Response(text="Другой ответ", task_id=response.task_id)
+    db.add(other)
+    db.commit()
+
+    # В test.db остаются ответы прошлых запусков, поэтому читается весь рейтинг
+    limit = db.query(Response).count()
+    create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=1)
+    top = dict(get_top_response_ids(db, limit=limit))
+    assert top[response.id] == 1
+    assert other.id not in top
+
+    create_vote(db, VoteCreate(response_id=other.id, value=1), user_id=1)
+    create_vote(db, VoteCreate(response_id=other.id, value=1), user_id=2)
+    top_ids = [response_id for response_id, _ in get_top_response_ids(db, limit=limit)]
+    assert top_ids.index(other.id) < top_ids.index(response.id)
+
+
+def test_calculate_hot_score():
+    """Тест "горячего" рейтинга: свежесть и голоса."""
+    now = datetime.utcnow()
+    assert calculate_hot_score(10, now) > calculate_hot_score(1, now)
+    assert calculate_hot_score(10, now) > calculate_hot_score(10, now - timedelta(hours=1))
+    assert calculate_hot_score(-5, now) < calculate_hot_score(0, now)
+
+
+def test_hot_rankings_follow_votes(db, redis, response):
+    """Тест обновления "горячего" рейтинга при голосовании."""
+    newer = Response(text="Более свежий ответ", task_id=response.task_id)
+    db.add(newer)
+    db.commit()
+
+    for user_id in range(1, 11):
+        create_vote(db, VoteCreate(response_id=response.id, value=1), user_id=user_id)
+
+    # В test.db остаются ответы прошлых запусков, поэтому читается весь рейтинг
+    hot_ids = get_hot_response_ids(db, limit=db.query(Response).count())
+    assert hot_ids.index(response.id) < hot_ids.index(newer.id)
+    assert redis.zscore("leaderboard:hot", response.id) == pytest.approx(
+        calculate_hot_score(10, response.created_at)
+    )
+
+
+def test_buffered_votes_are_flushed_in_batches(db, redis, response, monkeypatch):
+    """Тест отложенной записи голосов через буфер в Redis."""
+    monkeypatch.setattr(settings, "VOTE_INGESTION_MODE", "buffered")
+
+    assert submit_vote(db, VoteCreate(response_id=response.id, value=1), user_id=1) is None
+    assert submit_vote(db, VoteCreate(response_id=response.id, value=1), user_id=None) is None
+    assert submit_vote(db, VoteCreate(response_id=999999, value=1), user_id=1) is None
+    assert db.query(Vote).filter(Vote.response_id == response.id).count() == 0
+
+    assert flush_vote_buffer(db, batch_size=2) == 2
+
+    assert db.query(Vote).filter(Vote.response_id == response.id).count() == 2
+    assert redis.hget(f"response:{response.id}", "votes_count") == "2"
+    assert redis.xlen("votes:stream") == 0